@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+from crypto.aes import AES
+from crypto import aes_numpy
+from crypto.mapped import ciphertext_length
+from crypto.modes import MODE_NAMES, mode_from_name
+
+# Throughput matrix for the AES engines: key size x mode x engine x operation x input size.
+#
+#   python aes_benchmark_suite.py --sizes 16,1K,64K,1M --output results.json
+#   python aes_benchmark_suite.py --baseline results.json --max-regression 0.10
+#
+# Inputs are generated on the fly and outputs discarded, so sizes up to 1G do not need
+# the data in memory. Keys, IVs and data come from a seeded generator (--seed), so two
+# runs measure exactly the same work. Throughput counts the bytes each operation reads:
+# the plaintext when encrypting, the padded ciphertext when decrypting.
+
+KEY_SIZES = (128, 192, 256)
+SIZE_SUFFIXES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+PATTERN_SIZE = 1024 * 1024
+DEFAULT_SEED = 0
+
+def parse_size(text):
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+def format_size(size):
+    for suffix, factor in (('G', 1024 ** 3), ('M', 1024 ** 2), ('K', 1024)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{suffix}"
+    return f"{size}B"
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+class PatternReader:
+    # Yields `size` bytes by repeating a fixed random pattern
+    def __init__(self, pattern, size):
+        self.pattern = pattern
+        self.remaining = size
+        self.position = 0
+
+    def read(self, n=-1):
+        if n < 0 or n > self.remaining:
+            n = self.remaining
+
+        out = bytearray()
+        while len(out) < n:
+            take = min(n - len(out), len(self.pattern) - self.position)
+            out += self.pattern[self.position:self.position + take]
+            self.position = (self.position + take) % len(self.pattern)
+
+        self.remaining -= n
+        return bytes(out)
+
+class NullWriter:
+    def __init__(self):
+        self.written = 0
+
+    def write(self, data):
+        self.written += len(data)
+        return len(data)
+
+def input_length(operation, mode, size):
+    # Bytes an operation on a plaintext of `size` bytes reads
+    if operation == "encrypt":
+        return size
+    return ciphertext_length(size, mode_from_name(mode))
+
+def run_once(aes, operation, mode, size, pattern, iv):
+    # Encrypt and decrypt both stream headerless data; decrypting random bytes measures the
+    # same work as decrypting real ciphertext (unpad does not validate)
+    src = PatternReader(pattern, input_length(operation, mode, size))
+    dst = NullWriter()
+    start = time.perf_counter_ns()
+
+    if operation == "encrypt":
+        aes.encrypt_stream(src, dst, header=False, mode=mode_from_name(mode), iv=iv)
+    else:
+        aes.decrypt_stream(src, dst, header=False, mode=mode_from_name(mode), iv=iv)
+
+    return (time.perf_counter_ns() - start) / 1e9
+
+def benchmark_case(key_size, mode, engine, operation, size, warmup, repeat, pattern, seed):
+    # Every engine, operation and size of a key size and mode gets the same key and IV,
+    # whichever other cases are selected
+    rng = random.Random(f"{seed}:{key_size}:{mode}")
+    aes = AES(rng.randbytes(key_size // 8), engine)
+    iv = rng.randbytes(16)
+
+    for _ in range(warmup):
+        run_once(aes, operation, mode, size, pattern, iv)
+
+    times = [run_once(aes, operation, mode, size, pattern, iv) for _ in range(repeat)]
+    median = statistics.median(times)
+    processed = input_length(operation, mode, size)
+    blocks = (ciphertext_length(size, mode_from_name(mode)) + 15) // 16
+
+    return {
+        'key_size': key_size,
+        'mode': mode,
+        'engine': engine,
+        'operation': operation,
+        'size': size,
+        'bytes': processed,
+        'warmup': warmup,
+        'repeat': repeat,
+        'median_s': median,
+        'mean_s': statistics.mean(times),
+        'min_s': min(times),
+        'p10_s': percentile(times, 0.10),
+        'p90_s': percentile(times, 0.90),
+        'mb_per_s': processed / median / 1e6 if median > 0 else 0,
+        'blocks_per_s': blocks / median if median > 0 else 0,
+    }
+
+def case_id(result):
+    return (result['key_size'], result['mode'], result['engine'], result['operation'], result['size'])
+
+def compare_to_baseline(result, baseline_results, max_regression):
+    # Records the change against the matching baseline case; True if it is a regression
+    previous = baseline_results.get(case_id(result))
+    if not previous or previous['mb_per_s'] <= 0:
+        return False
+
+    change = result['mb_per_s'] / previous['mb_per_s'] - 1
+    result['baseline_mb_per_s'] = previous['mb_per_s']
+    result['change'] = change
+
+    return change < -max_regression
+
+def collect_metadata(args):
+    return {
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'numpy': aes_numpy.np.__version__ if aes_numpy.HAS_NUMPY else None,
+        'warmup': args.warmup,
+        'repeat': args.repeat,
+        'seed': args.seed,
+    }
+
+def print_result(result):
+    line = (f"AES-{result['key_size']:<4} {result['mode']:<4} {result['engine']:<10} "
+            f"{result['operation']:<8} {format_size(result['size']):>6}  "
+            f"median {result['median_s'] * 1000:10.3f} ms  "
+            f"p10 {result['p10_s'] * 1000:10.3f}  p90 {result['p90_s'] * 1000:10.3f}  "
+            f"{result['mb_per_s']:9.3f} MB/s  {result['blocks_per_s']:12.0f} blocks/s")
+
+    if 'change' in result:
+        line += f"  ({result['change'] * 100:+.1f}% vs baseline)"
+
+    print(line, flush=True)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AES throughput benchmark suite")
+    parser.add_argument('--key-sizes', default="128,192,256", help="comma-separated key sizes in bits")
+    parser.add_argument('--modes', default=",".join(MODE_NAMES.values()), help="comma-separated modes")
+    parser.add_argument('--engines', default="reference,ttable,numpy", help="comma-separated engines")
+    parser.add_argument('--operations', default="encrypt,decrypt")
+    parser.add_argument('--sizes', default="16,1K,64K", help="comma-separated input sizes, e.g. 16,1K,1M,1G")
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="seed for keys, IVs and input data")
+    parser.add_argument('--output', help="write JSON results to this file")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--max-regression', type=float, default=0.10,
+                        help="allowed throughput drop vs baseline as a fraction (default 0.10)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    key_sizes = [int(k) for k in args.key_sizes.split(",")]
+    modes = [m.strip().upper() for m in args.modes.split(",")]
+    engines = [e.strip() for e in args.engines.split(",")]
+    operations = [o.strip() for o in args.operations.split(",")]
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+
+    for key_size in key_sizes:
+        if key_size not in KEY_SIZES:
+            raise SystemExit(f"Unsupported key size: {key_size}")
+
+    if "numpy" in engines and not aes_numpy.HAS_NUMPY:
+        print("NumPy not installed, skipping the numpy engine")
+        engines.remove("numpy")
+
+    baseline_results = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline_results = {case_id(r): r for r in json.load(file).get('results', [])}
+
+    pattern = random.Random(args.seed).randbytes(PATTERN_SIZE)
+    results = []
+    regressions = []
+
+    for key_size in key_sizes:
+        for mode in modes:
+            for engine in engines:
+                for operation in operations:
+                    for size in sizes:
+                        result = benchmark_case(key_size, mode, engine, operation, size,
+                                                args.warmup, args.repeat, pattern, args.seed)
+                        if compare_to_baseline(result, baseline_results, args.max_regression):
+                            regressions.append(result)
+
+                        results.append(result)
+                        print_result(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'metadata': collect_metadata(args), 'results': results}, file, indent=2)
+        print(f"Results written to {args.output}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.max_regression * 100:.0f}%:")
+        for result in regressions:
+            print_result(result)
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
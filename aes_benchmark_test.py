@@ -19,4 +19,12 @@ print('Block count: ', block_count)
 
 print('Round time:')
 for time in round_timings:
-    print(time * 1000)
\ No newline at end of file
+    print(time * 1000)
+## Every engine should report the blocks it processed, including the batch (numpy) engine
+
+for engine in ("reference", "ttable", "numpy"):
+    engine_aes = AES(key, engine)
+    engine_aes.encrypt(plaintext * 100)
+
+    print(f'{engine} block count: ', engine_aes.get_block_count(),
+          'Match:', engine_aes.get_block_count() == len(plaintext * 100) // 16 + 1)
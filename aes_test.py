@@ -1,5 +1,13 @@
+import io
+import os
+import sys
+import tempfile
+
 from crypto.aes import AES
 from crypto.aes_utils import base64_decode, base64_encode
+from crypto.container import HEADER_SIZE, ContainerHeader
+from crypto.modes import MODE_ECB, MODE_CTR, MODE_CBC, MODE_NAMES
+from crypto.parallel_aes import ParallelAES
 
 from Crypto.Cipher import AES as AES_Lib
 from Crypto.Util.Padding import pad, unpad
@@ -7,33 +15,184 @@ from Crypto.Util.Padding import pad, unpad
 key = b'ThisIs16BytesKey'
 plaintext = 'Hello, World! abcdef123456'
 
-## My implement test
+ENGINES = ("reference", "ttable", "numpy")
+KEYS = (b'ThisIs16BytesKey', b'ThisIs24BytesKeyForAES!!', b'ThisIs32BytesKeyForAES256Testing')
+IV = bytes(range(16))
+# CTR counters wrap at 2**128; start close to it so the wrap is covered too
+WRAP_IV = b'\xff' * 15 + b'\xfe'
+
+failures = []
+
+def check(label, matched):
+    print(f'{label}:', 'Match' if matched else 'MISMATCH')
+    if not matched:
+        failures.append(label)
+
+def lib_cipher(key, mode, iv):
+    if mode == MODE_ECB:
+        return AES_Lib.new(key, AES_Lib.MODE_ECB)
+    if mode == MODE_CBC:
+        return AES_Lib.new(key, AES_Lib.MODE_CBC, iv=iv)
+    return AES_Lib.new(key, AES_Lib.MODE_CTR, nonce=b'', initial_value=iv)
+
+def lib_encrypt(key, mode, iv, data):
+    if mode == MODE_CTR:
+        return lib_cipher(key, mode, iv).encrypt(data)
+    return lib_cipher(key, mode, iv).encrypt(pad(data, 16))
+
+def test_basic():
+    ## My implement test
+
+    aes = AES(key)
+    cipher = aes.encrypt(plaintext)
+    decipher = aes.decrypt(cipher)
+
+    print('Key: ', key)
+    print('Plaintext: ', plaintext)
+    print('Ciphertext: ', cipher)
+    print('Deciphertext: ', decipher)
+    print('Match:', plaintext == decipher)
+
+    ## Test with pycryptodome
+
+    padded_plaintext = pad(plaintext.encode(), 16)
+
+    lib_aes = AES_Lib.new(key, AES_Lib.MODE_ECB)
+    lib_cipher = lib_aes.encrypt(padded_plaintext)
+
+    lib_decipher = lib_aes.decrypt(lib_cipher)
+    lib_decipher = unpad(lib_decipher, 16).decode()
+
+    lib_cipher = base64_encode(lib_aes.encrypt(padded_plaintext))
+
+
+    print('Lib ciphertext: ',  lib_cipher)
+    print('Match with custom implement: ', lib_cipher == cipher)
+    print('Lib deciphertext: ', lib_decipher)
+    print('Match with custom implement: ', lib_decipher == decipher)
+
+    check('ECB string', lib_cipher == cipher and lib_decipher == decipher)
+
+def test_engines():
+    ## Every engine and key size must be byte-identical to pycryptodome
+
+    text = plaintext * 40
+    data = os.urandom(4096 + 5)
+
+    for engine in ENGINES:
+        for engine_key in KEYS:
+            label = f'{engine} AES-{len(engine_key) * 8}'
+            aes = AES(engine_key, engine)
+
+            expected = base64_encode(lib_encrypt(engine_key, MODE_ECB, None, text.encode()))
+            cipher = aes.encrypt(text)
+            check(f'{label} ECB string', cipher == expected and aes.decrypt(cipher) == text)
+
+            for mode in (MODE_ECB, MODE_CTR, MODE_CBC):
+                for iv in ((IV, WRAP_IV) if mode == MODE_CTR else (IV,)):
+                    stream_label = f'{label} {MODE_NAMES[mode]} stream' + (' (counter wrap)' if iv == WRAP_IV else '')
+                    expected = lib_encrypt(engine_key, mode, iv, data)
+
+                    encrypted = io.BytesIO()
+                    aes.encrypt_stream(io.BytesIO(data), encrypted, chunk_size=1000, header=False, mode=mode, iv=iv)
+
+                    decrypted = io.BytesIO()
+                    aes.decrypt_stream(io.BytesIO(encrypted.getvalue()), decrypted, chunk_size=1000,
+                                       header=False, mode=mode, iv=iv)
+
+                    check(stream_label, encrypted.getvalue() == expected and decrypted.getvalue() == data)
+
+def test_containers():
+    ## Containers (streamed, armored and memory-mapped) round-trip and carry library ciphertext
+
+    data = os.urandom(70000 + 3)
+
+    with tempfile.TemporaryDirectory() as directory:
+        src = os.path.join(directory, 'plain.bin')
+        with open(src, 'wb') as file:
+            file.write(data)
+
+        for engine in ("ttable", "numpy"):
+            for engine_key in KEYS:
+                aes = AES(engine_key, engine)
+
+                for mode in (MODE_ECB, MODE_CTR, MODE_CBC):
+                    label = f'{engine} AES-{len(engine_key) * 8} {MODE_NAMES[mode]}'
+                    iv = None if mode == MODE_ECB else IV
+                    expected = lib_encrypt(engine_key, mode, IV, data)
+
+                    container = io.BytesIO()
+                    aes.encrypt_stream(io.BytesIO(data), container, mode=mode, iv=iv)
+                    decrypted = io.BytesIO()
+                    aes.decrypt_stream(io.BytesIO(container.getvalue()), decrypted)
+                    check(f'{label} container', container.getvalue()[HEADER_SIZE:] == expected
+                          and decrypted.getvalue() == data)
+
+                    armored = io.BytesIO()
+                    aes.encrypt_stream(io.BytesIO(data), armored, armor=True, mode=mode, iv=iv)
+                    decrypted = io.BytesIO()
+                    aes.decrypt_stream(io.BytesIO(armored.getvalue()), decrypted, armor=True)
+                    check(f'{label} armored', base64_decode(armored.getvalue().decode('ascii'))[HEADER_SIZE:] == expected
+                          and decrypted.getvalue() == data)
+
+                    encrypted_path = os.path.join(directory, 'cipher.bin')
+                    decrypted_path = os.path.join(directory, 'decrypted.bin')
+                    aes.encrypt_file(src, encrypted_path, mode=mode, iv=iv, chunk_size=4096)
+                    aes.decrypt_file(encrypted_path, decrypted_path, chunk_size=4096)
+
+                    with open(encrypted_path, 'rb') as file:
+                        mapped_cipher = file.read()
+                        file.seek(0)
+                        ranged = aes.decrypt_range(file, 12345, 20000)
+                    with open(decrypted_path, 'rb') as file:
+                        mapped_plain = file.read()
 
-aes = AES(key)
-cipher = aes.encrypt(plaintext)
-decipher = aes.decrypt(cipher)
+                    check(f'{label} mapped file', mapped_cipher[HEADER_SIZE:] == expected and mapped_plain == data)
+                    check(f'{label} range', ranged == data[12345:32345])
 
-print('Key: ', key)
-print('Plaintext: ', plaintext)
-print('Ciphertext: ', cipher)
-print('Deciphertext: ', decipher)
-print('Match:', plaintext == decipher)
+                    try:
+                        AES(engine_key[::-1], engine).decrypt_stream(io.BytesIO(container.getvalue()), io.BytesIO())
+                        wrong_key = False
+                    except ValueError:
+                        wrong_key = True
+                    check(f'{label} wrong key', wrong_key)
 
-## Test with pycryptodome
+def test_parallel():
+    ## ParallelAES has to hand large inputs to its process pool, for strings and files alike
 
-padded_plaintext = pad(plaintext.encode(), 16)
+    big_plaintext = os.urandom(512 * 1024 + 5)
 
-lib_aes = AES_Lib.new(key, AES_Lib.MODE_ECB)
-lib_cipher = lib_aes.encrypt(padded_plaintext)
+    with ParallelAES(key, "ttable", workers=2, shard_size=64 * 1024) as parallel_aes:
+        check('Parallel encrypt', parallel_aes.encrypt(big_plaintext) == AES(key, "ttable").encrypt(big_plaintext))
+        check('Used pool', parallel_aes.executor is not None)
 
-lib_decipher = lib_aes.decrypt(lib_cipher)
-lib_decipher = unpad(lib_decipher, 16).decode()
+    with tempfile.TemporaryDirectory() as directory, ParallelAES(key, "ttable", workers=2, shard_size=64 * 1024) as parallel_aes:
+        src = os.path.join(directory, 'plain.bin')
+        with open(src, 'wb') as file:
+            file.write(big_plaintext)
 
-lib_cipher = base64_encode(lib_aes.encrypt(padded_plaintext))
+        parallel_aes.encrypt_file(src, src + '.encrypted')
+        file_pool = parallel_aes.executor is not None
+        parallel_aes.decrypt_file(src + '.encrypted', src + '.decrypted')
+        with open(src + '.decrypted', 'rb') as file:
+            check('Parallel file', file.read() == big_plaintext)
+        check('Used pool for files', file_pool)
 
+        # The mode is the third positional argument, as it is for AES.encrypt_file
+        parallel_aes.encrypt_file(src, src + '.ctr', MODE_CTR)
+        with open(src + '.ctr', 'rb') as file:
+            header = ContainerHeader.unpack(file.read(HEADER_SIZE))
+        parallel_aes.decrypt_file(src + '.ctr', src + '.decrypted')
+        with open(src + '.decrypted', 'rb') as file:
+            check('Parallel CTR file', header.mode == MODE_CTR and file.read() == big_plaintext)
 
-print('Lib ciphertext: ',  lib_cipher)
-print('Match with custom implement: ', lib_cipher == cipher)
-print('Lib deciphertext: ', lib_decipher)
-print('Match with custom implement: ', lib_decipher == decipher)
+if __name__ == "__main__":
+    test_basic()
+    test_engines()
+    test_containers()
+    test_parallel()
 
+    if failures:
+        print(f'{len(failures)} check(s) failed: {", ".join(failures)}')
+        sys.exit(1)
+    print('All checks passed')
@@ -1,19 +1,52 @@
 import os
+import threading
 import time
-from tkinter import filedialog, messagebox
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import filedialog, messagebox, TclError
+from tkinter.simpledialog import askstring
 from crypto.benchmarked_aes import BenchmarkedAES as AES
+from crypto.container import HEADER_SIZE, detect_format
+from crypto.modes import mode_from_name
+from crypto.tracing import Tracer
+from crypto.progress import ProgressTracker, ProgressReader, OperationCancelled
+from models.encryption_queue import EncryptionQueueManager
+from models.status import QUEUED, RUNNING
 from views.encryption_view import EncryptionView
 
+PREVIEW_SIZE = 64 * 1024
+
 class EncryptionController:
     def __init__(self, view: EncryptionView, main_controller):
         self.view = view
         self.main_controller = main_controller
         self.file_path = None
         self.cipher = None
+        self.tracer = Tracer()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="encryption")
+        self.cancel_event = threading.Event()
+        self.running = False
+
+        self.queue = EncryptionQueueManager()
+        self.queue.set_log_callback(lambda message: self._post(lambda: self.view.set_queue_status(message)))
+        self.queue.set_job_callback(self._queue_job_changed)
+        self.queue_output = None
         
         self.view.set_browse_command(self.browse_file)
         self.view.set_encrypt_command(lambda: self.process_file("encrypt"))
         self.view.set_decrypt_command(lambda: self.process_file("decrypt"))
+        self.view.set_export_trace_command(self.export_trace)
+        self.view.set_cancel_command(self.cancel_job)
+        self.view.set_queue_commands(
+            self.add_queue_folder,
+            self.add_queue_pattern,
+            self.choose_queue_output,
+            lambda: self.start_queue("encrypt"),
+            lambda: self.start_queue("decrypt"),
+            self.toggle_queue_pause,
+            self.queue.cancel,
+            self.clear_queue,
+            self.save_queue_report
+        )
 
     def browse_file(self, file_path = None):
         if file_path:
@@ -26,13 +59,15 @@ class EncryptionController:
             self.view.update_file_display(filename)
             
             try:
-                with open(filename, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                    self.view.set_input_text(content)
+                self.view.set_input_text(self._read_preview(filename))
             except Exception as e:
                 messagebox.showerror("Error", f"Could not read file: {str(e)}")
 
     def process_file(self, operation):
+        if self.running:
+            messagebox.showinfo("Info", "An operation is already running")
+            return
+
         if not self.file_path:
             messagebox.showerror("Error", "Please select a file first")
             return
@@ -48,43 +83,251 @@ class EncryptionController:
             messagebox.showerror("Error", "Key must be 16, 24 or 32 bytes long")
             return
 
+        extension = ".encrypted" if operation == "encrypt" else ".decrypted"
+        output_path = os.path.splitext(self.file_path)[0] + extension
+
+        if os.path.abspath(output_path) == os.path.abspath(self.file_path):
+            output_path = self.file_path + extension
+
+        self.running = True
+        self.cancel_event.clear()
+        self.view.set_busy(True)
+        self.view.reset_progress()
+
+        self.executor.submit(self._run_job, operation, key, self.file_path, output_path,
+                             self.view.get_armor(), mode_from_name(self.view.get_mode()))
+
+    def cancel_job(self):
+        if self.running:
+            self.cancel_event.set()
+
+    def _run_job(self, operation, key, input_path, output_path, armor, mode):
+        # Runs on the worker thread; every view update is marshalled back with after().
+        # Output goes to a .part file that replaces output_path only once the job succeeded,
+        # so a failed or cancelled job never touches an existing output.
+        partial = output_path + ".part"
         try:
-            self.cipher = AES(key)
-            
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
+            cipher = AES(key)
+            self.tracer.reset()
+            cipher.set_tracer(self.tracer)
 
             start_time = time.perf_counter()
-            
-            if operation == "encrypt":
-                processed_content = self.cipher.encrypt(content)
-                extension = ".encrypted"
-                success_msg = "Encryption"
-            else:
-                processed_content = self.cipher.decrypt(content)
-                extension = ".decrypted"
-                success_msg = "Decryption"
+
+            tracker = ProgressTracker(os.path.getsize(input_path), self._report_progress, self.cancel_event)
+
+            with self.tracer.span(operation):
+                if operation == "encrypt":
+                    self._encrypt_file(cipher, input_path, partial, armor, mode, tracker)
+                    success_msg = "Encryption"
+                else:
+                    self._decrypt_file(cipher, input_path, partial, tracker)
+                    success_msg = "Decryption"
+
+            os.replace(partial, output_path)
 
             total_time = (time.perf_counter() - start_time) * 1000
-            output_path = os.path.splitext(self.file_path)[0] + extension
-            
-            with open(output_path, 'w', encoding='utf-8') as file:
-                file.write(processed_content)
+            self._post(lambda: self._job_finished(cipher, input_path, output_path, success_msg, total_time))
+
+        except OperationCancelled:
+            self._remove_partial(partial)
+            self._post(self._job_cancelled)
+
+        except Exception as e:
+            self._remove_partial(partial)
+            error_msg = str(e)
+            self._post(lambda: self._job_failed(error_msg))
+
+    def _post(self, callback):
+        try:
+            self.view.parent.after(0, callback)
+        except (RuntimeError, TclError):
+            # The window is gone; stop the job instead of writing to a dead view
+            self.cancel_event.set()
+
+    def _report_progress(self, done, total, speed):
+        self._post(lambda: self.view.update_progress(done, total, speed))
+
+    def _remove_partial(self, partial):
+        # Must not raise: the worker still has to report back so the view leaves its busy state
+        try:
+            if os.path.exists(partial):
+                os.remove(partial)
+        except OSError:
+            # e.g. still mapped after a cancel on Windows; the next run overwrites it
+            pass
+
+    def _job_finished(self, cipher, input_path, output_path, success_msg, total_time):
+        self.running = False
+        self.cipher = cipher
+        self.view.set_busy(False)
+
+        try:
+            self.view.set_output_text(self._read_preview(output_path))
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not read file: {str(e)}")
+
+        self._update_benchmark_data(total_time, input_path)
+        messagebox.showinfo("Success", f"{success_msg} completed!\nSaved to: {output_path}")
+
+    def _job_cancelled(self):
+        self.running = False
+        self.view.set_busy(False)
+        self.view.set_progress_status("Cancelled")
+
+    def _job_failed(self, error_msg):
+        self.running = False
+        self.view.set_busy(False)
+        self.view.set_progress_status("Failed")
+        messagebox.showerror("Error", f"An error occurred: {error_msg}")
+
+    def _encrypt_file(self, cipher, input_path, output_path, armor, mode, tracker):
+        if not armor:
+            # Binary output has a known size, so both files are memory-mapped
+            cipher.encrypt_file(input_path, output_path, mode=mode, progress=tracker.update)
+            return
+
+        with open(input_path, 'rb') as src, open(output_path, 'wb') as dst:
+            cipher.encrypt_stream(ProgressReader(src, tracker), dst, armor=True, mode=mode)
+
+    def _decrypt_file(self, cipher, input_path, output_path, tracker):
+        with open(input_path, 'rb') as file:
+            file_format = detect_format(file.read(HEADER_SIZE))
+
+        if file_format == "binary":
+            cipher.decrypt_file(input_path, output_path, progress=lambda done: tracker.update(HEADER_SIZE + done))
+            return
+
+        with open(input_path, 'rb') as file, open(output_path, 'wb') as dst:
+            src = ProgressReader(file, tracker)
+
+            if file_format == "armored":
+                cipher.decrypt_stream(src, dst, armor=True)
+                return
+
+            # Files written before the container format: one base64 string of ECB ciphertext
+            with self.tracer.span("read") as span:
+                content = src.read().decode('ascii')
+                span.count(len(content))
 
-            self.view.set_output_text(processed_content)
-            self._update_benchmark_data(total_time)
-            messagebox.showinfo("Success", f"{success_msg} completed!\nSaved to: {output_path}")
+            plaintext = cipher.decrypt(content).encode('utf-8')
 
+            with self.tracer.span("write", len(plaintext)):
+                dst.write(plaintext)
+
+    def export_trace(self):
+        if self.running:
+            messagebox.showinfo("Info", "Wait for the current operation to finish")
+            return
+
+        if not self.tracer.paths:
+            messagebox.showerror("Error", "Encrypt or decrypt a file first")
+            return
+
+        path = filedialog.asksaveasfilename(
+            title="Export trace",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("Collapsed stacks (flamegraph)", "*.folded")]
+        )
+        if not path:
+            return
+
+        try:
+            if path.endswith(".json"):
+                self.tracer.export_json(path)
+            else:
+                self.tracer.export_collapsed(path)
+            messagebox.showinfo("Success", f"Trace saved to: {path}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not export trace: {str(e)}")
+
+    def add_queue_folder(self):
+        directory = filedialog.askdirectory(title="Select a folder to queue")
+        if directory:
+            self._add_to_queue(directory)
+
+    def add_queue_pattern(self):
+        pattern = askstring("Add Pattern", "Glob pattern (e.g. /data/**/*.csv):")
+        if pattern:
+            self._add_to_queue(pattern)
+
+    def _add_to_queue(self, source):
+        jobs = self.queue.add(source)
+        self.view.update_queue_jobs([self._queue_row(job) for job in jobs])
+
+    def choose_queue_output(self):
+        directory = filedialog.askdirectory(title="Select output folder")
+        self.queue_output = directory or None
+        self.view.set_queue_output(self.queue_output)
+
+    def start_queue(self, operation):
+        key = self.view.get_encryption_key()
+        if not key:
+            messagebox.showerror("Error", "Please enter an encryption key")
+            return
+
+        if not self._check_key(key):
+            messagebox.showerror("Error", "Key must be 16, 24 or 32 bytes long")
+            return
+
+        try:
+            self.queue.configure(key, operation, self.queue_output, self.view.get_armor(),
+                                 mode_from_name(self.view.get_mode()), self.view.get_queue_workers())
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        if self.queue.start():
+            self.view.set_queue_paused(False)
+
+    def toggle_queue_pause(self):
+        if self.queue.is_paused():
+            self.queue.resume()
+        else:
+            self.queue.pause()
+        self.view.set_queue_paused(self.queue.is_paused())
+
+    def clear_queue(self):
+        finished = [str(id(job)) for job in self.queue.jobs if job.status not in (QUEUED, RUNNING)]
+        self.queue.clear_finished()
+        self.view.remove_queue_jobs(finished)
+
+    def save_queue_report(self):
+        path = filedialog.asksaveasfilename(title="Save queue report", defaultextension=".json",
+                                            filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+
+        try:
+            self.queue.write_report(path)
+            messagebox.showinfo("Success", f"Report saved to: {path}")
         except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+            messagebox.showerror("Error", f"Could not save report: {str(e)}")
+
+    def _queue_job_changed(self, job):
+        row = self._queue_row(job)
+        self._post(lambda: self.view.update_queue_jobs([row]))
+
+    def _queue_row(self, job):
+        return (str(id(job)), os.path.relpath(job.source, job.root), job.status, job.throughput())
+
+    def _read_preview(self, path):
+        with open(path, 'rb') as file:
+            data = file.read(PREVIEW_SIZE + 1)
+
+        preview = data[:PREVIEW_SIZE].decode('utf-8', errors='replace')
+
+        if len(data) > PREVIEW_SIZE:
+            preview += "\n... (truncated)"
+
+        return preview
 
     def _check_key(self, key):
         key_size = len(key.encode('utf-8'))
         return (key_size == 16) or (key_size == 24) or (key_size == 32)
 
-    def _update_benchmark_data(self, total_time):
+    def _update_benchmark_data(self, total_time, input_path):
         round_timings = self.cipher.get_round_timings()
-        file_size = os.path.getsize(self.file_path)
+        file_size = os.path.getsize(input_path)
         num_blocks = self.cipher.get_block_count()
         
         stats = {
@@ -97,7 +340,8 @@ class EncryptionController:
             'file_size': file_size,
             'speed': (file_size / 1024) / (total_time / 1000) if total_time > 0 else 0,
             'num_blocks': num_blocks,
-            'key_length': len(self.cipher.key)
+            'key_length': len(self.cipher.key),
+            'stages': self.tracer.stage_summary()
         }
 
         self.view.update_round_timings(round_timings)
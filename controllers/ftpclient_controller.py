@@ -1,13 +1,21 @@
 import os
+import posixpath
 import threading
 import time
 import sys
 import subprocess
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, TclError
 from tkinter.simpledialog import askstring
-from models.ftpclient_model import FTPClientManager
+from models.ftpclient_model import FTPClientManager, ENCRYPTED_EXTENSION
+from models.ftp_transfers import FTPTransferManager
+from models.status import QUEUED, RUNNING, RETRYING
+from models.ftp_resume import VERIFY_SIZE
+from models.ftp_sync import FTPSyncManager, UPLOAD, DOWNLOAD
+from crypto.modes import MODE_ECB, mode_from_name
 from views.ftpclient_view import FTPClientView
 
+TRANSFER_POLL_MS = 500
+
 class FTPClientController:
     def __init__(self, view: FTPClientView, main_controller):
         self.view = view
@@ -17,17 +25,28 @@ class FTPClientController:
         self.manager.set_status_callback(self.update_status)
         self.manager.set_log_callback(self.log_message)
 
+        self.transfers = FTPTransferManager()
+        self.transfers.set_log_callback(lambda message: self._post(lambda: self.log_message(message)))
+        self.transfers.set_transfer_callback(self._transfer_changed)
+        self.transfer_uploads = False
+
+        self.sync = FTPSyncManager(self.transfers)
+        self.sync.set_log_callback(lambda message: self._post(lambda: self.log_message(message)))
+        self.sync.set_status_callback(lambda message: self._post(lambda: self.view.set_transfer_status(message)))
+
         self.view.set_browse_directory_command(self.browse_directory)
         self.view.set_connect_command(self.connect_to_server)
         self.view.set_disconnect_command(self.disconnect_from_server)
         self.view.set_clear_log_command(self.clear_log)
         
-        self.view.set_refresh_explorer_command(self.refresh_explorer)
+        self.view.set_refresh_explorer_command(self.reload_explorer)
         self.view.set_open_local_folder_command(self.open_local_folder)
         self.view.set_go_up_button_command(self.navigate_up)
         self.view.set_new_folder_command(self.create_new_folder)
         self.view.set_download_command(self.download_selected)
         self.view.set_upload_command(self.upload_file)
+        self.view.set_upload_encrypted_command(self.upload_encrypted)
+        self.view.set_download_decrypted_command(self.download_decrypted)
         self.view.set_choose_file_command(self.choose_file)
 
         self.view.set_context_menu_commands(
@@ -38,6 +57,12 @@ class FTPClientController:
         )
         
         self.view.set_double_click_handler(self.handle_item_double_click)
+        self.view.set_transfer_commands(self.transfers.cancel, self.clear_transfers)
+        self.view.set_sync_commands(
+            lambda: self.start_sync(dry_run=True),
+            self.start_sync,
+            self.save_sync_report
+        )
 
     def apply_settings(self):
         try:
@@ -103,18 +128,14 @@ class FTPClientController:
         self.view.enable_connect_button()
 
     def check_server_connection(self):
-        if not self.manager.is_connected():
-            return False
-
-        try:
-            # Try to execute a simple command to test if the server is still responsive
-            self.manager.client.voidcmd("NOOP")
-            return True
-        except Exception:
-            # If the command fails, the server is likely disconnected
+        # No NOOP round trip: a dead connection shows up as a failed command, which the
+        # manager records in connection_lost
+        if self.manager.connection_lost:
             self.handle_server_disconnection()
             return False
 
+        return self.manager.is_connected()
+
     def handle_server_disconnection(self):
         if self.manager.connected:
             self.log_message("Server connection lost. The server may have been shut down.")
@@ -122,10 +143,11 @@ class FTPClientController:
             
 
             self.manager.connected = False
+            self.manager.connection_lost = False
             self.manager.client = None
+            self.manager.invalidate_listing()
             
-            for item in self.view.file_explorer.get_children():
-                self.view.file_explorer.delete(item)
+            self.view.clear_file_explorer()
                 
             messagebox.showwarning("Connection Lost", 
                                 "Connection to the FTP server was lost. The server may have been shut down.")
@@ -138,8 +160,7 @@ class FTPClientController:
         self.manager.disconnect()
         self.update_status("Status: Disconnected")
         
-        for item in self.view.file_explorer.get_children():
-            self.view.file_explorer.delete(item)
+        self.view.clear_file_explorer()
 
     def get_local_directory(self):
         dir = self.view.get_directory()
@@ -199,17 +220,25 @@ class FTPClientController:
             self.view.directory_var.set(directory)
             self.log_message(f"Local directory changed to: {directory}")
 
-    def refresh_explorer(self):
+    def reload_explorer(self):
+        self.refresh_explorer(refresh=True)
+    
+    def refresh_explorer(self, refresh=False):
         if not self.check_server_connection():
             messagebox.showinfo("Info", "Not connected to a server")
             return
         
         try:
-            files_data = self.manager.list_remote_files()
+            files_data = self.manager.list_remote_files(refresh)
+            if self.manager.connection_lost:
+                self.handle_server_disconnection()
+                return
+            
             current_dir = self.manager.get_remote_directory()
             self.view.update_remote_path(current_dir)
-            self.view.update_file_explorer(files_data)
-            self.log_message(f"Refreshed file explorer for {current_dir}")
+            self.view.update_file_explorer(files_data, current_dir)
+            if refresh:
+                self.log_message(f"Refreshed file explorer for {current_dir}")
         except Exception as e:
             self.log_message(f"Error refreshing explorer: {str(e)}")
     
@@ -256,23 +285,38 @@ class FTPClientController:
             local_directory = self.get_local_directory()
             local_path = os.path.join(local_directory, name)
             
-            if self.manager.download_file(name, local_path):
+            if self.manager.download_file(name, local_path, *self.get_resume_settings()):
                 messagebox.showinfo("Success", f"File downloaded to {local_path}")
         except Exception as e:
             self.log_message(f"Error downloading file: {str(e)}")
             messagebox.showerror("Error", str(e))
     
     def download_selected(self):
+        self._queue_downloads()
+    
+    def download_decrypted(self):
+        key, _ = self.get_encryption_settings()
+        if key:
+            self._queue_downloads(key)
+    
+    def _queue_downloads(self, key=None):
         if not self.check_server_connection():
             messagebox.showinfo("Info", "Not connected to a server")
             return
             
+        if self.sync.is_running():
+            messagebox.showinfo("Info", "Wait for the sync to finish before queueing transfers")
+            return
+            
         selected_items = self.view.file_explorer.selection()
         if not selected_items:
             messagebox.showinfo("Info", "No files selected")
             return
             
-        success_count = 0
+        local_directory = self.get_local_directory()
+        remote_directory = self.manager.get_remote_directory()
+        added = []
+        
         for item_id in selected_items:
             item = self.view.file_explorer.item(item_id)
             name = item['text'].strip()
@@ -281,41 +325,191 @@ class FTPClientController:
             if not tags or 'folder' in tags:
                 continue  # Skip folders
                 
-            local_directory = self.get_local_directory()
-            local_path = os.path.join(local_directory, name)
-            
-            if self.manager.download_file(name, local_path):
-                success_count += 1
+            local_name = name
+            if key:
+                local_name = name[:-len(ENCRYPTED_EXTENSION)] if name.endswith(ENCRYPTED_EXTENSION) else name + ".decrypted"
                 
-        if success_count > 0:
-            messagebox.showinfo("Success", f"Downloaded {success_count} file(s)")
-        else:
+            added.append(self.transfers.add_download(posixpath.join(remote_directory, name),
+                                                     os.path.join(local_directory, local_name), key))
+            
+        if not added:
             messagebox.showinfo("Info", "No files were downloaded")
+            return
+            
+        self._start_transfers(added)
     
     def upload_file(self):
+        self._queue_uploads()
+    
+    def upload_encrypted(self):
+        key, mode = self.get_encryption_settings()
+        if key:
+            self._queue_uploads(key, mode)
+    
+    def _queue_uploads(self, key=None, mode=None):
         if not self.check_server_connection():
             messagebox.showinfo("Info", "Not connected to a server")
             return
             
+        if self.sync.is_running():
+            messagebox.showinfo("Info", "Wait for the sync to finish before queueing transfers")
+            return
+            
         local_directory = self.get_local_directory()
-        file_path = filedialog.askopenfilename(
-            title="Select File to Upload",
+        file_paths = filedialog.askopenfilenames(
+            title="Select Files to Encrypt and Upload" if key else "Select Files to Upload",
             initialdir=local_directory
         )
         
-        if not file_path:
+        if not file_paths:
             return
             
-        try:
+        remote_directory = self.manager.get_remote_directory()
+        added = []
+        
+        for file_path in file_paths:
             filename = os.path.basename(file_path)
-            if self.manager.upload_file(file_path, filename):
-                self.refresh_explorer()
-                messagebox.showinfo("Success", f"Uploaded {filename}")
+            if key:
+                filename += ENCRYPTED_EXTENSION
+                added.append(self.transfers.add_upload(file_path, posixpath.join(remote_directory, filename), key, mode))
             else:
-                messagebox.showerror("Error", "Failed to upload file")
+                added.append(self.transfers.add_upload(file_path, posixpath.join(remote_directory, filename)))
+                
+        self.transfer_uploads = True
+        self._start_transfers(added)
+    
+    def _start_transfers(self, added):
+        self.view.update_transfers([self._transfer_row(transfer) for transfer in added])
+        
+        if self.transfers.is_running():
+            self.log_message(f"Queued {len(added)} transfer(s); they start when the current batch finishes")
+            return
+            
+        resume, verify = self.get_resume_settings()
+        self.transfers.configure(self.manager.host, self.manager.port, self.manager.username,
+                                 self.manager.password, self.view.get_transfer_connections(), resume, verify)
+        if self.transfers.start():
+            self.view.parent.after(TRANSFER_POLL_MS, self._poll_transfers)
+    
+    def start_sync(self, dry_run=False):
+        if not self.check_server_connection():
+            messagebox.showinfo("Info", "Not connected to a server")
+            return
+            
+        if self.sync.is_running() or self.transfers.is_running():
+            messagebox.showinfo("Info", "Transfers are already running")
+            return
+            
+        direction = UPLOAD if self.view.get_sync_upload() else DOWNLOAD
+        key, mode = None, None
+        if direction == UPLOAD and self.view.get_sync_encrypt():
+            key, mode = self.get_encryption_settings()
+            if not key:
+                return
+                
+        try:
+            resume, verify = self.get_resume_settings()
+            self.transfers.configure(self.manager.host, self.manager.port, self.manager.username,
+                                     self.manager.password, self.view.get_transfer_connections(), resume, verify)
+            self.sync.configure(self.manager.host, self.manager.port, self.manager.username, self.manager.password,
+                                self.get_local_directory(), self.manager.get_remote_directory(), direction,
+                                key, mode or MODE_ECB)
         except Exception as e:
-            self.log_message(f"Error uploading file: {str(e)}")
             messagebox.showerror("Error", str(e))
+            return
+            
+        if self.sync.start(dry_run):
+            self.transfer_uploads = direction == UPLOAD and not dry_run
+            self.view.parent.after(TRANSFER_POLL_MS, self._poll_sync)
+    
+    def _poll_sync(self):
+        if self.sync.is_running():
+            if self.transfers.is_running():
+                self._show_transfer_summary()
+            self.view.parent.after(TRANSFER_POLL_MS, self._poll_sync)
+            return
+            
+        if self.sync.actions and not self.sync.dry_run:
+            self._show_transfer_summary()
+        if self.transfer_uploads and self.manager.is_connected():
+            self.transfer_uploads = False
+            self.manager.invalidate_listing()
+            self.refresh_explorer()
+    
+    def save_sync_report(self):
+        if not self.sync.start_time:
+            messagebox.showinfo("Info", "Run a sync or dry run first")
+            return
+            
+        path = filedialog.asksaveasfilename(title="Save sync report", defaultextension=".json",
+                                            filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+            
+        try:
+            self.sync.write_report(path)
+            messagebox.showinfo("Success", f"Report saved to: {path}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not save report: {str(e)}")
+    
+    def get_resume_settings(self):
+        # (resume partial files, bytes of overlap to verify before resuming)
+        return self.view.get_transfer_resume(), VERIFY_SIZE if self.view.get_transfer_verify() else 0
+    
+    def _poll_transfers(self):
+        # Aggregate throughput is refreshed on a timer rather than per chunk
+        summary = self._show_transfer_summary()
+        
+        if self.transfers.is_running():
+            self.view.parent.after(TRANSFER_POLL_MS, self._poll_transfers)
+            return
+            
+        if self.transfer_uploads and self.manager.is_connected():
+            self.transfer_uploads = False
+            self.manager.invalidate_listing()
+            self.refresh_explorer()
+            
+        if summary[QUEUED] and not self.sync.is_running() and self.transfers.start():
+            self.view.parent.after(TRANSFER_POLL_MS, self._poll_transfers)
+    
+    def _show_transfer_summary(self):
+        summary = self.transfers.summary()
+        active = summary[RUNNING] + summary[RETRYING]
+        self.view.set_transfer_status(f"{summary['done']}/{summary['total']} done, {active} active, "
+                                      f"{summary['failed']} failed, {summary['throughput'] / 1e6:.2f} MB/s")
+        return summary
+    
+    def clear_transfers(self):
+        finished = [str(id(transfer)) for transfer in self.transfers.transfers
+                    if transfer.status not in (QUEUED, RUNNING, RETRYING)]
+        self.transfers.clear_finished()
+        self.view.remove_transfers(finished)
+    
+    def _transfer_changed(self, transfer):
+        row = self._transfer_row(transfer)
+        self._post(lambda: self.view.update_transfers([row]))
+    
+    def _transfer_row(self, transfer):
+        return (str(id(transfer)), transfer.name(), transfer.direction, transfer.status,
+                transfer.transferred, transfer.size, transfer.speed())
+    
+    def _post(self, callback):
+        try:
+            self.view.parent.after(0, callback)
+        except (RuntimeError, TclError):
+            # The window is gone; stop the transfers instead of writing to a dead view
+            self.transfers.cancel()
+    
+    def get_encryption_settings(self):
+        # Key and mode come from the Encryption tab
+        encryption_view = self.main_controller.encryption_controller.view
+        key = encryption_view.get_encryption_key()
+        
+        if len(key.encode('utf-8')) not in (16, 24, 32):
+            messagebox.showerror("Error", "Enter a 16, 24 or 32 byte key in the Encryption tab first")
+            return None, None
+            
+        return key, mode_from_name(encryption_view.get_mode())
     
     def delete_remote_file(self, items):
         if not self.check_server_connection() or not items:
@@ -392,7 +586,7 @@ class FTPClientController:
             local_directory = self.get_local_directory()
             local_path = os.path.join(local_directory, name)
             
-            if self.manager.download_file(name, local_path):
+            if self.manager.download_file(name, local_path, *self.get_resume_settings()):
                 messagebox.showinfo("Success", f"File downloaded to {local_path}, now switching to encryption tab")
                 self.view.main_view.notebook.select(self.view.main_view.encryption_tab)
                 self.main_controller.encryption_controller.browse_file(local_path)
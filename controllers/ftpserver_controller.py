@@ -5,6 +5,7 @@ import subprocess
 from tkinter import filedialog, messagebox
 from tkinter.simpledialog import askstring
 from models.ftp_model import FTPServerManager
+from models.file_explorer import ExplorerModel
 from views.ftpserver_view import FTPServerView
 
 class FTPServerController:
@@ -15,13 +16,16 @@ class FTPServerController:
         self.manager = FTPServerManager()
         self.manager.set_status_callback(self.update_status)
         self.manager.set_log_callback(self.log_message)
+        
+        self.explorer = ExplorerModel()
+        self.explorer.set_error_callback(lambda name, e: self.log_message(f"Error accessing {name}: {str(e)}"))
 
         self.view.set_browse_directory_command(self.browse_directory)
         self.view.set_start_server_command(self.start_server)
         self.view.set_stop_server_command(self.stop_server)
         self.view.set_clear_log_command(self.clear_log)
         
-        self.view.set_refresh_explorer_command(self.refresh_explorer)
+        self.view.set_refresh_explorer_command(self.reload_explorer)
         self.view.set_open_folder_command(self.open_folder)
         self.view.set_go_up_button_command(self.navigate_up)
         self.view.set_new_folder_command(self.create_new_folder)
@@ -45,12 +49,26 @@ class FTPServerController:
                 self.view.get_port(),
                 self.view.get_username(),
                 self.view.get_password(),
-                self.view.get_directory()
+                self.view.get_directory(),
+                self.get_storage_key()
             )
             self.log_message("Settings applied successfully")
+            return True
         except Exception as e:
             self.log_message(f"Error: {str(e)}")
             messagebox.showerror("Error", str(e))
+            return False
+
+    def get_storage_key(self):
+        if not self.view.get_encrypt_storage():
+            return None
+        
+        # Stored files use the key from the Encryption tab
+        key = self.main_controller.encryption_controller.view.get_encryption_key()
+        if len(key.encode('utf-8')) not in (16, 24, 32):
+            raise ValueError("Encrypted storage needs a 16, 24 or 32 byte key in the Encryption tab")
+        
+        return key
 
     def start_server(self):
         if self.manager.is_running():
@@ -58,7 +76,8 @@ class FTPServerController:
             return
 
         try:
-            self.apply_settings()
+            if not self.apply_settings():
+                return
             if self.manager.start_server():
                 self.update_status("Server Status: Running")
                 messagebox.showinfo("Success", "FTP Server started successfully")
@@ -270,7 +289,10 @@ class FTPServerController:
                 self.log_message(f"Error renaming: {str(e)}")
                 messagebox.showerror("Error", f"Could not rename: {str(e)}")
 
-    def refresh_explorer(self):
+    def reload_explorer(self):
+        self.refresh_explorer(refresh=True)
+
+    def refresh_explorer(self, refresh=False):
         directory = self.view.get_directory()
         if not os.path.exists(directory):
             try:
@@ -283,21 +305,7 @@ class FTPServerController:
         self.view.current_path_var.set(directory)
         
         try:
-            file_data = []
-            for item in os.listdir(directory):
-                item_path = os.path.join(directory, item)
-                try:
-                    size = os.path.getsize(item_path)
-                    modified = time.strftime("%Y-%m-%d %H:%M:%S", 
-                        time.localtime(os.path.getmtime(item_path)))
-                    is_dir = os.path.isdir(item_path)
-                    file_data.append((item, is_dir, size, modified))
-                except Exception as e:
-                    self.log_message(f"Error accessing {item}: {str(e)}")
-            
-            # Sort directories first, then files
-            file_data.sort(key=lambda x: (not x[1], x[0].lower()))
-            
+            file_data = self.explorer.list_directory(directory, refresh)
             self.view.update_file_explorer(directory, file_data)
         except Exception as e:
             self.log_message(f"Error refreshing explorer: {str(e)}")
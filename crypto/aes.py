@@ -1,7 +1,22 @@
+import os
 from .aes_utils import *
+from .aes_ttable import encrypt_block_ttable, decrypt_block_ttable, inv_key_expansion
+from . import aes_numpy
+from .key_cache import key_schedule_cache
+from .stream import create_encryptor, create_decryptor, DEFAULT_CHUNK_SIZE
+from .modes import MODE_ECB, MODE_CTR, MODE_CBC, MODE_NAMES, BLOCK_SIZE, ctr_crypt, cbc_decrypt
+from .base64_codec import Base64Writer, Base64Reader
+from .tracing import NULL_TRACER
+from . import mapped
+from .container import (
+    ContainerHeader, UNKNOWN_LENGTH, HEADER_SIZE,
+    read_header, write_header, patch_length, remaining_length
+)
+
+ENGINES = ("reference", "ttable", "numpy")
 
 class AES:
-    def __init__(self, key):
+    def __init__(self, key, engine="reference", round_keys=None):
         if isinstance(key, bytes):
             self.key = key
         else:
@@ -18,7 +33,30 @@ class AES:
         else:
             raise ValueError("Key must be 16, 24 or 32 bytes")
 
-        self.round_keys = self.key_expansion(self.key)
+        if engine not in ENGINES:
+            raise ValueError(f"Engine must be one of: {', '.join(ENGINES)}")
+
+        # The NumPy batch engine is optional; without NumPy fall back to the reference path
+        if engine == "numpy" and not aes_numpy.HAS_NUMPY:
+            engine = "reference"
+
+        self.engine = engine
+        self.tracer = NULL_TRACER
+        # round_keys lets callers that already hold the schedule (e.g. worker processes) skip expansion
+        if round_keys is None:
+            round_keys = key_schedule_cache.get_round_keys(self.key, self.key_expansion)
+        self.round_keys = round_keys
+
+        if self.engine == "ttable":
+            self.dec_round_keys = key_schedule_cache.get_inverse_round_keys(
+                self.key, self.round_keys, lambda rk: inv_key_expansion(rk, self.rounds)
+            )
+        elif self.engine == "numpy":
+            self.round_keys_array = aes_numpy.round_keys_to_array(self.round_keys, self.rounds)
+
+    def set_tracer(self, tracer):
+        # Records read/pad/split/rounds/encode/write spans for the stream and string methods
+        self.tracer = tracer or NULL_TRACER
 
     def key_expansion(self, key):
         key = list(key)
@@ -52,107 +90,299 @@ class AES:
 
         return words
                         
-    def encrypt_block(self, block):
-        state = [
-            [0, 0, 0, 0], 
-            [0, 0, 0, 0],
-            [0, 0, 0, 0], 
-            [0, 0, 0, 0]   
-        ]
+    def encrypt_block(self, block, state=None):
+        # state: optional preallocated 16-byte bytearray reused across blocks
+        if state is None:
+            state = bytearray(16)
 
-        for col in range (4):
-            for row in range(4):
-                state[row][col] = block[col * 4 + row]
+        if self.engine == "ttable":
+            return encrypt_block_ttable(block, self.round_keys, self.rounds, state)
 
-        state = add_round_key(state, 0, self.round_keys)
+        state[:] = block
+
+        add_round_key(state, 0, self.round_keys)
 
         for round_idx in range(1, self.rounds):
-            state = sub_bytes(state)
-            state = shift_rows(state)
-            state = mix_columns(state)
-            state = add_round_key(state, round_idx, self.round_keys)
+            sub_bytes(state)
+            shift_rows(state)
+            mix_columns(state)
+            add_round_key(state, round_idx, self.round_keys)
+
+        sub_bytes(state)
+        shift_rows(state)
+        add_round_key(state, self.rounds, self.round_keys)
+
+        return state
+
+    def decrypt_block(self, block, state=None):
+        if state is None:
+            state = bytearray(16)
 
-        state = sub_bytes(state)
-        state = shift_rows(state)
-        state = add_round_key(state, self.rounds, self.round_keys)
+        if self.engine == "ttable":
+            return decrypt_block_ttable(block, self.dec_round_keys, self.rounds, state)
 
-        result = bytearray(16)
+        state[:] = block
 
-        for col in range(4):
-            for row in range(4):
-                result[col * 4 + row] = state[row][col]
+        add_round_key(state, self.rounds, self.round_keys)
 
-        return result
+        for round_idx in range(self.rounds - 1, 0, -1):
+            inv_shift_rows(state)
+            inv_sub_bytes(state)
+            add_round_key(state, round_idx, self.round_keys)
+            inv_mix_columns(state)
 
-    def decrypt_block(self, block):
-        state = [
-            [0, 0, 0, 0], 
-            [0, 0, 0, 0],
-            [0, 0, 0, 0], 
-            [0, 0, 0, 0]   
-        ]
+        inv_shift_rows(state)
+        inv_sub_bytes(state)
+        add_round_key(state, 0, self.round_keys)
 
-        for col in range (4):
-            for row in range(4):
-                state[row][col] = block[col * 4 + row]
+        return state
 
-        state = add_round_key(state, self.rounds, self.round_keys)
+    # encrypt_blocks_into/decrypt_blocks_into are the single bulk hook: encrypt_blocks,
+    # encrypt/decrypt, the stream modes and the memory-mapped paths all end up here, so
+    # subclasses (profiling, process pool) only override these two methods.
+    def encrypt_blocks_into(self, data, out):
+        # ECB from one buffer into another (e.g. memory maps) without per-block copies
+        return self._crypt_blocks_into(data, out, self.encrypt_block, False)
 
-        for round_idx in range(self.rounds -1 , 0, -1):
-            state = inv_shift_rows(state)
-            state = inv_sub_bytes(state)
-            state = add_round_key(state, round_idx, self.round_keys)
-            state = inv_mix_columns(state)
+    def decrypt_blocks_into(self, data, out):
+        return self._crypt_blocks_into(data, out, self.decrypt_block, True)
 
+    def _block_buffers(self, data, out):
+        # Byte views of a block-aligned input and an output buffer at least as long
+        src = memoryview(data).cast('B')
+        dst = memoryview(out).cast('B')
 
-        state = inv_shift_rows(state)
-        state = inv_sub_bytes(state)
-        state = add_round_key(state, 0, self.round_keys)
+        if len(src) % 16:
+            raise ValueError("Data length must be a multiple of the block size")
+        if len(dst) < len(src):
+            raise ValueError("Output buffer is smaller than the input")
 
-        result = bytearray(16)
+        return src, dst
 
-        for col in range(4):
-            for row in range(4):
-                result[col + row * 4] = state[col][row]
+    def _crypt_blocks_into(self, data, out, crypt_block, decrypt):
+        src, dst = self._block_buffers(data, out)
+        length = len(src)
 
-        return result
+        if self.engine == "numpy":
+            aes_numpy.crypt_into(src, dst, self.round_keys_array, self.rounds, decrypt)
+            return out
+
+        state = bytearray(16)
+
+        for i in range(0, length, 16):
+            dst[i:i + 16] = crypt_block(src[i:i + 16], state)
+
+        return out
+
+    def encrypt_blocks(self, data):
+        # ECB over block-aligned data (any buffer-protocol object), returns a bytearray of the same length
+        src = memoryview(data).cast('B')
+        return self.encrypt_blocks_into(src, bytearray(len(src)))
+
+    def decrypt_blocks(self, data):
+        src = memoryview(data).cast('B')
+        return self.decrypt_blocks_into(src, bytearray(len(src)))
 
     def encrypt(self, plaintext):
-        if isinstance(plaintext, bytes):
-            plaintext_bytes = plaintext
-        else:
-            plaintext_bytes = plaintext.encode('utf-8')
+        # plaintext: str (UTF-8 encoded) or any buffer-protocol object
+        if isinstance(plaintext, str):
+            plaintext = plaintext.encode('utf-8')
+
+        tracer = self.tracer
+        data = memoryview(plaintext).cast('B')
+        aligned = len(data) - len(data) % 16
 
-        padded = pad(plaintext_bytes)
+        # Full blocks are encrypted straight from the input; only the last block is padded
+        ciphertext = bytearray(aligned + 16)
 
-        blocks = []
-        block_size = 16
-        
-        for i in range(0, len(padded), block_size):
-            blocks.append(padded[i:i + block_size])
+        with tracer.span("rounds", aligned, aligned // 16):
+            self.encrypt_blocks_into(data[:aligned], ciphertext)
 
-        ciphertext = bytearray()
+        with tracer.span("pad", len(data) - aligned):
+            tail = pad(bytes(data[aligned:]))
 
-        for block in blocks:
-            encrypted_block = self.encrypt_block(block)
-            ciphertext.extend(encrypted_block)
+        with tracer.span("rounds", 16, 1):
+            self.encrypt_blocks_into(tail, memoryview(ciphertext)[aligned:])
 
-        return base64_encode(ciphertext)
+        with tracer.span("encode", len(ciphertext)):
+            return base64_encode(ciphertext)
 
     def decrypt(self, ciphertext):
-        ciphertext_bytes = base64_decode(ciphertext)
+        tracer = self.tracer
 
-        blocks = []
-        block_size = 16
-        
-        for i in range(0, len(ciphertext_bytes), block_size):
-            blocks.append(ciphertext_bytes[i:i + block_size])
+        with tracer.span("decode", len(ciphertext)):
+            ciphertext_bytes = base64_decode(ciphertext)
 
-        plaintext = bytearray()
+        with tracer.span("rounds", len(ciphertext_bytes), len(ciphertext_bytes) // 16):
+            plaintext = self.decrypt_blocks(ciphertext_bytes)
+
+        with tracer.span("pad", len(plaintext)):
+            # Strip the padding in place rather than copying the whole plaintext
+            if plaintext:
+                del plaintext[len(plaintext) - plaintext[-1]:]
+            plaintext = plaintext.decode('utf-8')
 
-        for block in blocks:
-            decrypted_block = self.decrypt_block(block)
-            plaintext.extend(decrypted_block)
-        
-        plaintext = unpad(plaintext).decode('utf-8')
         return plaintext
+
+    def encrypt_stream(self, src, dst, chunk_size=DEFAULT_CHUNK_SIZE, header=True, armor=False,
+                       mode=MODE_ECB, iv=None):
+        # Reads src in fixed-size chunks and writes a container (header + ciphertext) to dst.
+        # armor=True base64-encodes the output. Returns the number of plaintext bytes.
+        if armor:
+            writer = Base64Writer(dst, self.tracer)
+            total = self.encrypt_stream(src, writer, chunk_size, header=header, mode=mode, iv=iv)
+            writer.finish()
+            return total
+
+        if mode not in MODE_NAMES:
+            raise ValueError(f"Unsupported mode: {mode}")
+
+        if mode in (MODE_CTR, MODE_CBC) and iv is None:
+            iv = os.urandom(BLOCK_SIZE)
+
+        encryptor = create_encryptor(self, mode, iv)
+        tracer = self.tracer
+        total = 0
+
+        if header:
+            header_start = dst.tell() if hasattr(dst, 'tell') else 0
+            original_length = remaining_length(src)
+            write_header(dst, ContainerHeader(
+                len(self.key), mode, iv or bytes(BLOCK_SIZE), chunk_size,
+                UNKNOWN_LENGTH if original_length is None else original_length, self.key_check_value()
+            ))
+
+        while True:
+            with tracer.span("read") as span:
+                chunk = src.read(chunk_size)
+                span.count(len(chunk))
+
+            if not chunk:
+                break
+
+            total += len(chunk)
+            data = encryptor.update(chunk)
+
+            with tracer.span("write", len(data)):
+                dst.write(data)
+
+        data = encryptor.finalize()
+
+        with tracer.span("write", len(data)):
+            dst.write(data)
+
+        if header and original_length is None:
+            patch_length(dst, header_start, total)
+
+        return total
+
+    def decrypt_stream(self, src, dst, chunk_size=DEFAULT_CHUNK_SIZE, header=True, armor=False,
+                       mode=MODE_ECB, iv=None):
+        # mode and iv are only used for headerless input; otherwise they come from the container
+        if armor:
+            src = Base64Reader(src, tracer=self.tracer)
+
+        if header:
+            container = read_header(src)
+            self.check_header(container)
+            mode = container.mode
+            iv = container.iv
+
+        decryptor = create_decryptor(self, mode, iv)
+        tracer = self.tracer
+        total = 0
+
+        while True:
+            with tracer.span("read") as span:
+                chunk = src.read(chunk_size)
+                span.count(len(chunk))
+
+            if not chunk:
+                break
+
+            data = decryptor.update(chunk)
+            total += len(data)
+
+            with tracer.span("write", len(data)):
+                dst.write(data)
+
+        data = decryptor.finalize()
+        total += len(data)
+
+        with tracer.span("write", len(data)):
+            dst.write(data)
+
+        if header and container.has_length() and total != container.original_length:
+            raise ValueError("Decrypted length does not match the container header")
+
+        return total
+
+    def encrypt_file(self, src_path, dst_path, mode=MODE_ECB, iv=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+        # Binary container via memory maps; progress(bytes_done) is called after every chunk.
+        # Returns the number of plaintext bytes.
+        if mode not in MODE_NAMES:
+            raise ValueError(f"Unsupported mode: {mode}")
+
+        if mode in (MODE_CTR, MODE_CBC) and iv is None:
+            iv = os.urandom(BLOCK_SIZE)
+
+        return mapped.encrypt_file(self, src_path, dst_path, mode, iv, chunk_size, progress)
+
+    def decrypt_file(self, src_path, dst_path, chunk_size=None, progress=None):
+        # Counterpart of encrypt_file for binary containers; the output file is preallocated
+        # at the plaintext length found from the final block's padding
+        return mapped.decrypt_file(self, src_path, dst_path, chunk_size, progress)
+
+    def decrypt_range(self, src, offset, length):
+        # Decrypts plaintext bytes [offset, offset + length) of a seekable binary container,
+        # reading only the ciphertext blocks that cover the range
+        container_start = src.tell()
+        container = read_header(src)
+        self.check_header(container)
+
+        data_start = container_start + HEADER_SIZE
+
+        if container.has_length():
+            plaintext_length = container.original_length
+        elif container.mode == MODE_CTR:
+            plaintext_length = src.seek(0, os.SEEK_END) - data_start
+        else:
+            raise ValueError("Random access to padded data needs the original length in the header")
+
+        end = min(offset + length, plaintext_length)
+        if offset < 0 or offset >= end:
+            return b''
+
+        first_block = offset // BLOCK_SIZE
+        last_block = (end - 1) // BLOCK_SIZE
+
+        if container.mode == MODE_CBC and first_block > 0:
+            # CBC needs the ciphertext block before the range as its IV
+            src.seek(data_start + (first_block - 1) * BLOCK_SIZE)
+            iv = src.read(BLOCK_SIZE)
+        else:
+            src.seek(data_start + first_block * BLOCK_SIZE)
+            iv = container.iv
+
+        ciphertext = src.read((last_block - first_block + 1) * BLOCK_SIZE)
+
+        if container.mode == MODE_CTR:
+            plaintext = ctr_crypt(self, iv, first_block * BLOCK_SIZE, ciphertext)
+        elif container.mode == MODE_CBC:
+            plaintext = cbc_decrypt(self, iv, ciphertext)
+        else:
+            plaintext = self.decrypt_blocks(ciphertext)
+
+        skip = offset - first_block * BLOCK_SIZE
+        return bytes(plaintext[skip:skip + end - offset])
+
+    def key_check_value(self):
+        # First byte of the encrypted zero block, stored in container headers so a wrong key of
+        # the right size is caught up front (in 255 of 256 cases); never 0, which means "absent"
+        return self.encrypt_block(bytes(16))[0] or 1
+
+    def check_header(self, container):
+        if container.key_size != len(self.key):
+            raise ValueError(f"File was encrypted with AES-{container.key_size * 8}, key is AES-{len(self.key) * 8}")
+        if container.key_check and container.key_check != self.key_check_value():
+            raise ValueError("File was encrypted with a different key")
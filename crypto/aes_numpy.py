@@ -0,0 +1,136 @@
+from time import perf_counter_ns
+from .aes_utils import sbox, inv_sbox
+from .gf_tables import mul2, mul3, mul9, mul11, mul13, mul14
+
+# Optional batch engine: runs every round on an N x 16 uint8 array of blocks at once.
+# Blocks use the same column-major byte order as the flat state (block[col * 4 + row]).
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+BATCH_BLOCKS = 65536 # 1 MB of blocks per batch bounds the temporary arrays
+
+if HAS_NUMPY:
+    _sbox = np.array(sbox, dtype=np.uint8)
+    _inv_sbox = np.array(inv_sbox, dtype=np.uint8)
+
+    _mul2 = np.frombuffer(mul2, dtype=np.uint8)
+    _mul3 = np.frombuffer(mul3, dtype=np.uint8)
+    _mul9 = np.frombuffer(mul9, dtype=np.uint8)
+    _mul11 = np.frombuffer(mul11, dtype=np.uint8)
+    _mul13 = np.frombuffer(mul13, dtype=np.uint8)
+    _mul14 = np.frombuffer(mul14, dtype=np.uint8)
+
+    # ShiftRows as a gather: new[col][row] = old[(col + row) % 4][row]
+    _shift = np.array([((col + row) % 4) * 4 + row for col in range(4) for row in range(4)])
+    _inv_shift = np.array([((col - row) % 4) * 4 + row for col in range(4) for row in range(4)])
+
+def round_keys_to_array(round_keys, rounds):
+    rk = np.zeros((rounds + 1, 16), dtype=np.uint8)
+
+    for round_idx in range(rounds + 1):
+        for col in range(4):
+            word = round_keys[round_idx * 4 + col]
+
+            for row in range(4):
+                rk[round_idx, col * 4 + row] = (word >> (24 - row * 8)) & 0xFF
+
+    return rk
+
+def _mix_columns(state):
+    s = state.reshape(-1, 4, 4)
+    a, b, c, d = s[:, :, 0], s[:, :, 1], s[:, :, 2], s[:, :, 3]
+
+    out = np.empty_like(s)
+    out[:, :, 0] = _mul2[a] ^ _mul3[b] ^ c ^ d
+    out[:, :, 1] = a ^ _mul2[b] ^ _mul3[c] ^ d
+    out[:, :, 2] = a ^ b ^ _mul2[c] ^ _mul3[d]
+    out[:, :, 3] = _mul3[a] ^ b ^ c ^ _mul2[d]
+
+    return out.reshape(-1, 16)
+
+def _inv_mix_columns(state):
+    s = state.reshape(-1, 4, 4)
+    a, b, c, d = s[:, :, 0], s[:, :, 1], s[:, :, 2], s[:, :, 3]
+
+    out = np.empty_like(s)
+    out[:, :, 0] = _mul14[a] ^ _mul11[b] ^ _mul13[c] ^ _mul9[d]
+    out[:, :, 1] = _mul9[a] ^ _mul14[b] ^ _mul11[c] ^ _mul13[d]
+    out[:, :, 2] = _mul13[a] ^ _mul9[b] ^ _mul14[c] ^ _mul11[d]
+    out[:, :, 3] = _mul11[a] ^ _mul13[b] ^ _mul9[c] ^ _mul14[d]
+
+    return out.reshape(-1, 16)
+
+def encrypt_blocks(blocks, rk, rounds, timings=None):
+    # timings: optional per-round nanosecond totals for the whole batch (round profiler)
+    start = perf_counter_ns() if timings is not None else 0
+    state = blocks ^ rk[0]
+
+    if timings is not None:
+        start = _lap(timings, 0, start)
+
+    for round_idx in range(1, rounds):
+        state = _sbox[state[:, _shift]] # SubBytes and ShiftRows commute
+        state = _mix_columns(state)
+        state ^= rk[round_idx]
+
+        if timings is not None:
+            start = _lap(timings, round_idx, start)
+
+    state = _sbox[state[:, _shift]]
+    state ^= rk[rounds]
+
+    if timings is not None:
+        _lap(timings, rounds, start)
+
+    return state
+
+def decrypt_blocks(blocks, rk, rounds, timings=None):
+    start = perf_counter_ns() if timings is not None else 0
+    state = blocks ^ rk[rounds]
+
+    if timings is not None:
+        start = _lap(timings, 0, start)
+
+    for round_idx in range(rounds - 1, 0, -1):
+        state = _inv_sbox[state[:, _inv_shift]]
+        state ^= rk[round_idx]
+        state = _inv_mix_columns(state)
+
+        if timings is not None:
+            start = _lap(timings, rounds - round_idx, start)
+
+    state = _inv_sbox[state[:, _inv_shift]]
+    state ^= rk[0]
+
+    if timings is not None:
+        _lap(timings, rounds, start)
+
+    return state
+
+def _lap(timings, index, start):
+    now = perf_counter_ns()
+    timings[index] += now - start
+    return now
+
+def crypt_bytes(data, rk, rounds, decrypt=False, timings=None):
+    # data: block-aligned bytes-like object; returns a bytearray of the same length
+    result = bytearray(len(data))
+    crypt_into(data, result, rk, rounds, decrypt, timings)
+    return result
+
+def crypt_into(data, out, rk, rounds, decrypt=False, timings=None):
+    # Writes the result into out, any writable buffer of at least len(data) bytes
+    blocks = np.frombuffer(data, dtype=np.uint8).reshape(-1, 16)
+    target = np.frombuffer(out, dtype=np.uint8, count=blocks.size).reshape(-1, 16)
+    func = decrypt_blocks if decrypt else encrypt_blocks
+
+    for start in range(0, len(blocks), BATCH_BLOCKS):
+        end = start + BATCH_BLOCKS
+        target[start:end] = func(blocks[start:end], rk, rounds, timings)
+
+    return out
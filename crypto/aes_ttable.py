@@ -0,0 +1,177 @@
+import struct
+from time import perf_counter_ns
+from .aes_utils import sbox, inv_sbox
+from .gf_tables import mul2, mul3, mul9, mul11, mul13, mul14
+
+# Round tables combining SubBytes, ShiftRows and MixColumns into one lookup per byte.
+# Each entry is a 32-bit column word, most significant byte = row 0.
+
+_identity = bytes(range(256))
+
+def _build_tables(box, coefficients):
+    table0 = [0] * 256
+    m0, m1, m2, m3 = coefficients
+
+    for x in range(256):
+        s = box[x]
+        table0[x] = (m0[s] << 24) | (m1[s] << 16) | (m2[s] << 8) | m3[s]
+
+    # The other three tables are byte rotations of the first
+    table1 = [((w >> 8) | (w << 24)) & 0xFFFFFFFF for w in table0]
+    table2 = [((w >> 8) | (w << 24)) & 0xFFFFFFFF for w in table1]
+    table3 = [((w >> 8) | (w << 24)) & 0xFFFFFFFF for w in table2]
+
+    return table0, table1, table2, table3
+
+te0, te1, te2, te3 = _build_tables(sbox, (mul2, _identity, _identity, mul3))
+td0, td1, td2, td3 = _build_tables(inv_sbox, (mul14, mul9, mul13, mul11))
+
+def inv_key_expansion(round_keys, rounds):
+    # Round keys for the equivalent inverse cipher: InvMixColumns applied to rounds 1..Nr-1
+    dec_round_keys = list(round_keys)
+
+    for i in range(4, rounds * 4):
+        w = round_keys[i]
+        dec_round_keys[i] = (
+            td0[sbox[(w >> 24) & 0xFF]] ^
+            td1[sbox[(w >> 16) & 0xFF]] ^
+            td2[sbox[(w >> 8) & 0xFF]] ^
+            td3[sbox[w & 0xFF]]
+        )
+
+    return dec_round_keys
+
+def encrypt_block_ttable(block, round_keys, rounds, out=None):
+    s0, s1, s2, s3 = struct.unpack('>4I', block)
+
+    s0 ^= round_keys[0]
+    s1 ^= round_keys[1]
+    s2 ^= round_keys[2]
+    s3 ^= round_keys[3]
+
+    k = 4
+    for _ in range(1, rounds):
+        t0 = te0[s0 >> 24] ^ te1[(s1 >> 16) & 0xFF] ^ te2[(s2 >> 8) & 0xFF] ^ te3[s3 & 0xFF] ^ round_keys[k]
+        t1 = te0[s1 >> 24] ^ te1[(s2 >> 16) & 0xFF] ^ te2[(s3 >> 8) & 0xFF] ^ te3[s0 & 0xFF] ^ round_keys[k + 1]
+        t2 = te0[s2 >> 24] ^ te1[(s3 >> 16) & 0xFF] ^ te2[(s0 >> 8) & 0xFF] ^ te3[s1 & 0xFF] ^ round_keys[k + 2]
+        t3 = te0[s3 >> 24] ^ te1[(s0 >> 16) & 0xFF] ^ te2[(s1 >> 8) & 0xFF] ^ te3[s2 & 0xFF] ^ round_keys[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+        k += 4
+
+    # Final round has no MixColumns
+    result = out if out is not None else bytearray(16)
+    struct.pack_into('>4I', result, 0,
+        ((sbox[s0 >> 24] << 24) | (sbox[(s1 >> 16) & 0xFF] << 16) | (sbox[(s2 >> 8) & 0xFF] << 8) | sbox[s3 & 0xFF]) ^ round_keys[k],
+        ((sbox[s1 >> 24] << 24) | (sbox[(s2 >> 16) & 0xFF] << 16) | (sbox[(s3 >> 8) & 0xFF] << 8) | sbox[s0 & 0xFF]) ^ round_keys[k + 1],
+        ((sbox[s2 >> 24] << 24) | (sbox[(s3 >> 16) & 0xFF] << 16) | (sbox[(s0 >> 8) & 0xFF] << 8) | sbox[s1 & 0xFF]) ^ round_keys[k + 2],
+        ((sbox[s3 >> 24] << 24) | (sbox[(s0 >> 16) & 0xFF] << 16) | (sbox[(s1 >> 8) & 0xFF] << 8) | sbox[s2 & 0xFF]) ^ round_keys[k + 3]
+    )
+
+    return result
+
+def decrypt_block_ttable(block, dec_round_keys, rounds, out=None):
+    s0, s1, s2, s3 = struct.unpack('>4I', block)
+
+    k = rounds * 4
+    s0 ^= dec_round_keys[k]
+    s1 ^= dec_round_keys[k + 1]
+    s2 ^= dec_round_keys[k + 2]
+    s3 ^= dec_round_keys[k + 3]
+
+    for _ in range(1, rounds):
+        k -= 4
+        t0 = td0[s0 >> 24] ^ td1[(s3 >> 16) & 0xFF] ^ td2[(s2 >> 8) & 0xFF] ^ td3[s1 & 0xFF] ^ dec_round_keys[k]
+        t1 = td0[s1 >> 24] ^ td1[(s0 >> 16) & 0xFF] ^ td2[(s3 >> 8) & 0xFF] ^ td3[s2 & 0xFF] ^ dec_round_keys[k + 1]
+        t2 = td0[s2 >> 24] ^ td1[(s1 >> 16) & 0xFF] ^ td2[(s0 >> 8) & 0xFF] ^ td3[s3 & 0xFF] ^ dec_round_keys[k + 2]
+        t3 = td0[s3 >> 24] ^ td1[(s2 >> 16) & 0xFF] ^ td2[(s1 >> 8) & 0xFF] ^ td3[s0 & 0xFF] ^ dec_round_keys[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+
+    # Final round has no InvMixColumns
+    result = out if out is not None else bytearray(16)
+    struct.pack_into('>4I', result, 0,
+        ((inv_sbox[s0 >> 24] << 24) | (inv_sbox[(s3 >> 16) & 0xFF] << 16) | (inv_sbox[(s2 >> 8) & 0xFF] << 8) | inv_sbox[s1 & 0xFF]) ^ dec_round_keys[0],
+        ((inv_sbox[s1 >> 24] << 24) | (inv_sbox[(s0 >> 16) & 0xFF] << 16) | (inv_sbox[(s3 >> 8) & 0xFF] << 8) | inv_sbox[s2 & 0xFF]) ^ dec_round_keys[1],
+        ((inv_sbox[s2 >> 24] << 24) | (inv_sbox[(s1 >> 16) & 0xFF] << 16) | (inv_sbox[(s0 >> 8) & 0xFF] << 8) | inv_sbox[s3 & 0xFF]) ^ dec_round_keys[2],
+        ((inv_sbox[s3 >> 24] << 24) | (inv_sbox[(s2 >> 16) & 0xFF] << 16) | (inv_sbox[(s1 >> 8) & 0xFF] << 8) | inv_sbox[s0 & 0xFF]) ^ dec_round_keys[3]
+    )
+
+    return result
+
+# Instrumented variants for the round profiler: same rounds, plus a monotonic timestamp
+# after each one accumulated into timings[round] (nanoseconds)
+
+def encrypt_block_ttable_timed(block, round_keys, rounds, out, timings):
+    clock = perf_counter_ns
+    start = clock()
+
+    s0, s1, s2, s3 = struct.unpack('>4I', block)
+
+    s0 ^= round_keys[0]
+    s1 ^= round_keys[1]
+    s2 ^= round_keys[2]
+    s3 ^= round_keys[3]
+
+    now = clock()
+    timings[0] += now - start
+    start = now
+
+    k = 4
+    for round_idx in range(1, rounds):
+        t0 = te0[s0 >> 24] ^ te1[(s1 >> 16) & 0xFF] ^ te2[(s2 >> 8) & 0xFF] ^ te3[s3 & 0xFF] ^ round_keys[k]
+        t1 = te0[s1 >> 24] ^ te1[(s2 >> 16) & 0xFF] ^ te2[(s3 >> 8) & 0xFF] ^ te3[s0 & 0xFF] ^ round_keys[k + 1]
+        t2 = te0[s2 >> 24] ^ te1[(s3 >> 16) & 0xFF] ^ te2[(s0 >> 8) & 0xFF] ^ te3[s1 & 0xFF] ^ round_keys[k + 2]
+        t3 = te0[s3 >> 24] ^ te1[(s0 >> 16) & 0xFF] ^ te2[(s1 >> 8) & 0xFF] ^ te3[s2 & 0xFF] ^ round_keys[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+        k += 4
+
+        now = clock()
+        timings[round_idx] += now - start
+        start = now
+
+    struct.pack_into('>4I', out, 0,
+        ((sbox[s0 >> 24] << 24) | (sbox[(s1 >> 16) & 0xFF] << 16) | (sbox[(s2 >> 8) & 0xFF] << 8) | sbox[s3 & 0xFF]) ^ round_keys[k],
+        ((sbox[s1 >> 24] << 24) | (sbox[(s2 >> 16) & 0xFF] << 16) | (sbox[(s3 >> 8) & 0xFF] << 8) | sbox[s0 & 0xFF]) ^ round_keys[k + 1],
+        ((sbox[s2 >> 24] << 24) | (sbox[(s3 >> 16) & 0xFF] << 16) | (sbox[(s0 >> 8) & 0xFF] << 8) | sbox[s1 & 0xFF]) ^ round_keys[k + 2],
+        ((sbox[s3 >> 24] << 24) | (sbox[(s0 >> 16) & 0xFF] << 16) | (sbox[(s1 >> 8) & 0xFF] << 8) | sbox[s2 & 0xFF]) ^ round_keys[k + 3]
+    )
+
+    timings[rounds] += clock() - start
+    return out
+
+def decrypt_block_ttable_timed(block, dec_round_keys, rounds, out, timings):
+    clock = perf_counter_ns
+    start = clock()
+
+    s0, s1, s2, s3 = struct.unpack('>4I', block)
+
+    k = rounds * 4
+    s0 ^= dec_round_keys[k]
+    s1 ^= dec_round_keys[k + 1]
+    s2 ^= dec_round_keys[k + 2]
+    s3 ^= dec_round_keys[k + 3]
+
+    now = clock()
+    timings[0] += now - start
+    start = now
+
+    for round_idx in range(1, rounds):
+        k -= 4
+        t0 = td0[s0 >> 24] ^ td1[(s3 >> 16) & 0xFF] ^ td2[(s2 >> 8) & 0xFF] ^ td3[s1 & 0xFF] ^ dec_round_keys[k]
+        t1 = td0[s1 >> 24] ^ td1[(s0 >> 16) & 0xFF] ^ td2[(s3 >> 8) & 0xFF] ^ td3[s2 & 0xFF] ^ dec_round_keys[k + 1]
+        t2 = td0[s2 >> 24] ^ td1[(s1 >> 16) & 0xFF] ^ td2[(s0 >> 8) & 0xFF] ^ td3[s3 & 0xFF] ^ dec_round_keys[k + 2]
+        t3 = td0[s3 >> 24] ^ td1[(s2 >> 16) & 0xFF] ^ td2[(s1 >> 8) & 0xFF] ^ td3[s0 & 0xFF] ^ dec_round_keys[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+
+        now = clock()
+        timings[round_idx] += now - start
+        start = now
+
+    struct.pack_into('>4I', out, 0,
+        ((inv_sbox[s0 >> 24] << 24) | (inv_sbox[(s3 >> 16) & 0xFF] << 16) | (inv_sbox[(s2 >> 8) & 0xFF] << 8) | inv_sbox[s1 & 0xFF]) ^ dec_round_keys[0],
+        ((inv_sbox[s1 >> 24] << 24) | (inv_sbox[(s0 >> 16) & 0xFF] << 16) | (inv_sbox[(s3 >> 8) & 0xFF] << 8) | inv_sbox[s2 & 0xFF]) ^ dec_round_keys[1],
+        ((inv_sbox[s2 >> 24] << 24) | (inv_sbox[(s1 >> 16) & 0xFF] << 16) | (inv_sbox[(s0 >> 8) & 0xFF] << 8) | inv_sbox[s3 & 0xFF]) ^ dec_round_keys[2],
+        ((inv_sbox[s3 >> 24] << 24) | (inv_sbox[(s2 >> 16) & 0xFF] << 16) | (inv_sbox[(s1 >> 8) & 0xFF] << 8) | inv_sbox[s0 & 0xFF]) ^ dec_round_keys[3]
+    )
+
+    timings[rounds] += clock() - start
+    return out
@@ -1,3 +1,6 @@
+from .gf_tables import mul2, mul3, mul9, mul11, mul13, mul14
+from .base64_codec import BASE64_ALPHABET, base64_encode, base64_decode
+
 sbox = [
    0x63, 0x7c, 0x77, 0x7b, 0xf2, 0x6b, 0x6f, 0xc5, 0x30, 0x01, 0x67, 0x2b, 0xfe, 0xd7, 0xab, 0x76,
    0xca, 0x82, 0xc9, 0x7d, 0xfa, 0x59, 0x47, 0xf0, 0xad, 0xd4, 0xa2, 0xaf, 0x9c, 0xa4, 0x72, 0xc0,
@@ -54,73 +57,74 @@ def sub_word(word):
 def xor_rcon(word, rcon):
     return word ^ (rcon << 24)
 
+# State is a flat 16-byte bytearray in column-major order: state[col * 4 + row]
+
 def add_round_key(state, round_idx, round_keys):
+    base = round_idx * 4
+
     for col in range(4):
-        round_key_word = round_keys[round_idx * 4 + col]
+        round_key_word = round_keys[base + col]
+        i = col * 4
 
-        for row in range(4):
-            key_byte = (round_key_word >> (24 - row * 8)) & 0xFF
-                
-            state[row][col] ^= key_byte
+        state[i] ^= (round_key_word >> 24) & 0xFF
+        state[i + 1] ^= (round_key_word >> 16) & 0xFF
+        state[i + 2] ^= (round_key_word >> 8) & 0xFF
+        state[i + 3] ^= round_key_word & 0xFF
 
     return state
 
 def sub_bytes(state):
-    for col in range(4):
-        for row in range(4):
-            state[row][col] = sbox[state[row][col]]
+    for i in range(16):
+        state[i] = sbox[state[i]]
 
     return state
 
 def inv_sub_bytes(state):
-    for col in range(4):
-        for row in range(4):
-            state[row][col] = inv_sbox[state[row][col]]
+    for i in range(16):
+        state[i] = inv_sbox[state[i]]
 
     return state
 
 def shift_rows(state):
-    state[0] = state[0]
-    state[1] = state[1][1:] + state[1][:1]
-    state[2] = state[2][2:] + state[2][:2]
-    state[3] = state[3][3:] + state[3][:3]
-    
+    state[1], state[5], state[9], state[13] = state[5], state[9], state[13], state[1]
+    state[2], state[6], state[10], state[14] = state[10], state[14], state[2], state[6]
+    state[3], state[7], state[11], state[15] = state[15], state[3], state[7], state[11]
+
     return state
 
 def inv_shift_rows(state):
-    state[0] = state[0]
-    state[1] = state[1][-1:] + state[1][:-1]
-    state[2] = state[2][-2:] + state[2][:-2]
-    state[3] = state[3][-3:] + state[3][:-3]
+    state[1], state[5], state[9], state[13] = state[13], state[1], state[5], state[9]
+    state[2], state[6], state[10], state[14] = state[10], state[14], state[2], state[6]
+    state[3], state[7], state[11], state[15] = state[7], state[11], state[15], state[3]
 
     return state
 
 def mix_columns(state):
-    for col in range(4):
-        a = state[0][col]
-        b = state[1][col]
-        c = state[2][col]
-        d = state[3][col]
-        
-        state[0][col] = gmul(a, 2) ^ gmul(b, 3) ^ c ^ d
-        state[1][col] = a ^ gmul(b, 2) ^ gmul(c, 3) ^ d
-        state[2][col] = a ^ b ^ gmul(c, 2) ^ gmul(d, 3)
-        state[3][col] = gmul(a, 3) ^ b ^ c ^ gmul(d, 2)
+    for i in range(0, 16, 4):
+        a = state[i]
+        b = state[i + 1]
+        c = state[i + 2]
+        d = state[i + 3]
+
+        state[i] = mul2[a] ^ mul3[b] ^ c ^ d
+        state[i + 1] = a ^ mul2[b] ^ mul3[c] ^ d
+        state[i + 2] = a ^ b ^ mul2[c] ^ mul3[d]
+        state[i + 3] = mul3[a] ^ b ^ c ^ mul2[d]
 
     return state
-        
+
 def inv_mix_columns(state):
-    for col in range(4):
-        a = state[0][col]
-        b = state[1][col]
-        c = state[2][col]
-        d = state[3][col]
-
-        state[0][col] = gmul(a, 0x0e) ^ gmul(b, 0x0b) ^ gmul(c, 0x0d) ^ gmul(d, 0x09)
-        state[1][col] = gmul(a, 0x09) ^ gmul(b, 0x0e) ^ gmul(c, 0x0b) ^ gmul(d, 0x0d)
-        state[2][col] = gmul(a, 0x0d) ^ gmul(b, 0x09) ^ gmul(c, 0x0e) ^ gmul(d, 0x0b)
-        state[3][col] = gmul(a, 0x0b) ^ gmul(b, 0x0d) ^ gmul(c, 0x09) ^ gmul(d, 0x0e)
-    
+    for i in range(0, 16, 4):
+        a = state[i]
+        b = state[i + 1]
+        c = state[i + 2]
+        d = state[i + 3]
+
+        state[i] = mul14[a] ^ mul11[b] ^ mul13[c] ^ mul9[d]
+        state[i + 1] = mul9[a] ^ mul14[b] ^ mul11[c] ^ mul13[d]
+        state[i + 2] = mul13[a] ^ mul9[b] ^ mul14[c] ^ mul11[d]
+        state[i + 3] = mul11[a] ^ mul13[b] ^ mul9[c] ^ mul14[d]
+
     return state
 
 def gmul(a, b):
@@ -149,44 +153,4 @@ def pad(data):
 def unpad(data):
     padding_len = data[-1]  
 
-    return data[:-padding_len]  
-
-BASE64_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
-
-def base64_encode(data):
-    encoded_str = ""
-    padding = (3 - len(data) % 3) % 3  
-
-    data += b'\x00' * padding  
-
-    for i in range(0, len(data), 3):
-        chunk = (data[i] << 16) | (data[i + 1] << 8) | data[i + 2]
-
-        encoded_str += BASE64_ALPHABET[(chunk >> 18) & 0x3F]
-        encoded_str += BASE64_ALPHABET[(chunk >> 12) & 0x3F]
-        encoded_str += BASE64_ALPHABET[(chunk >> 6) & 0x3F]
-        encoded_str += BASE64_ALPHABET[chunk & 0x3F]
-
-    if padding > 0:
-        encoded_str = encoded_str[:-padding] + "=" * padding
-
-    return encoded_str
-
-def base64_decode(encoded_str):
-    encoded_str = encoded_str.rstrip("=")
-
-    decoded_bytes = bytearray()
-
-    for i in range(0, len(encoded_str), 4):
-        chunk = (BASE64_ALPHABET.index(encoded_str[i]) << 18) | \
-                (BASE64_ALPHABET.index(encoded_str[i + 1]) << 12) | \
-                (BASE64_ALPHABET.index(encoded_str[i + 2]) << 6 if i + 2 < len(encoded_str) else 0) | \
-                (BASE64_ALPHABET.index(encoded_str[i + 3]) if i + 3 < len(encoded_str) else 0)
-
-        decoded_bytes.append((chunk >> 16) & 0xFF)  
-        if i + 2 < len(encoded_str):  
-            decoded_bytes.append((chunk >> 8) & 0xFF)  
-        if i + 3 < len(encoded_str):  
-            decoded_bytes.append(chunk & 0xFF)  
-
-    return bytes(decoded_bytes)  
+    return data[:-padding_len]
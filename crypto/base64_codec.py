@@ -0,0 +1,211 @@
+from .tracing import NULL_TRACER
+
+# Table-driven base64 codec. Output is identical to the original aes_utils implementation:
+# standard alphabet, '=' padding, no line breaks.
+#
+# Instead of looping per 3-byte group, the input is split into byte lanes with extended
+# slices, every per-byte step is a 256-entry bytes.translate table, and lanes are combined
+# with one big-integer OR, so all the per-byte work happens in C.
+
+BASE64_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+_INVALID = 0xFF
+_WHITESPACE = b" \t\r\n"
+
+def _table(func):
+    return bytes(func(i) & 0xFF for i in range(256))
+
+_alphabet = BASE64_ALPHABET.encode('ascii')
+
+# Encode tables: 6-bit value -> character, and the bit fragments of each input byte
+_ENCODE = _table(lambda i: _alphabet[i & 0x3F])
+_HIGH6_CHAR = _table(lambda i: _alphabet[i >> 2])
+_LOW2_SHL4 = _table(lambda i: (i & 0x03) << 4)
+_HIGH4 = _table(lambda i: i >> 4)
+_LOW4_SHL2 = _table(lambda i: (i & 0x0F) << 2)
+_HIGH2 = _table(lambda i: i >> 6)
+_LOW6_CHAR = _table(lambda i: _alphabet[i & 0x3F])
+
+# 256-entry reverse lookup: character -> 6-bit value, anything else -> _INVALID
+_DECODE = bytearray([_INVALID] * 256)
+for _i, _c in enumerate(_alphabet):
+    _DECODE[_c] = _i
+_DECODE = bytes(_DECODE)
+
+_SHL2 = _table(lambda i: i << 2)
+_SHR4 = _table(lambda i: i >> 4)
+_LOW4_SHL4 = _table(lambda i: (i & 0x0F) << 4)
+_SHR2 = _table(lambda i: i >> 2)
+_LOW2_SHL6 = _table(lambda i: (i & 0x03) << 6)
+
+def _or_bytes(a, b):
+    n = len(a)
+    return (int.from_bytes(a, 'big') | int.from_bytes(b, 'big')).to_bytes(n, 'big')
+
+def _encode_groups(data):
+    # data: bytes whose length is a multiple of 3
+    d0 = data[0::3]
+    d1 = data[1::3]
+    d2 = data[2::3]
+
+    out = bytearray(len(d0) * 4)
+    out[0::4] = d0.translate(_HIGH6_CHAR)
+    out[1::4] = _or_bytes(d0.translate(_LOW2_SHL4), d1.translate(_HIGH4)).translate(_ENCODE)
+    out[2::4] = _or_bytes(d1.translate(_LOW4_SHL2), d2.translate(_HIGH2)).translate(_ENCODE)
+    out[3::4] = d2.translate(_LOW6_CHAR)
+
+    return out
+
+def _decode_groups(values):
+    # values: 6-bit values (already translated), length a multiple of 4
+    s0 = values[0::4]
+    s1 = values[1::4]
+    s2 = values[2::4]
+    s3 = values[3::4]
+
+    out = bytearray(len(s0) * 3)
+    out[0::3] = _or_bytes(s0.translate(_SHL2), s1.translate(_SHR4))
+    out[1::3] = _or_bytes(s1.translate(_LOW4_SHL4), s2.translate(_SHR2))
+    out[2::3] = _or_bytes(s2.translate(_LOW2_SHL6), s3)
+
+    return out
+
+def base64_encode_bytes(data):
+    data = bytes(data)
+    remainder = len(data) % 3
+
+    if not remainder:
+        return _encode_groups(data)
+
+    out = _encode_groups(data + b"\x00" * (3 - remainder))
+    out[len(out) - (3 - remainder):] = b"=" * (3 - remainder)
+
+    return out
+
+def base64_encode(data):
+    return base64_encode_bytes(data).decode('ascii')
+
+def base64_decode(encoded_str):
+    if isinstance(encoded_str, str):
+        try:
+            encoded = encoded_str.rstrip("=").encode('ascii')
+        except UnicodeEncodeError:
+            raise ValueError("Invalid base64 character")
+    else:
+        encoded = bytes(encoded_str).rstrip(b"=")
+
+    remainder = len(encoded) % 4
+    if remainder == 1:
+        raise ValueError("Invalid base64 length")
+
+    values = encoded.translate(_DECODE)
+    if _INVALID in values:
+        raise ValueError("Invalid base64 character")
+
+    if not remainder:
+        return bytes(_decode_groups(values))
+
+    # Decode the partial last quantum as if zero-filled, then drop the filler bytes
+    out = _decode_groups(values + b"\x00" * (4 - remainder))
+    del out[len(out) - (4 - remainder):]
+
+    return bytes(out)
+
+class Base64Encoder:
+    # Incremental encoder: update() emits every complete 3-byte group, finalize() pads the rest
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def update(self, data):
+        self.buffer += data
+        aligned = len(self.buffer) - len(self.buffer) % 3
+
+        if aligned == 0:
+            return b''
+
+        out = _encode_groups(bytes(self.buffer[:aligned]))
+        del self.buffer[:aligned]
+
+        return out
+
+    def finalize(self):
+        out = base64_encode_bytes(self.buffer)
+        self.buffer.clear()
+
+        return out
+
+class Base64Decoder:
+    # Incremental decoder over ASCII bytes; whitespace between chunks is ignored
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def update(self, data):
+        self.buffer += bytes(data).translate(None, _WHITESPACE)
+        aligned = len(self.buffer) - len(self.buffer) % 4
+
+        # Keep the last quantum back: it may carry padding
+        if aligned == len(self.buffer):
+            aligned -= 4
+
+        if aligned <= 0:
+            return b''
+
+        out = base64_decode(self.buffer[:aligned])
+        del self.buffer[:aligned]
+
+        return out
+
+    def finalize(self):
+        out = base64_decode(self.buffer)
+        self.buffer.clear()
+
+        return out
+
+class Base64Writer:
+    # File-like adapter that base64-encodes everything written to dst
+    def __init__(self, dst, tracer=NULL_TRACER):
+        self.dst = dst
+        self.encoder = Base64Encoder()
+        self.tracer = tracer
+
+    def write(self, data):
+        with self.tracer.span("encode", len(data)):
+            encoded = self.encoder.update(data)
+
+        self.dst.write(encoded)
+        return len(data)
+
+    def finish(self):
+        with self.tracer.span("encode"):
+            encoded = self.encoder.finalize()
+
+        self.dst.write(encoded)
+
+class Base64Reader:
+    # File-like adapter that decodes base64 read from src
+    def __init__(self, src, chunk_size=64 * 1024, tracer=NULL_TRACER):
+        self.src = src
+        self.chunk_size = chunk_size
+        self.decoder = Base64Decoder()
+        self.tracer = tracer
+        self.decoded = bytearray()
+        self.eof = False
+
+    def read(self, size=-1):
+        while not self.eof and (size < 0 or len(self.decoded) < size):
+            chunk = self.src.read(self.chunk_size)
+
+            with self.tracer.span("decode", len(chunk)):
+                if chunk:
+                    self.decoded += self.decoder.update(chunk)
+                else:
+                    self.decoded += self.decoder.finalize()
+                    self.eof = True
+
+        if size < 0:
+            size = len(self.decoded)
+
+        result = bytes(self.decoded[:size])
+        del self.decoded[:size]
+
+        return result
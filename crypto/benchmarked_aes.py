@@ -1,143 +1,158 @@
+from time import perf_counter_ns
 from .aes import AES
 from .aes_utils import *
-import time
-
-def benchmark_operations(variable, functions_and_args):
-    start_time = time.perf_counter()
-    
-    for func, args in functions_and_args:
-        if not isinstance(args, tuple):
-            args = (args,)
-        variable = func(*args)
-    
-    exec_time = time.perf_counter() - start_time
-    
-    return variable, exec_time * 1000 # x1000 for ms
+from .aes_ttable import encrypt_block_ttable_timed, decrypt_block_ttable_timed
+from .profiler import RoundProfiler, DEFAULT_SAMPLE_EVERY
+from . import aes_numpy
 
 
 class BenchmarkedAES(AES):
-    def __init__(self, key):
-        super().__init__(key)
+    # Per-round timings with low overhead: most blocks take the normal engine path and only
+    # sampled blocks run the instrumented one. Profiling can be toggled with set_profiling().
+    def __init__(self, key, engine="reference", sample_every=DEFAULT_SAMPLE_EVERY, profiling=True):
+        super().__init__(key, engine)
+
+        self.profiler = RoundProfiler(self.rounds, sample_every, profiling)
 
-        total_operations = self.rounds + 1
+    def set_profiling(self, enabled, sample_every=None):
+        self.profiler.configure(enabled, sample_every)
 
-        self.round_timings = [0] * total_operations
-        self.block_count = 0
+    def encrypt_block(self, block, state=None):
+        if not self.profiler.should_sample():
+            return super().encrypt_block(block, state)
 
-    def encrypt_block(self, block):
-        state = [
-            [0, 0, 0, 0], 
-            [0, 0, 0, 0],
-            [0, 0, 0, 0], 
-            [0, 0, 0, 0]   
-        ]
+        return self._encrypt_block_timed(block, bytearray(16) if state is None else state)
 
-        for col in range (4):
-            for row in range(4):
-                state[row][col] = block[col * 4 + row]
+    def decrypt_block(self, block, state=None):
+        if not self.profiler.should_sample():
+            return super().decrypt_block(block, state)
 
-        block_timings = []
+        return self._decrypt_block_timed(block, bytearray(16) if state is None else state)
 
-        initial_round_operations = [
-            (add_round_key, (state, 0, self.round_keys))
-        ]
+    def _encrypt_block_timed(self, block, state):
+        timings = self.profiler.totals_ns
 
-        def round_operations(round_idx):
-            return [
-                (sub_bytes, (state,)),
-                (shift_rows, (state,)),
-                (mix_columns, (state,)),
-                (add_round_key, (state, round_idx, self.round_keys))
-            ]
+        if self.engine == "ttable":
+            return encrypt_block_ttable_timed(block, self.round_keys, self.rounds, state, timings)
 
-        final_round_operation = [
-            (sub_bytes, state),
-            (shift_rows, state),
-            (add_round_key, (state, self.rounds, self.round_keys))
-        ]
+        clock = perf_counter_ns
+        start = clock()
 
-        state, exec_time = benchmark_operations(state, initial_round_operations)
-        block_timings.append(exec_time)
+        state[:] = block
+        add_round_key(state, 0, self.round_keys)
+
+        now = clock()
+        timings[0] += now - start
+        start = now
 
         for round_idx in range(1, self.rounds):
-            state, exec_time = benchmark_operations(state, round_operations(round_idx))
-            block_timings.append(exec_time)
-
-        state, exec_time = benchmark_operations(state, final_round_operation)
-        block_timings.append(exec_time)
-
-        for i in range(len(block_timings)):
-            if i < len(self.round_timings):
-                self.round_timings[i] += block_timings[i]
-
-        result = bytearray(16)
-
-        for col in range(4):
-            for row in range(4):
-                result[col * 4 + row] = state[row][col]
-
-        self.block_count += 1
-        return result
-
-    def decrypt_block(self, block):
-        state = [
-            [0, 0, 0, 0], 
-            [0, 0, 0, 0],
-            [0, 0, 0, 0], 
-            [0, 0, 0, 0]   
-        ]
-
-        for col in range (4):
-            for row in range(4):
-                state[row][col] = block[col * 4 + row]
-
-        block_timings = []
-
-        initial_round_operations = [
-            (add_round_key, (state, self.rounds, self.round_keys))
-        ]
-
-        def round_operations(round_idx):
-            return [
-                (inv_shift_rows, state),
-                (inv_sub_bytes, state),
-                (add_round_key, (state, round_idx, self.round_keys)),
-                (inv_mix_columns, state)
-            ]
-
-        final_round_operation = [
-            (inv_shift_rows, state),
-            (inv_sub_bytes, state),
-            (add_round_key, (state, 0, self.round_keys))
-        ]
-
-        state, exec_time = benchmark_operations(state, initial_round_operations)
-        block_timings.append(exec_time)
-
-        for round_idx in range(self.rounds -1 , 0, -1):
-            state, exec_time = benchmark_operations(state, round_operations(round_idx))
-            block_timings.append(exec_time)
-
-        state, exec_time = benchmark_operations(state, final_round_operation)
-        block_timings.append(exec_time)
-
-        for i in range(len(block_timings)):
-            if i < len(self.round_timings):
-                self.round_timings[i] += block_timings[i]
-
-        result = bytearray(16)
-
-        for col in range(4):
-            for row in range(4):
-                result[col + row * 4] = state[col][row]
-        
-        self.block_count += 1
-        return result
-    
+            sub_bytes(state)
+            shift_rows(state)
+            mix_columns(state)
+            add_round_key(state, round_idx, self.round_keys)
+
+            now = clock()
+            timings[round_idx] += now - start
+            start = now
+
+        sub_bytes(state)
+        shift_rows(state)
+        add_round_key(state, self.rounds, self.round_keys)
+
+        timings[self.rounds] += clock() - start
+        return state
+
+    def _decrypt_block_timed(self, block, state):
+        timings = self.profiler.totals_ns
+
+        if self.engine == "ttable":
+            return decrypt_block_ttable_timed(block, self.dec_round_keys, self.rounds, state, timings)
+
+        clock = perf_counter_ns
+        start = clock()
+
+        state[:] = block
+        add_round_key(state, self.rounds, self.round_keys)
+
+        now = clock()
+        timings[0] += now - start
+        start = now
+
+        for i, round_idx in enumerate(range(self.rounds - 1, 0, -1), 1):
+            inv_shift_rows(state)
+            inv_sub_bytes(state)
+            add_round_key(state, round_idx, self.round_keys)
+            inv_mix_columns(state)
+
+            now = clock()
+            timings[i] += now - start
+            start = now
+
+        inv_shift_rows(state)
+        inv_sub_bytes(state)
+        add_round_key(state, 0, self.round_keys)
+
+        timings[self.rounds] += clock() - start
+        return state
+
+    def encrypt_blocks_into(self, data, out):
+        if self.engine == "numpy":
+            return self._crypt_batch(data, out, False)
+        return self._crypt_sampled(data, out, AES.encrypt_block, self._encrypt_block_timed)
+
+    def decrypt_blocks_into(self, data, out):
+        if self.engine == "numpy":
+            return self._crypt_batch(data, out, True)
+        return self._crypt_sampled(data, out, AES.decrypt_block, self._decrypt_block_timed)
+
+    def _crypt_sampled(self, data, out, crypt_block, timed_block):
+        # The sampling countdown is kept in a local so unsampled blocks cost one decrement
+        profiler = self.profiler
+        view, result = self._block_buffers(data, out)
+        length = len(view)
+        state = bytearray(16)
+
+        profiler.block_count += length // 16
+
+        if not profiler.enabled:
+            for i in range(0, length, 16):
+                result[i:i + 16] = crypt_block(self, view[i:i + 16], state)
+            return out
+
+        countdown = profiler.countdown
+        sample_every = profiler.sample_every
+
+        for i in range(0, length, 16):
+            countdown -= 1
+
+            if countdown:
+                result[i:i + 16] = crypt_block(self, view[i:i + 16], state)
+            else:
+                countdown = sample_every
+                profiler.sampled_blocks += 1
+                result[i:i + 16] = timed_block(view[i:i + 16], state)
+
+        profiler.countdown = countdown
+        return out
+
+    def _crypt_batch(self, data, out, decrypt):
+        profiler = self.profiler
+        data, target = self._block_buffers(data, out)
+
+        if not profiler.enabled:
+            profiler.block_count += len(data) // 16
+            aes_numpy.crypt_into(data, target, self.round_keys_array, self.rounds, decrypt)
+            return out
+
+        profiler.add_batch(len(data) // 16)
+        aes_numpy.crypt_into(data, target, self.round_keys_array, self.rounds, decrypt, profiler.totals_ns)
+        return out
+
+    def reset_timings(self):
+        self.profiler.reset()
+
     def get_round_timings(self):
-        if self.block_count > 0:
-            return [timing / self.block_count for timing in self.round_timings]
-        return self.round_timings
-    
+        return self.profiler.get_round_timings()
+
     def get_block_count(self):
-        return self.block_count
+        return self.profiler.block_count
@@ -0,0 +1,97 @@
+import io
+import os
+import struct
+from .base64_codec import base64_decode
+from .modes import MODE_NAMES
+
+# Binary ciphertext container:
+#   magic (4) | version (1) | key size (1) | mode (1) | key check (1) |
+#   IV/nonce (16) | chunk size (4) | original length (8) | ciphertext ...
+# The key check byte (see AES.key_check_value) was reserved and always 0 in older files;
+# 0 still means "not recorded" and skips the check.
+
+MAGIC = b"PAES"
+VERSION = 1
+HEADER_FORMAT = ">4sBBBB16sIQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+LENGTH_OFFSET = HEADER_SIZE - 8
+UNKNOWN_LENGTH = 0xFFFFFFFFFFFFFFFF
+
+class ContainerHeader:
+    def __init__(self, key_size, mode, iv=bytes(16), chunk_size=0, original_length=UNKNOWN_LENGTH, key_check=0):
+        self.key_size = key_size
+        self.mode = mode
+        self.iv = iv
+        self.chunk_size = chunk_size
+        self.original_length = original_length
+        self.key_check = key_check
+
+    def pack(self):
+        return struct.pack(HEADER_FORMAT, MAGIC, VERSION, self.key_size, self.mode, self.key_check,
+                           self.iv, self.chunk_size, self.original_length)
+
+    @classmethod
+    def unpack(cls, data):
+        if len(data) < HEADER_SIZE:
+            raise ValueError("Truncated container header")
+
+        magic, version, key_size, mode, key_check, iv, chunk_size, original_length = \
+            struct.unpack_from(HEADER_FORMAT, data)
+
+        if magic != MAGIC:
+            raise ValueError("Not an encrypted container (bad magic)")
+        if version != VERSION:
+            raise ValueError(f"Unsupported container version: {version}")
+        if mode not in MODE_NAMES:
+            raise ValueError(f"Unsupported mode in container: {mode}")
+
+        return cls(key_size, mode, iv, chunk_size, original_length, key_check)
+
+    def has_length(self):
+        return self.original_length != UNKNOWN_LENGTH
+
+def read_header(src):
+    data = src.read(HEADER_SIZE)
+    return ContainerHeader.unpack(data)
+
+def write_header(dst, header):
+    dst.write(header.pack())
+
+def patch_length(dst, header_start, original_length):
+    # Fill in the original length once a stream of unknown size has been written
+    try:
+        end = dst.tell()
+        dst.seek(header_start + LENGTH_OFFSET)
+        dst.write(struct.pack(">Q", original_length))
+        dst.seek(end)
+        return True
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return False
+
+def remaining_length(src):
+    # Number of bytes left in a file-like object, or None if it cannot be determined
+    try:
+        return os.fstat(src.fileno()).st_size - src.tell()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+
+    try:
+        position = src.tell()
+        end = src.seek(0, io.SEEK_END)
+        src.seek(position)
+        return end - position
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+def detect_format(prefix):
+    # prefix: first bytes of a file; returns "binary", "armored" or "legacy"
+    if prefix.startswith(MAGIC):
+        return "binary"
+
+    try:
+        if base64_decode(prefix[:8].decode('ascii')).startswith(MAGIC):
+            return "armored"
+    except (UnicodeDecodeError, ValueError):
+        pass
+
+    return "legacy"
@@ -0,0 +1,137 @@
+import errno
+import io
+import os
+from .modes import MODE_CTR, BLOCK_SIZE, ctr_crypt
+from .container import ContainerHeader, HEADER_SIZE, UNKNOWN_LENGTH, patch_length
+
+# File object over a CTR container that reads and writes plaintext at any offset. Every byte
+# of a CTR stream can be processed independently, so seek() works in both directions and
+# resumed transfers (FTP REST/APPE) need no re-encryption of what is already stored.
+
+def read_ctr_header(path, aes):
+    # Returns the header of a CTR container that aes can decrypt, else None
+    try:
+        with open(path, 'rb') as file:
+            header = ContainerHeader.unpack(file.read(HEADER_SIZE))
+        aes.check_header(header)
+    except (OSError, ValueError):
+        return None
+
+    if header.mode != MODE_CTR:
+        return None
+    return header
+
+class CTRFile:
+    # mode is one of 'rb', 'wb', 'ab' or 'r+b' and always refers to the plaintext. 'r+b' only
+    # continues a container: stored bytes are never rewritten, because new data encrypted
+    # with the same keystream at the same offsets would leak old XOR new plaintext, and
+    # writes never start past the end, where the gap would decrypt to keystream.
+    def __init__(self, aes, path, mode='rb'):
+        if mode not in ('rb', 'wb', 'ab', 'r+b'):
+            raise ValueError(f"Unsupported file mode: {mode}")
+
+        self.aes = aes
+        self.name = path
+        self.mode = mode
+        self.position = 0
+        self.writable = mode != 'rb'
+
+        create = mode == 'wb' or (mode == 'ab' and (not os.path.exists(path) or os.path.getsize(path) == 0))
+
+        if create:
+            self.raw = open(path, 'w+b')
+            self.header = ContainerHeader(len(aes.key), MODE_CTR, os.urandom(BLOCK_SIZE), 0, UNKNOWN_LENGTH,
+                                          aes.key_check_value())
+            self.raw.write(self.header.pack())
+            self.length = 0
+        else:
+            self.raw = open(path, 'rb' if mode == 'rb' else 'r+b')
+            try:
+                self.header = ContainerHeader.unpack(self.raw.read(HEADER_SIZE))
+                aes.check_header(self.header)
+                if self.header.mode != MODE_CTR:
+                    raise ValueError("Random access needs a CTR container")
+            except Exception:
+                self.raw.close()
+                raise
+
+            self.length = os.fstat(self.raw.fileno()).st_size - HEADER_SIZE
+
+        if mode == 'ab':
+            self.position = self.length
+
+    @property
+    def closed(self):
+        return self.raw.closed
+
+    def readable(self):
+        return self.mode != 'wb' and self.mode != 'ab'
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.length
+
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        if self.mode == 'r+b' and offset != self.length:
+            raise OSError(errno.EPERM, "Encrypted files can only be continued at their end")
+
+        self.position = offset
+        return offset
+
+    def tell(self):
+        return self.position
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = max(0, self.length - self.position)
+
+        self.raw.seek(HEADER_SIZE + self.position)
+        data = self.raw.read(size)
+        result = ctr_crypt(self.aes, self.header.iv, self.position, data)
+        self.position += len(data)
+
+        return result
+
+    def write(self, data):
+        if not self.writable:
+            raise io.UnsupportedOperation("File not open for writing")
+
+        if self.mode == 'ab':
+            self.position = self.length
+        elif self.position < self.length:
+            raise OSError(errno.EPERM, "Overwriting encrypted data would reuse its keystream")
+        elif self.position > self.length:
+            # The gap would hold zero ciphertext, which decrypts to raw keystream
+            raise OSError(errno.EPERM, "Writing past the end would leave a hole in encrypted data")
+
+        self.raw.seek(HEADER_SIZE + self.position)
+        self.raw.write(ctr_crypt(self.aes, self.header.iv, self.position, data))
+        self.position += len(data)
+        self.length = max(self.length, self.position)
+
+        return len(data)
+
+    def flush(self):
+        self.raw.flush()
+
+    def close(self):
+        if self.raw.closed:
+            return
+
+        try:
+            if self.writable:
+                patch_length(self.raw, 0, self.length)
+        finally:
+            self.raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
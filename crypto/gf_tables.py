@@ -0,0 +1,40 @@
+# Precomputed GF(2^8) multiplication tables for the MixColumns coefficients, built once at
+# import (about a millisecond), which is cheaper than reading and validating a disk cache.
+
+COEFFICIENTS = (2, 3, 9, 11, 13, 14)
+
+def xtime(a):
+    a <<= 1
+    if a & 0x100:
+        a ^= 0x11b
+    return a
+
+def build_tables():
+    tables = {}
+
+    for b in COEFFICIENTS:
+        table = bytearray(256)
+
+        for a in range(256):
+            result = 0
+            x = a
+            y = b
+            while y:
+                if y & 1:
+                    result ^= x
+                x = xtime(x)
+                y >>= 1
+            table[a] = result
+
+        tables[b] = bytes(table)
+
+    return tables
+
+_tables = build_tables()
+
+mul2 = _tables[2]
+mul3 = _tables[3]
+mul9 = _tables[9]
+mul11 = _tables[11]
+mul13 = _tables[13]
+mul14 = _tables[14]
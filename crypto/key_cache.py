@@ -0,0 +1,127 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 32
+
+def _zeroize(words):
+    if words is not None:
+        for i in range(len(words)):
+            words[i] = 0
+
+class KeyScheduleCache:
+    # Bounded LRU cache of expanded round keys, indexed by a SHA-256 fingerprint of the key.
+    # Callers always get copies, so zeroizing an evicted entry never affects a live cipher.
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict() # fingerprint -> [forward, inverse]
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _fingerprint(self, key):
+        return hashlib.sha256(key).digest()
+
+    def _lookup(self, fingerprint):
+        entry = self.entries.get(fingerprint)
+        if entry is not None:
+            self.entries.move_to_end(fingerprint)
+        return entry
+
+    def _store(self, fingerprint):
+        entry = self.entries.get(fingerprint)
+
+        if entry is None:
+            entry = [None, None]
+            self.entries[fingerprint] = entry
+
+            while len(self.entries) > self.max_entries:
+                _, evicted = self.entries.popitem(last=False)
+                _zeroize(evicted[0])
+                _zeroize(evicted[1])
+                self.evictions += 1
+
+        return entry
+
+    def get_round_keys(self, key, expand):
+        # expand(key) computes the forward schedule on a miss
+        fingerprint = self._fingerprint(key)
+
+        with self.lock:
+            entry = self._lookup(fingerprint)
+            if entry is not None and entry[0] is not None:
+                self.hits += 1
+                return list(entry[0])
+            self.misses += 1
+
+        round_keys = expand(key)
+
+        if self.max_entries > 0:
+            with self.lock:
+                self._store(fingerprint)[0] = list(round_keys)
+
+        return round_keys
+
+    def get_inverse_round_keys(self, key, round_keys, invert):
+        # invert(round_keys) computes the equivalent-inverse-cipher schedule on a miss
+        fingerprint = self._fingerprint(key)
+
+        with self.lock:
+            entry = self._lookup(fingerprint)
+            if entry is not None and entry[1] is not None:
+                self.hits += 1
+                return list(entry[1])
+            self.misses += 1
+
+        dec_round_keys = invert(round_keys)
+
+        if self.max_entries > 0:
+            with self.lock:
+                self._store(fingerprint)[1] = list(dec_round_keys)
+
+        return dec_round_keys
+
+    def evict(self, key):
+        with self.lock:
+            entry = self.entries.pop(self._fingerprint(key), None)
+
+            if entry is None:
+                return False
+
+            _zeroize(entry[0])
+            _zeroize(entry[1])
+            self.evictions += 1
+            return True
+
+    def clear(self):
+        with self.lock:
+            for entry in self.entries.values():
+                _zeroize(entry[0])
+                _zeroize(entry[1])
+            self.evictions += len(self.entries)
+            self.entries.clear()
+
+    def resize(self, max_entries):
+        with self.lock:
+            self.max_entries = max_entries
+
+            while len(self.entries) > max(max_entries, 0):
+                _, evicted = self.entries.popitem(last=False)
+                _zeroize(evicted[0])
+                _zeroize(evicted[1])
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self.entries),
+                'max_entries': self.max_entries
+            }
+
+# Shared by AES, BenchmarkedAES and ParallelAES
+key_schedule_cache = KeyScheduleCache()
@@ -0,0 +1,161 @@
+import mmap
+import os
+from contextlib import contextmanager
+from .aes_utils import pad, unpad
+from .modes import MODE_ECB, MODE_CTR, MODE_CBC, BLOCK_SIZE, ctr_crypt, cbc_encrypt, cbc_decrypt
+from .container import ContainerHeader, HEADER_SIZE
+from .stream import DEFAULT_CHUNK_SIZE
+
+# File-to-file encryption through memory maps for the binary container: the input is never
+# read into Python memory and the output is preallocated at its final size, so blocks go
+# straight from one mapping to the other.
+
+@contextmanager
+def map_file(file, length, writable=False):
+    if length == 0:
+        yield bytearray() if writable else b''
+        return
+
+    access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+    mapping = mmap.mmap(file.fileno(), length, access=access)
+
+    if hasattr(mmap, 'MADV_SEQUENTIAL'):
+        mapping.madvise(mmap.MADV_SEQUENTIAL)
+
+    try:
+        yield mapping
+    finally:
+        try:
+            mapping.close()
+        except BufferError:
+            # A view is still referenced (e.g. by a traceback); the mapping is released with it
+            pass
+
+def ciphertext_length(length, mode):
+    if mode == MODE_CTR:
+        return length
+    return length + BLOCK_SIZE - length % BLOCK_SIZE
+
+def _block_chunk_size(chunk_size):
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    return max(BLOCK_SIZE, chunk_size - chunk_size % BLOCK_SIZE)
+
+def _chunks(length, chunk_size):
+    for start in range(0, length, chunk_size):
+        yield start, min(start + chunk_size, length)
+
+def _report(progress, done):
+    if progress:
+        progress(done)
+
+def encrypt_mapped(aes, src, dst, mode, iv, chunk_size, progress=None):
+    # src: plaintext buffer, dst: writable buffer of ciphertext_length(len(src), mode) bytes
+    tracer = aes.tracer
+    length = len(src)
+
+    if mode == MODE_CTR:
+        for start, end in _chunks(length, chunk_size):
+            with tracer.span("rounds", end - start, (end - start + BLOCK_SIZE - 1) // BLOCK_SIZE):
+                dst[start:end] = ctr_crypt(aes, iv, start, src[start:end])
+            _report(progress, end)
+        return
+
+    aligned = length - length % BLOCK_SIZE
+    previous = iv
+
+    for start, end in _chunks(aligned, chunk_size):
+        with tracer.span("rounds", end - start, (end - start) // BLOCK_SIZE):
+            if mode == MODE_CBC:
+                dst[start:end] = cbc_encrypt(aes, previous, src[start:end])
+                previous = bytes(dst[end - BLOCK_SIZE:end])
+            else:
+                aes.encrypt_blocks_into(src[start:end], dst[start:end])
+        _report(progress, end)
+
+    with tracer.span("pad", length - aligned):
+        tail = pad(bytes(src[aligned:]))
+
+    with tracer.span("rounds", BLOCK_SIZE, 1):
+        if mode == MODE_CBC:
+            dst[aligned:aligned + BLOCK_SIZE] = cbc_encrypt(aes, previous, tail)
+        else:
+            aes.encrypt_blocks_into(tail, dst[aligned:aligned + BLOCK_SIZE])
+    _report(progress, length)
+
+def plaintext_length(aes, ciphertext, mode, iv):
+    # CTR keeps the length; padded modes decrypt the final block first to read the padding.
+    # Returns (length, final plaintext block or None)
+    if mode == MODE_CTR:
+        return len(ciphertext), None
+
+    if len(ciphertext) == 0 or len(ciphertext) % BLOCK_SIZE:
+        raise ValueError("Ciphertext length is not a multiple of the block size")
+
+    last = ciphertext[-BLOCK_SIZE:]
+
+    if mode == MODE_CBC:
+        previous = iv if len(ciphertext) == BLOCK_SIZE else ciphertext[-2 * BLOCK_SIZE:-BLOCK_SIZE]
+        final_block = unpad(cbc_decrypt(aes, previous, last))
+    else:
+        final_block = unpad(aes.decrypt_blocks(last))
+
+    return len(ciphertext) - BLOCK_SIZE + len(final_block), bytes(final_block)
+
+def decrypt_mapped(aes, src, dst, mode, iv, chunk_size, final_block=None, progress=None):
+    # src: ciphertext buffer, dst: writable buffer sized by plaintext_length()
+    tracer = aes.tracer
+    body = len(src) if mode == MODE_CTR else len(src) - BLOCK_SIZE
+
+    for start, end in _chunks(body, chunk_size):
+        with tracer.span("rounds", end - start, (end - start + BLOCK_SIZE - 1) // BLOCK_SIZE):
+            if mode == MODE_CTR:
+                dst[start:end] = ctr_crypt(aes, iv, start, src[start:end])
+            elif mode == MODE_CBC:
+                previous = iv if start == 0 else src[start - BLOCK_SIZE:start]
+                dst[start:end] = cbc_decrypt(aes, previous, src[start:end])
+            else:
+                aes.decrypt_blocks_into(src[start:end], dst[start:end])
+        _report(progress, end)
+
+    if final_block:
+        dst[body:body + len(final_block)] = final_block
+    _report(progress, len(src))
+
+def encrypt_file(aes, src_path, dst_path, mode=MODE_ECB, iv=None, chunk_size=None, progress=None):
+    chunk_size = _block_chunk_size(chunk_size)
+
+    with open(src_path, 'rb') as src, open(dst_path, 'w+b') as dst:
+        length = os.fstat(src.fileno()).st_size
+        header = ContainerHeader(len(aes.key), mode, iv or bytes(BLOCK_SIZE), chunk_size, length,
+                                 aes.key_check_value())
+        total = HEADER_SIZE + ciphertext_length(length, mode)
+        dst.truncate(total)
+
+        with map_file(src, length) as data, map_file(dst, total, writable=True) as out:
+            out[:HEADER_SIZE] = header.pack()
+            encrypt_mapped(aes, memoryview(data), memoryview(out)[HEADER_SIZE:], mode, iv, chunk_size, progress)
+
+    return length
+
+def decrypt_file(aes, src_path, dst_path, chunk_size=None, progress=None):
+    with open(src_path, 'rb') as src:
+        size = os.fstat(src.fileno()).st_size
+
+        with map_file(src, size) as data:
+            header = ContainerHeader.unpack(data[:HEADER_SIZE])
+            aes.check_header(header)
+            ciphertext = memoryview(data)[HEADER_SIZE:]
+
+            length, final_block = plaintext_length(aes, ciphertext, header.mode, header.iv)
+
+            if header.has_length() and length != header.original_length:
+                raise ValueError("Decrypted length does not match the container header")
+
+            with open(dst_path, 'w+b') as dst:
+                dst.truncate(length)
+
+                with map_file(dst, length, writable=True) as out:
+                    decrypt_mapped(aes, ciphertext, memoryview(out), header.mode, header.iv,
+                                   _block_chunk_size(chunk_size or header.chunk_size), final_block, progress)
+
+    return length
@@ -0,0 +1,72 @@
+# Block cipher modes, stored as a single byte in the container header
+
+MODE_ECB = 1
+MODE_CTR = 2
+MODE_CBC = 3
+
+MODE_NAMES = {
+    MODE_ECB: "ECB",
+    MODE_CTR: "CTR",
+    MODE_CBC: "CBC",
+}
+
+BLOCK_SIZE = 16
+COUNTER_MASK = (1 << 128) - 1
+
+def mode_from_name(name):
+    for mode, mode_name in MODE_NAMES.items():
+        if mode_name == name.upper():
+            return mode
+    raise ValueError(f"Unsupported mode: {name}")
+
+def xor_bytes(a, b):
+    # XOR two equal-length byte strings in one big-integer operation
+    n = len(a)
+    return (int.from_bytes(a, 'big') ^ int.from_bytes(b, 'big')).to_bytes(n, 'big')
+
+def ctr_counter_blocks(nonce, start_block, count):
+    # The nonce is a 128-bit big-endian counter incremented once per block
+    counter = int.from_bytes(nonce, 'big') + start_block
+    blocks = bytearray(count * BLOCK_SIZE)
+
+    for i in range(0, count * BLOCK_SIZE, BLOCK_SIZE):
+        blocks[i:i + BLOCK_SIZE] = (counter & COUNTER_MASK).to_bytes(BLOCK_SIZE, 'big')
+        counter += 1
+
+    return blocks
+
+def ctr_crypt(aes, nonce, offset, data):
+    # Encrypts or decrypts data that starts at byte offset of a CTR stream
+    if not data:
+        return b''
+
+    start_block = offset // BLOCK_SIZE
+    skip = offset % BLOCK_SIZE
+    count = (skip + len(data) + BLOCK_SIZE - 1) // BLOCK_SIZE
+
+    keystream = aes.encrypt_blocks(ctr_counter_blocks(nonce, start_block, count))
+
+    return xor_bytes(data, keystream[skip:skip + len(data)])
+
+def cbc_encrypt(aes, iv, data):
+    # Inherently serial: each block depends on the previous ciphertext block
+    result = bytearray(len(data))
+    state = bytearray(BLOCK_SIZE)
+    previous = iv
+
+    for i in range(0, len(data), BLOCK_SIZE):
+        block = xor_bytes(data[i:i + BLOCK_SIZE], previous)
+        result[i:i + BLOCK_SIZE] = aes.encrypt_block(block, state)
+        previous = result[i:i + BLOCK_SIZE]
+
+    return result
+
+def cbc_decrypt(aes, iv, data):
+    # Every block decrypts independently, then is XORed with the preceding ciphertext block
+    if not data:
+        return b''
+
+    decrypted = aes.decrypt_blocks(data)
+    previous = bytes(iv) + bytes(data[:-BLOCK_SIZE])
+
+    return xor_bytes(decrypted, previous)
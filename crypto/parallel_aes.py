@@ -0,0 +1,96 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from .aes import AES
+from .modes import BLOCK_SIZE, MODE_ECB
+from .stream import DEFAULT_CHUNK_SIZE
+
+DEFAULT_SHARD_SIZE = 1024 * 1024 # bytes per task, a multiple of the block size
+
+# Per-process cipher, built once by the pool initializer from the shipped round keys
+_worker_aes = None
+
+def _init_worker(key, engine, round_keys):
+    global _worker_aes
+    _worker_aes = AES(key, engine, round_keys=round_keys)
+
+def _crypt_shard(decrypt, shard):
+    if decrypt:
+        return _worker_aes.decrypt_blocks(shard)
+    return _worker_aes.encrypt_blocks(shard)
+
+class ParallelAES(AES):
+    # Shards bulk block operations across a process pool. ECB (including encrypt/decrypt and
+    # the memory-mapped file paths), CTR keystream generation and CBC decryption all go
+    # through encrypt_blocks_into/decrypt_blocks_into, so they run in parallel; CBC
+    # encryption is serial by nature and stays in this process.
+    def __init__(self, key, engine="ttable", workers=None, shard_size=DEFAULT_SHARD_SIZE):
+        super().__init__(key, engine)
+
+        if shard_size <= 0 or shard_size % BLOCK_SIZE:
+            raise ValueError(f"Shard size must be a positive multiple of {BLOCK_SIZE}")
+
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
+
+    def _get_executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.key, self.engine, self.round_keys)
+            )
+        return self.executor
+
+    def _crypt_parallel(self, data, out, decrypt):
+        view, output = self._block_buffers(data, out)
+        shards = [bytes(view[i:i + self.shard_size]) for i in range(0, len(view), self.shard_size)]
+        results = self._get_executor().map(_crypt_shard, [decrypt] * len(shards), shards)
+
+        offset = 0
+
+        for result in results:
+            output[offset:offset + len(result)] = result
+            offset += len(result)
+
+        return out
+
+    def _use_pool(self, data):
+        return self.workers >= 2 and memoryview(data).nbytes >= 2 * self.shard_size
+
+    def encrypt_blocks_into(self, data, out):
+        if not self._use_pool(data):
+            return super().encrypt_blocks_into(data, out)
+        return self._crypt_parallel(data, out, False)
+
+    def decrypt_blocks_into(self, data, out):
+        if not self._use_pool(data):
+            return super().decrypt_blocks_into(data, out)
+        return self._crypt_parallel(data, out, True)
+
+    def stream_chunk_size(self):
+        # Read enough per chunk to give every worker a full shard
+        return max(DEFAULT_CHUNK_SIZE, self.workers * self.shard_size)
+
+    def encrypt_stream(self, src, dst, chunk_size=None, **kwargs):
+        return super().encrypt_stream(src, dst, chunk_size or self.stream_chunk_size(), **kwargs)
+
+    def decrypt_stream(self, src, dst, chunk_size=None, **kwargs):
+        return super().decrypt_stream(src, dst, chunk_size or self.stream_chunk_size(), **kwargs)
+
+    def encrypt_file(self, src_path, dst_path, mode=MODE_ECB, iv=None, chunk_size=None, progress=None):
+        return super().encrypt_file(src_path, dst_path, mode, iv, chunk_size or self.stream_chunk_size(), progress)
+
+    def decrypt_file(self, src_path, dst_path, chunk_size=None, progress=None):
+        return super().decrypt_file(src_path, dst_path, chunk_size or self.stream_chunk_size(), progress)
@@ -0,0 +1,191 @@
+import os
+import queue
+import threading
+from .stream import create_encryptor, create_decryptor, DEFAULT_CHUNK_SIZE
+from .modes import MODE_ECB, MODE_CTR, MODE_CBC, MODE_NAMES, BLOCK_SIZE
+from .container import ContainerHeader, UNKNOWN_LENGTH, HEADER_SIZE, remaining_length, detect_format
+from .base64_codec import Base64Decoder
+
+# Streaming adapters that put encryption inside a transfer: a reader that yields the
+# container for a plaintext source (e.g. for ftplib.storbinary) and a writer that takes
+# container chunks of any size (e.g. the ftplib.retrbinary callback) and writes plaintext.
+
+DEFAULT_PREFETCH = 4 # encrypted chunks buffered ahead of the consumer
+DETECT_SIZE = 8 # enough of the input for detect_format
+
+class EncryptingReader:
+    # File-like object whose read() returns the encrypted container of src. A prefetch thread
+    # reads and encrypts ahead while the consumer is busy sending, so the two overlap.
+    def __init__(self, aes, src, mode=MODE_ECB, iv=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 prefetch=DEFAULT_PREFETCH):
+        if mode not in MODE_NAMES:
+            raise ValueError(f"Unsupported mode: {mode}")
+
+        if mode in (MODE_CTR, MODE_CBC) and iv is None:
+            iv = os.urandom(BLOCK_SIZE)
+
+        length = remaining_length(src)
+        header = ContainerHeader(len(aes.key), mode, iv or bytes(BLOCK_SIZE), chunk_size,
+                                 UNKNOWN_LENGTH if length is None else length, aes.key_check_value())
+
+        self.aes = aes
+        self.src = src
+        self.mode = mode
+        self.iv = iv
+        self.chunk_size = chunk_size
+        self.length = length
+        self.bytes_read = 0
+
+        self.buffer = bytearray(header.pack())
+        self.chunks = queue.Queue(maxsize=max(1, prefetch))
+        self.stopped = threading.Event()
+        self.finished = False
+        self.error = None
+
+        self.thread = threading.Thread(target=self._produce, daemon=True)
+        self.thread.start()
+
+    def _produce(self):
+        try:
+            encryptor = create_encryptor(self.aes, self.mode, self.iv)
+
+            while not self.stopped.is_set():
+                chunk = self.src.read(self.chunk_size)
+                if not chunk:
+                    break
+
+                self.bytes_read += len(chunk)
+                self._put(encryptor.update(chunk))
+
+            if not self.stopped.is_set():
+                self._put(encryptor.finalize())
+        except Exception as e:
+            self.error = e
+        finally:
+            self._put(None)
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def read(self, size=-1):
+        while not self.finished and (size < 0 or len(self.buffer) < size):
+            chunk = self.chunks.get()
+
+            if chunk is None:
+                self.finished = True
+                if self.error:
+                    raise self.error
+            else:
+                self.buffer += chunk
+
+        if size < 0 or size > len(self.buffer):
+            size = len(self.buffer)
+
+        result = bytes(self.buffer[:size])
+        del self.buffer[:size]
+
+        return result
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class DecryptingWriter:
+    # Accepts a binary or armored container (or a legacy base64 file) in arbitrary chunks.
+    # Block boundaries are handled by the stream decryptor; call finish() after the last chunk.
+    def __init__(self, aes, dst):
+        self.aes = aes
+        self.dst = dst
+        self.pending = bytearray() # input held until the format, then the header, is known
+        self.file_format = None
+        self.decoder = None
+        self.header = None
+        self.decryptor = None
+        self.bytes_written = 0
+
+    def write(self, data):
+        size = len(data)
+
+        if self.file_format is None:
+            self.pending += data
+            if len(self.pending) < DETECT_SIZE:
+                return size
+
+            self._detect()
+            data = bytes(self.pending)
+            self.pending.clear()
+
+        if self.file_format == "legacy":
+            self.pending += data
+        else:
+            self._feed(self.decoder.update(data) if self.decoder else data)
+
+        return size
+
+    def _detect(self):
+        self.file_format = detect_format(bytes(self.pending[:DETECT_SIZE]))
+
+        if self.file_format == "armored":
+            self.decoder = Base64Decoder()
+
+    def _feed(self, data):
+        if self.decryptor is None:
+            self.pending += data
+            if len(self.pending) < HEADER_SIZE:
+                return
+
+            self.header = ContainerHeader.unpack(self.pending)
+            self.aes.check_header(self.header)
+            self.decryptor = create_decryptor(self.aes, self.header.mode, self.header.iv)
+
+            data = bytes(self.pending[HEADER_SIZE:])
+            self.pending.clear()
+
+        self._write(self.decryptor.update(data))
+
+    def _write(self, data):
+        if data:
+            self.dst.write(data)
+            self.bytes_written += len(data)
+
+    def finish(self):
+        # Returns the number of plaintext bytes written
+        if self.file_format is None:
+            self._detect()
+            data = bytes(self.pending)
+            self.pending.clear()
+
+            if self.file_format != "legacy":
+                self._feed(self.decoder.update(data) if self.decoder else data)
+            else:
+                self.pending += data
+
+        if self.file_format == "legacy":
+            # Files written before the container format are one base64 string of ECB ciphertext
+            self._write(self.aes.decrypt(bytes(self.pending).decode('ascii')).encode('utf-8'))
+            self.pending.clear()
+            return self.bytes_written
+
+        if self.decoder:
+            self._feed(self.decoder.finalize())
+
+        if self.decryptor is None:
+            raise ValueError("Truncated container header")
+
+        self._write(self.decryptor.finalize())
+
+        if self.header.has_length() and self.bytes_written != self.header.original_length:
+            raise ValueError("Decrypted length does not match the container header")
+
+        return self.bytes_written
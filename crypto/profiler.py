@@ -0,0 +1,54 @@
+from time import perf_counter_ns
+
+DEFAULT_SAMPLE_EVERY = 16
+
+class RoundProfiler:
+    # Per-round timing with sampling: only 1 in sample_every blocks runs the instrumented path.
+    # totals_ns[i] accumulates nanoseconds for round i (0 = initial AddRoundKey, rounds = final round)
+    def __init__(self, rounds, sample_every=DEFAULT_SAMPLE_EVERY, enabled=True):
+        self.rounds = rounds
+        self.sample_every = max(1, sample_every)
+        self.enabled = enabled
+        self.totals_ns = [0] * (rounds + 1)
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self.totals_ns)):
+            self.totals_ns[i] = 0
+
+        self.block_count = 0
+        self.sampled_blocks = 0
+        self.countdown = 1 # sample the first block so tiny inputs still get timings
+
+    def configure(self, enabled=None, sample_every=None):
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_every is not None:
+            self.sample_every = max(1, sample_every)
+            self.countdown = 1
+
+    def should_sample(self):
+        # Counts every block; returns True when this block should be timed
+        self.block_count += 1
+
+        if not self.enabled:
+            return False
+
+        self.countdown -= 1
+        if self.countdown:
+            return False
+
+        self.countdown = self.sample_every
+        self.sampled_blocks += 1
+        return True
+
+    def add_batch(self, block_count):
+        # Batch engines time a whole batch per round, so every block in it counts as sampled
+        self.block_count += block_count
+        self.sampled_blocks += block_count
+
+    def get_round_timings(self):
+        # Average milliseconds per block for each round
+        if self.sampled_blocks > 0:
+            return [total / self.sampled_blocks / 1e6 for total in self.totals_ns]
+        return [0.0] * len(self.totals_ns)
@@ -0,0 +1,60 @@
+import time
+
+class OperationCancelled(Exception):
+    pass
+
+class ProgressTracker:
+    # Reports (done, total, bytes_per_second) to callback at most once per interval and raises
+    # OperationCancelled once cancel_event is set
+    def __init__(self, total, callback=None, cancel_event=None, interval=0.1):
+        self.total = total
+        self.callback = callback
+        self.cancel_event = cancel_event
+        self.interval = interval
+        self.done = 0
+        self.start_time = time.perf_counter()
+        self.last_report = 0
+
+    def check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise OperationCancelled("Operation cancelled")
+
+    def update(self, done, final=False):
+        self.done = done
+        self.check_cancelled()
+
+        now = time.perf_counter()
+        if self.callback and (final or done >= self.total or now - self.last_report >= self.interval):
+            self.last_report = now
+            self.callback(done, self.total, self.speed(now))
+
+    def speed(self, now=None):
+        elapsed = (now or time.perf_counter()) - self.start_time
+        return self.done / elapsed if elapsed > 0 else 0
+
+class ProgressReader:
+    # File-like wrapper for stream sources that feeds a ProgressTracker with the bytes read
+    def __init__(self, src, tracker):
+        self.src = src
+        self.tracker = tracker
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        self.tracker.check_cancelled()
+
+        data = self.src.read(size)
+        self.bytes_read += len(data)
+        self.tracker.update(self.bytes_read, final=not data)
+
+        return data
+
+    def seek(self, offset, whence=0):
+        position = self.src.seek(offset, whence)
+        self.bytes_read = position
+        return position
+
+    def tell(self):
+        return self.src.tell()
+
+    def fileno(self):
+        return self.src.fileno()
@@ -0,0 +1,133 @@
+from .aes_utils import pad, unpad
+from .modes import MODE_ECB, MODE_CTR, MODE_CBC, BLOCK_SIZE, ctr_crypt, cbc_encrypt, cbc_decrypt
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+class StreamEncryptor:
+    # Incremental ECB encryption: feed any amount of data, padding is applied in finalize()
+    def __init__(self, aes):
+        self.aes = aes
+        self.buffer = bytearray()
+
+    def update(self, data):
+        tracer = self.aes.tracer
+
+        with tracer.span("split", len(data)):
+            self.buffer += data
+            aligned = len(self.buffer) - len(self.buffer) % BLOCK_SIZE
+
+            if aligned == 0:
+                return b''
+
+            blocks = self.buffer[:aligned]
+            del self.buffer[:aligned]
+
+        with tracer.span("rounds", aligned, aligned // BLOCK_SIZE):
+            return self._process(blocks)
+
+    def finalize(self):
+        tracer = self.aes.tracer
+
+        with tracer.span("pad", len(self.buffer)):
+            padded = pad(bytes(self.buffer))
+            self.buffer.clear()
+
+        with tracer.span("rounds", len(padded), len(padded) // BLOCK_SIZE):
+            return self._process(padded)
+
+    def _process(self, data):
+        return self.aes.encrypt_blocks(data)
+
+class StreamDecryptor:
+    # Incremental ECB decryption: the last block is held back until finalize() removes the padding
+    def __init__(self, aes):
+        self.aes = aes
+        self.buffer = bytearray()
+
+    def update(self, data):
+        tracer = self.aes.tracer
+
+        with tracer.span("split", len(data)):
+            self.buffer += data
+            aligned = len(self.buffer) - len(self.buffer) % BLOCK_SIZE
+
+            if aligned == len(self.buffer):
+                aligned -= BLOCK_SIZE
+
+            if aligned <= 0:
+                return b''
+
+            blocks = self.buffer[:aligned]
+            del self.buffer[:aligned]
+
+        with tracer.span("rounds", aligned, aligned // BLOCK_SIZE):
+            return self._process(blocks)
+
+    def finalize(self):
+        if len(self.buffer) != BLOCK_SIZE:
+            raise ValueError("Ciphertext length is not a multiple of the block size")
+
+        tracer = self.aes.tracer
+
+        with tracer.span("rounds", BLOCK_SIZE, 1):
+            result = self._process(bytes(self.buffer))
+            self.buffer.clear()
+
+        with tracer.span("pad", BLOCK_SIZE):
+            return unpad(result)
+
+    def _process(self, data):
+        return self.aes.decrypt_blocks(data)
+
+class CBCStreamEncryptor(StreamEncryptor):
+    def __init__(self, aes, iv):
+        super().__init__(aes)
+        self.previous = iv
+
+    def _process(self, data):
+        result = cbc_encrypt(self.aes, self.previous, data)
+        self.previous = bytes(result[-BLOCK_SIZE:])
+
+        return result
+
+class CBCStreamDecryptor(StreamDecryptor):
+    def __init__(self, aes, iv):
+        super().__init__(aes)
+        self.previous = iv
+
+    def _process(self, data):
+        result = cbc_decrypt(self.aes, self.previous, data)
+        self.previous = bytes(data[-BLOCK_SIZE:])
+
+        return result
+
+class CTRStreamCipher:
+    # CTR is symmetric and needs no padding, so one context serves both directions
+    def __init__(self, aes, nonce, offset=0):
+        self.aes = aes
+        self.nonce = nonce
+        self.offset = offset
+
+    def update(self, data):
+        with self.aes.tracer.span("rounds", len(data), (len(data) + BLOCK_SIZE - 1) // BLOCK_SIZE):
+            result = ctr_crypt(self.aes, self.nonce, self.offset, data)
+
+        self.offset += len(data)
+        return result
+
+    def finalize(self):
+        return b''
+
+def create_encryptor(aes, mode=MODE_ECB, iv=None):
+    if mode == MODE_CTR:
+        return CTRStreamCipher(aes, iv)
+    if mode == MODE_CBC:
+        return CBCStreamEncryptor(aes, iv)
+    return StreamEncryptor(aes)
+
+def create_decryptor(aes, mode=MODE_ECB, iv=None):
+    if mode == MODE_CTR:
+        return CTRStreamCipher(aes, iv)
+    if mode == MODE_CBC:
+        return CBCStreamDecryptor(aes, iv)
+    return StreamDecryptor(aes)
@@ -0,0 +1,150 @@
+import json
+from time import perf_counter_ns
+
+# Named spans for the stages of a file operation. Spans nest, so every span is recorded under
+# its full path (e.g. "encrypt;write;encode") with total and self time, and flat per-stage
+# totals are the sum of self times. Export as JSON or as collapsed stacks for flamegraph tools.
+
+STAGES = ("read", "pad", "split", "rounds", "encode", "decode", "write")
+
+class Span:
+    __slots__ = ("tracer", "name", "nbytes", "blocks", "start")
+
+    def __init__(self, tracer, name, nbytes=0, blocks=0):
+        self.tracer = tracer
+        self.name = name
+        self.nbytes = nbytes
+        self.blocks = blocks
+
+    def count(self, nbytes=0, blocks=0):
+        self.nbytes += nbytes
+        self.blocks += blocks
+
+    def __enter__(self):
+        self.tracer._push(self.name)
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer._pop(perf_counter_ns() - self.start, self.nbytes, self.blocks)
+
+class Tracer:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.stack = []
+        self.child_ns = []
+        self.paths = {} # path tuple -> [calls, total_ns, self_ns, bytes, blocks]
+
+    def span(self, name, nbytes=0, blocks=0):
+        return Span(self, name, nbytes, blocks)
+
+    def _push(self, name):
+        self.stack.append(name)
+        self.child_ns.append(0)
+
+    def _pop(self, elapsed, nbytes, blocks):
+        path = tuple(self.stack)
+        self.stack.pop()
+        child = self.child_ns.pop()
+
+        if self.child_ns:
+            self.child_ns[-1] += elapsed
+
+        entry = self.paths.get(path)
+        if entry is None:
+            entry = self.paths[path] = [0, 0, 0, 0, 0]
+
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] += elapsed - child
+        entry[3] += nbytes
+        entry[4] += blocks
+
+    def total_ns(self):
+        return sum(entry[1] for path, entry in self.paths.items() if len(path) == 1)
+
+    def stage_summary(self):
+        # Per-stage self time, call count and counters, known stages first
+        stages = {}
+
+        for path, (calls, total, self_ns, nbytes, blocks) in self.paths.items():
+            stage = stages.setdefault(path[-1], {'calls': 0, 'self_ns': 0, 'bytes': 0, 'blocks': 0})
+            stage['calls'] += calls
+            stage['self_ns'] += self_ns
+            stage['bytes'] += nbytes
+            stage['blocks'] += blocks
+
+        total = self.total_ns()
+        order = {name: i for i, name in enumerate(STAGES)}
+        summary = []
+
+        for name in sorted(stages, key=lambda name: (order.get(name, len(STAGES)), name)):
+            stage = stages[name]
+            summary.append({
+                'name': name,
+                'calls': stage['calls'],
+                'time_ms': stage['self_ns'] / 1e6,
+                'percent': stage['self_ns'] / total * 100 if total else 0,
+                'bytes': stage['bytes'],
+                'blocks': stage['blocks'],
+            })
+
+        return summary
+
+    def to_dict(self):
+        spans = []
+
+        for path, (calls, total, self_ns, nbytes, blocks) in self.paths.items():
+            spans.append({
+                'path': ";".join(path),
+                'calls': calls,
+                'total_ms': total / 1e6,
+                'self_ms': self_ns / 1e6,
+                'bytes': nbytes,
+                'blocks': blocks,
+            })
+
+        return {'total_ms': self.total_ns() / 1e6, 'stages': self.stage_summary(), 'spans': spans}
+
+    def collapsed_stacks(self):
+        # One "a;b;c <self microseconds>" line per path, the input format of flamegraph.pl
+        lines = []
+
+        for path, entry in self.paths.items():
+            micros = entry[2] // 1000
+            if micros > 0:
+                lines.append(f"{';'.join(path)} {micros}")
+
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    def export_collapsed(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.collapsed_stacks())
+
+class NullSpan:
+    def count(self, nbytes=0, blocks=0):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+class NullTracer:
+    # Default for ciphers nobody is tracing: spans cost one method call
+    _span = NullSpan()
+
+    def span(self, name, nbytes=0, blocks=0):
+        return self._span
+
+    def reset(self):
+        pass
+
+NULL_TRACER = NullTracer()
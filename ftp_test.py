@@ -0,0 +1,159 @@
+import errno
+import ftplib
+import io
+import logging
+import os
+import socket
+import sys
+import tempfile
+
+from crypto.aes import AES
+from crypto.container import HEADER_SIZE, MAGIC
+from crypto.ctr_file import CTRFile
+from models.ftp_crypto import retrieve_decrypted, store_encrypted
+from models.ftp_model import FTPServerManager
+
+key = "0123456789abcdef"
+other_key = "fedcba9876543210"
+
+failures = []
+
+def check(label, matched):
+    print(f'{label}:', 'Match' if matched else 'MISMATCH')
+    if not matched:
+        failures.append(label)
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+def retrieve(client, path, rest=None):
+    out = io.BytesIO()
+    client.retrbinary(f'RETR {path}', out.write, rest=rest)
+    return out.getvalue()
+
+def refused(action):
+    try:
+        action()
+    except ftplib.error_perm:
+        return True
+    return False
+
+def test_encrypted_storage(client, root):
+    ## Files are stored as CTR containers and served back as plaintext
+
+    data = os.urandom(300000)
+    client.storbinary('STOR a.bin', io.BytesIO(data))
+    with open(os.path.join(root, 'a.bin'), 'rb') as file:
+        stored = file.read()
+
+    check('STOR stores a container', stored.startswith(MAGIC) and len(stored) == HEADER_SIZE + len(data)
+          and data[:1000] not in stored)
+    check('RETR', retrieve(client, 'a.bin') == data)
+    check('SIZE', client.size('a.bin') == len(data))
+    check('REST RETR', retrieve(client, 'a.bin', rest=12345) == data[12345:])
+
+    client.storbinary('APPE a.bin', io.BytesIO(b'tail-data'))
+    check('APPE', retrieve(client, 'a.bin') == data + b'tail-data')
+
+    client.storbinary('APPE new.bin', io.BytesIO(b'hello'))
+    check('APPE new file', retrieve(client, 'new.bin') == b'hello')
+
+    client.storbinary('STOR b.bin', io.BytesIO(data[:1000]))
+    client.storbinary('STOR b.bin', io.BytesIO(data[1000:]), rest=1000)
+    check('REST STOR at the end', retrieve(client, 'b.bin') == data)
+
+def test_refusals(client, root):
+    ## Stored ciphertext is never rewritten and no gap is left past the end
+
+    client.storbinary('STOR c.bin', io.BytesIO(b'x' * 5000))
+    path = os.path.join(root, 'c.bin')
+    with open(path, 'rb') as file:
+        before = file.read()
+
+    check('REST STOR mid-file refused',
+          refused(lambda: client.storbinary('STOR c.bin', io.BytesIO(b'y' * 10), rest=500)))
+    check('REST STOR past the end refused',
+          refused(lambda: client.storbinary('STOR c.bin', io.BytesIO(b'y' * 10), rest=6000)))
+    with open(path, 'rb') as file:
+        check('Container untouched', file.read() == before)
+
+    aes = AES(key, "ttable")
+    with CTRFile(aes, path, 'r+b') as file:
+        file.position = file.length + 100
+        try:
+            file.write(b'y')
+            hole = True
+        except OSError as e:
+            hole = e.errno != errno.EPERM
+    check('CTRFile write past the end refused', not hole)
+
+def test_foreign_files(client, root):
+    ## Plain files and containers for another key are served as stored
+
+    with open(os.path.join(root, 'plain.txt'), 'wb') as file:
+        file.write(b'legacy plain')
+    check('Plain file served raw', retrieve(client, 'plain.txt') == b'legacy plain')
+
+    with CTRFile(AES(other_key, "ttable"), os.path.join(root, 'foreign.bin'), 'wb') as file:
+        file.write(b'secret for another key')
+    with open(os.path.join(root, 'foreign.bin'), 'rb') as file:
+        stored = file.read()
+    check('Other key container served raw', retrieve(client, 'foreign.bin') == stored
+          and client.size('foreign.bin') == len(stored))
+
+def test_client_decryption(client):
+    ## A client-side container downloaded with the wrong key fails and the connection stays usable
+
+    data = os.urandom(70000)
+    with tempfile.TemporaryDirectory() as directory:
+        src = os.path.join(directory, 'plain.bin')
+        dst = os.path.join(directory, 'decrypted.bin')
+        with open(src, 'wb') as file:
+            file.write(data)
+
+        store_encrypted(client, src, 'client.bin', key)
+        retrieve_decrypted(client, 'client.bin', dst, key)
+        with open(dst, 'rb') as file:
+            check('Client round trip', file.read() == data)
+
+        try:
+            retrieve_decrypted(client, 'client.bin', dst, other_key)
+            wrong_key = False
+        except ValueError:
+            wrong_key = True
+        check('Wrong key rejected', wrong_key)
+        check('Connection usable after rejection', client.size('new.bin') == 5)
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as root:
+        port = free_port()
+        server = FTPServerManager()
+        server.configure("127.0.0.1", port, "user", "password", root, key)
+        if not server.start_server():
+            sys.exit("FTP server did not start")
+
+        client = ftplib.FTP()
+        try:
+            client.connect('127.0.0.1', port)
+            client.login('user', 'password')
+
+            test_encrypted_storage(client, root)
+            test_refusals(client, root)
+            test_foreign_files(client, root)
+            test_client_decryption(client)
+
+            client.quit()
+        finally:
+            client.close()
+            server.stop_server()
+
+    if failures:
+        print(f'{len(failures)} check(s) failed: {", ".join(failures)}')
+        sys.exit(1)
+    print('All checks passed')
@@ -0,0 +1,61 @@
+import os
+import stat
+import tempfile
+from pyftpdlib.filesystems import AbstractedFS
+from crypto.aes import AES
+from crypto.container import HEADER_SIZE
+from crypto.ctr_file import CTRFile, read_ctr_header
+
+class PlaintextStat:
+    # stat result of a stored container with st_size reported as the plaintext size
+    def __init__(self, result, size):
+        self.result = result
+        self.st_size = size
+
+    def __getattr__(self, name):
+        return getattr(self.result, name)
+
+class EncryptedFS(AbstractedFS):
+    # Keeps files encrypted at rest: STOR/APPE encrypt chunk by chunk as data arrives and RETR
+    # decrypts on the fly, all through CTR containers so REST offsets map directly to file
+    # positions. Files in the directory that are not containers for this key are served as-is.
+    # The handler class supplies the key through its storage_key attribute. Relies on the
+    # open/mkstemp/stat hooks of pyftpdlib 2.0.1 - 2.2.0.
+    def __init__(self, root, cmd_channel):
+        super().__init__(root, cmd_channel)
+        self.aes = AES(cmd_channel.storage_key, "ttable")
+
+    def _is_container(self, path):
+        return read_ctr_header(path, self.aes) is not None
+
+    def open(self, filename, mode):
+        mode = mode.replace('t', '')
+        if 'b' not in mode:
+            mode += 'b'
+
+        if mode == 'wb' or self._is_container(filename):
+            return CTRFile(self.aes, filename, mode)
+
+        if mode == 'ab' and (not os.path.exists(filename) or os.path.getsize(filename) == 0):
+            return CTRFile(self.aes, filename, mode)
+
+        return open(filename, mode)
+
+    def mkstemp(self, suffix="", prefix="", dir=None, mode="wb"):
+        fd, name = tempfile.mkstemp(suffix, prefix, dir)
+        os.close(fd)
+        return CTRFile(self.aes, name, 'wb')
+
+    def _plaintext_stat(self, path, result):
+        if stat.S_ISREG(result.st_mode) and self._is_container(path):
+            return PlaintextStat(result, result.st_size - HEADER_SIZE)
+        return result
+
+    def stat(self, path):
+        return self._plaintext_stat(path, super().stat(path))
+
+    def lstat(self, path):
+        return self._plaintext_stat(path, super().lstat(path))
+
+    def getsize(self, path):
+        return self.stat(path).st_size
@@ -0,0 +1,448 @@
+import os
+import glob
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from crypto.aes import AES
+from crypto.container import HEADER_SIZE, detect_format
+from crypto.modes import MODE_ECB, MODE_NAMES
+from models.status import QUEUED, RUNNING, DONE, SKIPPED, FAILED, CANCELLED
+
+MANIFEST_NAME = ".paes_manifest.json"
+EXTENSIONS = {"encrypt": ".encrypted", "decrypt": ".decrypted"}
+
+def _crypt_file(key, engine, operation, source, destination, armor, mode):
+    # Runs in a worker process. Output goes to a temporary file that replaces the
+    # destination only once the job succeeded.
+    cipher = AES(key, engine)
+    partial = destination + ".part"
+    start = time.perf_counter()
+
+    try:
+        if operation == "encrypt":
+            file_format = "armored" if armor else "binary"
+        else:
+            with open(source, 'rb') as src:
+                file_format = detect_format(src.read(HEADER_SIZE))
+
+        if file_format == "binary":
+            # Memory-mapped path: no file content is read into Python memory
+            if operation == "encrypt":
+                cipher.encrypt_file(source, partial, mode=mode)
+            else:
+                cipher.decrypt_file(source, partial)
+        else:
+            with open(source, 'rb') as src, open(partial, 'wb') as dst:
+                if operation == "encrypt":
+                    cipher.encrypt_stream(src, dst, armor=True, mode=mode)
+                elif file_format == "armored":
+                    cipher.decrypt_stream(src, dst, armor=True)
+                else:
+                    dst.write(cipher.decrypt(src.read().decode('ascii')).encode('utf-8'))
+
+        os.replace(partial, destination)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+    return time.perf_counter() - start
+
+class EncryptionJob:
+    def __init__(self, source, root):
+        self.source = source
+        self.root = root # directory the source was found under, used for output layout
+        self.destination = None
+        self.operation = None
+        self.status = QUEUED
+        self.size = 0
+        self.elapsed = 0
+        self.error = None
+
+    def throughput(self):
+        # Bytes per second of the source file
+        return self.size / self.elapsed if self.elapsed > 0 else 0
+
+    def to_dict(self):
+        return {
+            'source': self.source,
+            'destination': self.destination,
+            'operation': self.operation,
+            'status': self.status,
+            'size': self.size,
+            'elapsed': self.elapsed,
+            'throughput': self.throughput(),
+            'error': self.error,
+        }
+
+class EncryptionQueueManager:
+    # Expands directories and glob patterns into per-file jobs and runs them on a process pool.
+    # Pausing stops new jobs from starting; jobs already running finish.
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.jobs = []
+        self.pending = deque()
+        self.lock = threading.Lock()
+        self.resume_event = threading.Event()
+        self.resume_event.set()
+        self.cancel_event = threading.Event()
+        self.thread = None
+
+        self.key = None
+        self.engine = "ttable"
+        self.operation = "encrypt"
+        self.output_directory = None
+        self.armor = False
+        self.mode = MODE_ECB
+        self.manifest_path = None
+        self.manifest = {}
+        self.destinations = set() # outputs claimed by jobs of the current run
+
+        self.start_time = None
+        self.end_time = None
+
+        self.status_callback = None
+        self.log_callback = None
+        self.job_callback = None
+
+    def set_status_callback(self, callback):
+        self.status_callback = callback
+
+    def set_log_callback(self, callback):
+        self.log_callback = callback
+
+    def set_job_callback(self, callback):
+        # Called from the scheduler thread with the job whose status changed
+        self.job_callback = callback
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def update_status(self, message):
+        if self.status_callback:
+            self.status_callback(message)
+
+    def _job_changed(self, job):
+        if self.job_callback:
+            self.job_callback(job)
+
+    def configure(self, key, operation, output_directory=None, armor=False, mode=MODE_ECB,
+                  workers=None, engine="ttable", manifest_path=None):
+        if operation not in ("encrypt", "decrypt"):
+            raise ValueError(f"Unknown operation: {operation}")
+        if mode not in MODE_NAMES:
+            raise ValueError(f"Unsupported mode: {mode}")
+
+        self.key = key
+        self.operation = operation
+        self.output_directory = output_directory
+        self.armor = armor
+        self.mode = mode
+        self.engine = engine
+        if workers:
+            self.workers = workers
+
+        # Manifest of finished jobs used to skip unchanged files; defaults to the output
+        # directory, or the directory of the first queued source
+        self.manifest_path = manifest_path
+
+    def add(self, path_or_pattern):
+        # Accepts a file, a directory (walked recursively) or a glob pattern; returns new jobs
+        if os.path.isdir(path_or_pattern):
+            root = path_or_pattern
+            files = []
+            for dirpath, dirnames, filenames in os.walk(path_or_pattern):
+                dirnames.sort()
+                files.extend(os.path.join(dirpath, name) for name in sorted(filenames))
+        elif glob.has_magic(path_or_pattern):
+            root = self._glob_root(path_or_pattern)
+            files = sorted(path for path in glob.glob(path_or_pattern, recursive=True) if os.path.isfile(path))
+        elif os.path.isfile(path_or_pattern):
+            root = os.path.dirname(path_or_pattern)
+            files = [path_or_pattern]
+        else:
+            self.log(f"No such file or directory: {path_or_pattern}")
+            return []
+
+        with self.lock:
+            known = {job.source for job in self.jobs if job.status == QUEUED}
+            added = []
+
+            for path in files:
+                path = os.path.abspath(path)
+                if path in known or os.path.basename(path) == MANIFEST_NAME or path.endswith(".part"):
+                    continue
+
+                job = EncryptionJob(path, os.path.abspath(root))
+                self.jobs.append(job)
+                added.append(job)
+                known.add(path)
+
+        self.log(f"Queued {len(added)} file(s) from {path_or_pattern}")
+        return added
+
+    def _glob_root(self, pattern):
+        parts = []
+        for part in pattern.replace("\\", "/").split("/"):
+            if glob.has_magic(part):
+                break
+            parts.append(part)
+        return "/".join(parts) or "."
+
+    def _destination(self, job):
+        # The output extension is appended (a.txt -> a.txt.encrypted) so sources that differ
+        # only in their extension get different outputs; decrypting a.txt.encrypted gives
+        # a.txt.decrypted. Any remaining clash within a run gets a numbered name.
+        extension = EXTENSIONS[self.operation]
+        relative = os.path.relpath(job.source, job.root)
+
+        if self.output_directory:
+            base = os.path.join(self.output_directory, relative)
+        else:
+            base = job.source
+
+        if self.operation == "decrypt" and base.endswith(EXTENSIONS["encrypt"]):
+            base = base[:-len(EXTENSIONS["encrypt"])]
+
+        destination = os.path.abspath(base + extension)
+        stem = os.path.abspath(base)
+        count = 1
+
+        while destination in self.destinations:
+            count += 1
+            destination = f"{stem}.{count}{extension}"
+
+        self.destinations.add(destination)
+        return destination
+
+    def clear_finished(self):
+        with self.lock:
+            self.jobs = [job for job in self.jobs if job.status in (QUEUED, RUNNING)]
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def is_paused(self):
+        return not self.resume_event.is_set()
+
+    def start(self):
+        if self.is_running():
+            self.log("Queue is already running")
+            return False
+
+        if not self.key:
+            self.log("Error: queue has no key configured")
+            return False
+
+        with self.lock:
+            self.pending = deque(job for job in self.jobs if job.status == QUEUED)
+
+        if not self.pending:
+            self.log("Queue is empty")
+            return False
+
+        if self.manifest_path is None:
+            self.manifest_path = os.path.join(self.output_directory or self.pending[0].root, MANIFEST_NAME)
+
+        self.cancel_event.clear()
+        self.resume_event.set()
+        self.manifest = self._load_manifest()
+        self.destinations = set()
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return True
+
+    def pause(self):
+        self.resume_event.clear()
+        self.update_status("Queue paused")
+        self.log("Queue paused")
+
+    def resume(self):
+        self.resume_event.set()
+        self.update_status("Queue running")
+        self.log("Queue resumed")
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.resume_event.set()
+
+    def _run(self):
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        self.update_status("Queue running")
+        in_flight = {}
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                if self.cancel_event.is_set():
+                    self._cancel_pending()
+
+                while self.resume_event.is_set() and self.pending and len(in_flight) < self.workers:
+                    job = self.pending.popleft()
+                    future = self._submit(executor, job)
+                    if future:
+                        in_flight[future] = job
+
+                if not in_flight:
+                    if not self.pending:
+                        break
+                    # Paused with nothing running
+                    self.resume_event.wait(0.2)
+                    continue
+
+                done, _ = wait(in_flight, timeout=0.2, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    self._complete(in_flight.pop(future), future)
+
+        self.end_time = time.perf_counter()
+        self._save_manifest()
+
+        summary = self.summary()
+        self.log(f"Queue finished: {summary['done']} done, {summary['skipped']} skipped, "
+                 f"{summary['failed']} failed, {summary['cancelled']} cancelled, "
+                 f"{summary['throughput'] / 1e6:.2f} MB/s")
+        self.update_status("Queue finished")
+
+    def _submit(self, executor, job):
+        job.operation = self.operation
+
+        if job.source.endswith(EXTENSIONS[self.operation]):
+            # Output of an earlier run found next to its sources; processing it again would
+            # add another layer every time the same folder is queued
+            job.status = SKIPPED
+            self._job_changed(job)
+            return None
+
+        job.destination = self._destination(job)
+
+        try:
+            stat = os.stat(job.source)
+            job.size = stat.st_size
+
+            if self._is_up_to_date(job, stat):
+                job.status = SKIPPED
+                self._job_changed(job)
+                return None
+
+            os.makedirs(os.path.dirname(job.destination) or ".", exist_ok=True)
+            future = executor.submit(_crypt_file, self.key, self.engine, self.operation,
+                                     job.source, job.destination, self.armor, self.mode)
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            self.log(f"Error queueing {job.source}: {str(e)}")
+            self._job_changed(job)
+            return None
+
+        job.status = RUNNING
+        self._job_changed(job)
+        return future
+
+    def _complete(self, job, future):
+        try:
+            job.elapsed = future.result()
+            job.status = DONE
+            self._record(job)
+            # Saved per job so a crash or kill keeps the progress made so far
+            self._save_manifest()
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            self.log(f"Error processing {job.source}: {str(e)}")
+
+        self._job_changed(job)
+
+    def _cancel_pending(self):
+        while self.pending:
+            job = self.pending.popleft()
+            job.status = CANCELLED
+            self._job_changed(job)
+
+    def _manifest_key(self, job):
+        return f"{job.operation}:{job.source}"
+
+    def _key_fingerprint(self):
+        # Only a hash of the key is written to disk; a different key means every output is stale
+        key = self.key if isinstance(self.key, bytes) else self.key.encode('utf-8')
+        return hashlib.sha256(key).hexdigest()
+
+    def _is_up_to_date(self, job, stat):
+        entry = self.manifest.get(self._manifest_key(job))
+
+        return (entry is not None
+                and entry['size'] == stat.st_size
+                and entry['mtime'] == stat.st_mtime
+                and entry['destination'] == job.destination
+                and entry['armor'] == self.armor
+                and entry['mode'] == self.mode
+                and entry.get('key') == self._key_fingerprint()
+                and os.path.exists(job.destination))
+
+    def _record(self, job):
+        stat = os.stat(job.source)
+        self.manifest[self._manifest_key(job)] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'destination': job.destination,
+            'armor': self.armor,
+            'mode': self.mode,
+            'key': self._key_fingerprint(),
+        }
+
+    def _load_manifest(self):
+        if not self.manifest_path or not os.path.exists(self.manifest_path):
+            return {}
+
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            self.log(f"Ignoring unreadable manifest {self.manifest_path}: {str(e)}")
+            return {}
+
+    def _save_manifest(self):
+        if not self.manifest_path:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+            partial = self.manifest_path + ".part"
+            with open(partial, 'w', encoding='utf-8') as file:
+                json.dump(self.manifest, file, indent=2)
+            os.replace(partial, self.manifest_path)
+        except OSError as e:
+            self.log(f"Error saving manifest: {str(e)}")
+
+    def summary(self):
+        with self.lock:
+            jobs = list(self.jobs)
+
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, SKIPPED, FAILED, CANCELLED)}
+        for job in jobs:
+            counts[job.status] += 1
+
+        processed = sum(job.size for job in jobs if job.status == DONE)
+        end = self.end_time or time.perf_counter()
+        elapsed = end - self.start_time if self.start_time else 0
+
+        counts.update({
+            'total': len(jobs),
+            'bytes': processed,
+            'elapsed': elapsed,
+            'throughput': processed / elapsed if elapsed > 0 else 0,
+            'failures': [{'source': job.source, 'error': job.error} for job in jobs if job.status == FAILED],
+        })
+        return counts
+
+    def write_report(self, path):
+        with self.lock:
+            jobs = [job.to_dict() for job in self.jobs]
+
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'summary': self.summary(), 'jobs': jobs}, file, indent=2)
@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+
+# Local directory listings for the server's file explorer as (name, is_dir, size, modified)
+# tuples. os.scandir gives the entry type without a stat call and a single stat per entry for
+# size and mtime; a listing is reused until the directory's own mtime changes, so navigating
+# back to a large folder does not stat it again.
+
+MODIFIED_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def scan_directory(directory, error_callback=None):
+    entries = []
+
+    with os.scandir(directory) as iterator:
+        for entry in iterator:
+            try:
+                is_dir = entry.is_dir()
+                stat = entry.stat()
+            except OSError as e:
+                if error_callback:
+                    error_callback(entry.name, e)
+                continue
+
+            modified = time.strftime(MODIFIED_FORMAT, time.localtime(stat.st_mtime))
+            entries.append((entry.name, is_dir, stat.st_size, modified))
+
+    return entries
+
+class ExplorerModel:
+    def __init__(self):
+        self.listings = {} # directory -> (directory st_mtime_ns, entries)
+        self.lock = threading.Lock()
+        self.error_callback = None
+
+    def set_error_callback(self, callback):
+        self.error_callback = callback
+
+    def list_directory(self, directory, refresh=False):
+        # Creating, deleting or renaming an entry changes the directory mtime; a file whose
+        # contents change in place does not, which is what refresh is for
+        directory = os.path.abspath(directory)
+        stamp = os.stat(directory).st_mtime_ns
+
+        with self.lock:
+            cached = self.listings.get(directory)
+        if cached is not None and not refresh and cached[0] == stamp:
+            return cached[1]
+
+        entries = scan_directory(directory, self.error_callback)
+        with self.lock:
+            self.listings[directory] = (stamp, entries)
+
+        return entries
+
+    def invalidate(self, directory=None):
+        with self.lock:
+            if directory is None:
+                self.listings.clear()
+            else:
+                self.listings.pop(os.path.abspath(directory), None)
@@ -0,0 +1,50 @@
+import ftplib
+from crypto.aes import AES
+from crypto.modes import MODE_ECB
+from crypto.pipeline import EncryptingReader, DecryptingWriter
+from crypto.stream import DEFAULT_CHUNK_SIZE
+
+# Encrypting and decrypting transfers shared by FTPClientManager and FTPTransferManager. Data
+# is encrypted or decrypted chunk by chunk as it moves, so no temporary file is written.
+
+ENGINE = "ttable"
+
+def store_encrypted(client, local_path, remote_path, key, mode=MODE_ECB, callback=None, blocksize=DEFAULT_CHUNK_SIZE):
+    # callback receives each block of container bytes sent; returns the plaintext bytes read
+    with open(local_path, 'rb') as local_file, EncryptingReader(AES(key, ENGINE), local_file, mode) as reader:
+        client.storbinary(f'STOR {remote_path}', reader, blocksize, callback)
+
+    return reader.bytes_read
+
+def retrieve_decrypted(client, remote_path, local_path, key, callback=None, blocksize=DEFAULT_CHUNK_SIZE):
+    # callback receives each block of container bytes received; returns the plaintext bytes
+    # written. Raises ValueError for a wrong key or a damaged container. Containers written
+    # before headers carried a key check byte only show a wrong key through CBC/ECB padding;
+    # in CTR mode they decrypt to garbage without an error.
+    with open(local_path, 'wb') as local_file:
+        writer = DecryptingWriter(AES(key, ENGINE), local_file)
+
+        aborted = []
+
+        def write(data):
+            try:
+                writer.write(data)
+                if callback:
+                    callback(data)
+            except Exception:
+                aborted.append(True)
+                raise
+
+        try:
+            client.retrbinary(f'RETR {remote_path}', write, blocksize)
+        except Exception:
+            if aborted:
+                # retrbinary closed the data connection without reading the server's reply;
+                # read it now so the next command on this connection gets its own answer
+                try:
+                    client.voidresp()
+                except (ftplib.Error, OSError):
+                    pass
+            raise
+
+        return writer.finish()
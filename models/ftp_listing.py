@@ -0,0 +1,119 @@
+import calendar
+import ftplib
+import threading
+import time
+
+# Remote directory listings as (name, is_dir, size, mtime, modified) tuples. MLSD returns
+# machine-readable facts; servers without it fall back to LIST, whose dates are only kept as
+# display text (mtime is None). modified is the text shown in the file explorer.
+
+UNSUPPORTED_REPLIES = ('500', '501', '502', '504')
+DEFAULT_TTL = 30 # seconds a cached listing is served without asking the server
+
+def parse_ftp_time(value):
+    # MLSD/MDTM timestamps are UTC "YYYYMMDDHHMMSS" with optional fractional seconds
+    return calendar.timegm(time.strptime(value[:14], "%Y%m%d%H%M%S"))
+
+def is_unsupported(error):
+    return str(error).startswith(UNSUPPORTED_REPLIES)
+
+def mlsd_entries(client, path=""):
+    entries = []
+
+    for name, facts in client.mlsd(path, facts=["type", "size", "modify"]):
+        kind = facts.get("type", "").lower()
+        if kind in ("cdir", "pdir") or name in (".", ".."):
+            continue
+
+        modify = facts.get("modify")
+        mtime = parse_ftp_time(modify) if modify else None
+        modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime)) if mtime is not None else ""
+        entries.append((name, kind == "dir", int(facts.get("size") or 0), mtime, modified))
+
+    return entries
+
+def list_entries(client, path=""):
+    # Unix-style LIST lines: permissions, links, owner, group, size, month, day, time/year, name
+    entries = []
+
+    def process_line(line):
+        parts = line.split(None, 8)
+        if len(parts) < 9 or not parts[4].isdigit():
+            return
+
+        name = parts[8]
+        if parts[0].startswith('l') and " -> " in name:
+            name = name.split(" -> ", 1)[0]
+        if name in (".", ".."):
+            return
+
+        entries.append((name, parts[0].startswith('d'), int(parts[4]), None, " ".join(parts[5:8])))
+
+    client.retrlines(f'LIST {path}' if path else 'LIST', process_line)
+    return entries
+
+def list_directory(client, path="", use_mlsd=True):
+    # Returns (entries, whether MLSD was used); callers pass use_mlsd=False once a server
+    # has rejected MLSD to skip the failing round trip
+    if use_mlsd:
+        try:
+            return mlsd_entries(client, path), True
+        except ftplib.error_perm as e:
+            if not is_unsupported(e):
+                raise
+
+    return list_entries(client, path), False
+
+def modification_time(client, path):
+    # MDTM for servers without MLSD; None when unavailable
+    try:
+        response = client.sendcmd(f'MDTM {path}')
+    except ftplib.error_perm:
+        return None
+
+    try:
+        return parse_ftp_time(response.split()[1])
+    except (IndexError, ValueError):
+        return None
+
+def set_modification_time(client, path, mtime):
+    # MFMT sets the remote mtime; returns False when the server does not support it
+    stamp = time.strftime("%Y%m%d%H%M%S", time.gmtime(mtime))
+    try:
+        client.sendcmd(f'MFMT {stamp} {path}')
+        return True
+    except ftplib.error_perm:
+        return False
+
+class ListingCache:
+    # Directory listings by absolute remote path, served until they are ttl seconds old or
+    # invalidated by an operation that changes the directory
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        with self.lock:
+            cached = self.entries.get(path)
+            if cached is None:
+                return None
+
+            created, listing = cached
+            if time.monotonic() - created > self.ttl:
+                del self.entries[path]
+                return None
+
+            return listing
+
+    def put(self, path, listing):
+        with self.lock:
+            self.entries[path] = (time.monotonic(), listing)
+
+    def invalidate(self, path=None):
+        # Drops one directory, or every listing when path is None
+        with self.lock:
+            if path is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(path, None)
@@ -6,6 +6,7 @@ import time
 from pyftpdlib.authorizers import DummyAuthorizer
 from pyftpdlib.handlers import FTPHandler
 from pyftpdlib.servers import FTPServer
+from models.encrypted_fs import EncryptedFS
 
 class FTPServerManager:
     def __init__(self):
@@ -20,6 +21,7 @@ class FTPServerManager:
         self.username = ""
         self.password = ""
         self.directory = ""
+        self.storage_key = None
 
             
     def set_status_callback(self, callback):
@@ -36,17 +38,20 @@ class FTPServerManager:
         if self.status_callback:
             self.status_callback(message)
             
-    def configure(self, host, port, username, password, directory):
+    def configure(self, host, port, username, password, directory, storage_key=None):
         self.host = host
         self.port = port
         self.username = username
         self.password = password
         self.directory = directory
+        # With a key, uploads are stored as CTR containers and decrypted again on download
+        self.storage_key = storage_key
         
         if not os.path.exists(self.directory):
             os.makedirs(self.directory)
             
-        self.log(f"Server configured: {self.host}:{self.port}, Directory: {self.directory}")
+        self.log(f"Server configured: {self.host}:{self.port}, Directory: {self.directory}"
+                 + (", Encrypted storage" if self.storage_key else ""))
         
     def start_server(self):
         if self.running:
@@ -78,6 +83,10 @@ class FTPServerManager:
             handler.authorizer = authorizer
             handler.banner = "AES Encryption/Decryption Tool FTP Server Ready"
             
+            if self.storage_key:
+                handler.abstracted_fs = EncryptedFS
+                handler.storage_key = self.storage_key
+            
             # Check if port is available
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             result = sock.connect_ex((self.host, self.port))
@@ -139,5 +148,6 @@ class FTPServerManager:
             "username": self.username,
             "password": self.password,
             "directory": self.directory,
+            "encrypted_storage": bool(self.storage_key),
             "running": self.running
         }
\ No newline at end of file
@@ -0,0 +1,112 @@
+import os
+import ftplib
+import hashlib
+
+# Resume support for interrupted FTP transfers. A download continues from the size of the
+# local partial file with REST + RETR; an upload asks the server for the remote size (SIZE)
+# and appends the rest with APPE, falling back to REST + STOR. Optionally the last verify bytes
+# already transferred are fetched again and compared by checksum before resuming.
+
+VERIFY_SIZE = 64 * 1024
+BLOCK_SIZE = 64 * 1024
+
+def remote_size(client, path):
+    # None when the file does not exist or the server has no SIZE command
+    try:
+        client.voidcmd('TYPE I')
+        return client.size(path)
+    except ftplib.error_perm:
+        return None
+
+def read_remote_range(client, path, offset, length):
+    client.voidcmd('TYPE I')
+    data = bytearray()
+
+    with client.transfercmd(f'RETR {path}', offset or None) as conn:
+        while len(data) < length:
+            chunk = conn.recv(min(BLOCK_SIZE, length - len(data)))
+            if not chunk:
+                break
+            data += chunk
+
+    try:
+        client.voidresp()
+    except (ftplib.error_temp, ftplib.error_perm):
+        # Closing the data connection early makes servers answer 426
+        pass
+
+    return bytes(data)
+
+def read_local_range(path, offset, length):
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        return file.read(length)
+
+def overlap_matches(client, remote_path, local_path, end, verify):
+    # Compares the checksums of the verify bytes before end on both sides
+    length = min(verify, end)
+    if length <= 0:
+        return True
+
+    remote = hashlib.sha256(read_remote_range(client, remote_path, end - length, length)).digest()
+    local = hashlib.sha256(read_local_range(local_path, end - length, length)).digest()
+    return remote == local
+
+def download_offset(client, remote_path, local_path, verify=0):
+    # Returns (offset to resume from, remote size); offset 0 means start over
+    size = remote_size(client, remote_path)
+
+    if not os.path.exists(local_path):
+        return 0, size
+
+    local = os.path.getsize(local_path)
+    if size is None or local > size:
+        return 0, size
+
+    if verify and not overlap_matches(client, remote_path, local_path, local, verify):
+        return 0, size
+
+    return local, size
+
+def upload_offset(client, local_path, remote_path, verify=0):
+    # Returns (offset to resume from, local size); offset 0 means start over
+    size = os.path.getsize(local_path)
+    remote = remote_size(client, remote_path)
+
+    if not remote or remote > size:
+        return 0, size
+
+    if verify and not overlap_matches(client, remote_path, local_path, remote, verify):
+        return 0, size
+
+    return remote, size
+
+def retrieve(client, remote_path, local_path, offset=0, callback=None, blocksize=BLOCK_SIZE):
+    # Writes the remote file from offset on into local_path, keeping the first offset bytes
+    with open(local_path, 'r+b' if offset else 'wb') as local_file:
+        local_file.seek(offset)
+        local_file.truncate()
+
+        def write(data):
+            local_file.write(data)
+            if callback:
+                callback(data)
+
+        client.retrbinary(f'RETR {remote_path}', write, blocksize, rest=offset or None)
+
+def store(client, local_path, remote_path, offset=0, callback=None, blocksize=BLOCK_SIZE):
+    # Sends local_path from offset on, appending to the first offset bytes already on the server
+    with open(local_path, 'rb') as local_file:
+        if not offset:
+            client.storbinary(f'STOR {remote_path}', local_file, blocksize, callback)
+            return
+
+        local_file.seek(offset)
+        try:
+            client.storbinary(f'APPE {remote_path}', local_file, blocksize, callback)
+        except ftplib.error_perm as e:
+            if not str(e).startswith(('500', '502', '504')):
+                raise
+            # APPE not implemented by the server
+            local_file.seek(offset)
+            client.storbinary(f'STOR {remote_path}', local_file, blocksize, callback, rest=offset)
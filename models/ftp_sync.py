@@ -0,0 +1,358 @@
+import os
+import ftplib
+import json
+import posixpath
+import threading
+import time
+from crypto.container import HEADER_SIZE
+from crypto.mapped import ciphertext_length
+from crypto.modes import MODE_ECB, MODE_NAMES
+from models.ftp_listing import list_directory, modification_time, set_modification_time
+from models.ftp_transfers import FTPConnectionPool
+from models.status import DONE
+from models.ftpclient_model import ENCRYPTED_EXTENSION
+
+UPLOAD = "upload" # mirror the local tree onto the server
+DOWNLOAD = "download" # mirror the remote tree into the local directory
+
+MTIME_TOLERANCE = 2 # seconds; FTP timestamps have whole-second resolution
+
+PARTIAL = "partial"
+
+class SyncAction:
+    def __init__(self, relative_path, reason, source_size, source_mtime, target_size=None, target_mtime=None):
+        self.relative_path = relative_path # '/'-separated, relative to both roots
+        self.reason = reason
+        self.source_size = source_size
+        self.source_mtime = source_mtime
+        self.target_size = target_size
+        self.target_mtime = target_mtime
+        self.transfer = None
+
+    def to_dict(self):
+        return {
+            'path': self.relative_path,
+            'reason': self.reason,
+            'source_size': self.source_size,
+            'source_mtime': self.source_mtime,
+            'target_size': self.target_size,
+            'target_mtime': self.target_mtime,
+            'status': self.transfer.status if self.transfer else None,
+        }
+
+class FTPSyncManager:
+    # Walks the local and remote trees, compares them by size and mtime (MLSD facts, or LIST
+    # sizes plus MDTM when MLSD is missing) and hands only the changed files to an
+    # FTPTransferManager, which moves them in parallel. Nothing is deleted on either side.
+    def __init__(self, transfers):
+        self.transfers = transfers
+        self.thread = None
+
+        self.host = ""
+        self.port = 21
+        self.username = ""
+        self.password = ""
+        self.local_root = ""
+        self.remote_root = "/"
+        self.direction = UPLOAD
+        self.key = None
+        self.mode = MODE_ECB
+
+        self.actions = []
+        self.directories = [] # relative directories missing on the target side
+        self.unchanged = 0
+        self.used_mlsd = True
+        self.dry_run = False
+        self.start_time = None
+        self.end_time = None
+
+        self.status_callback = None
+        self.log_callback = None
+
+    def set_status_callback(self, callback):
+        self.status_callback = callback
+
+    def set_log_callback(self, callback):
+        self.log_callback = callback
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def update_status(self, message):
+        if self.status_callback:
+            self.status_callback(message)
+
+    def configure(self, host, port, username, password, local_root, remote_root, direction=UPLOAD,
+                  key=None, mode=MODE_ECB):
+        if direction not in (UPLOAD, DOWNLOAD):
+            raise ValueError(f"Unknown sync direction: {direction}")
+        if mode not in MODE_NAMES:
+            raise ValueError(f"Unsupported mode: {mode}")
+        if key and direction != UPLOAD:
+            raise ValueError("Encryption is only available when syncing to the server")
+
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.local_root = local_root
+        self.remote_root = remote_root or "/"
+        self.direction = direction
+        # With a key, files are encrypted on the way up and stored with ENCRYPTED_EXTENSION
+        self.key = key
+        self.mode = mode
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, dry_run=False):
+        if self.is_running():
+            self.log("Sync is already running")
+            return False
+
+        if self.transfers.is_running():
+            self.log("Wait for the current transfers to finish before syncing")
+            return False
+
+        if not os.path.isdir(self.local_root):
+            self.log(f"Local directory not found: {self.local_root}")
+            return False
+
+        self.dry_run = dry_run
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return True
+
+    def _run(self):
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        pool = FTPConnectionPool(self.host, self.port, self.username, self.password, 1)
+
+        try:
+            client = pool.acquire()
+            try:
+                self.update_status("Comparing local and remote trees...")
+                self.plan(client)
+                self.log(self._plan_summary())
+
+                if not self.dry_run and self.actions:
+                    self._create_directories(client)
+            finally:
+                pool.release(client)
+                pool.close_all()
+
+            if not self.dry_run and self.actions:
+                self._transfer()
+
+                # The planning connection would have sat idle for the whole transfer and may
+                # have been timed out by the server, so the mtimes go over a new one
+                client = pool.acquire()
+                try:
+                    self._copy_mtimes(client)
+                finally:
+                    pool.release(client)
+                    pool.close_all()
+        except Exception as e:
+            self.log(f"Sync error: {str(e)}")
+            self.update_status("Sync failed")
+            return
+        finally:
+            self.end_time = time.perf_counter()
+
+        self.update_status("Dry run finished" if self.dry_run else "Sync finished")
+
+    def plan(self, client):
+        self.used_mlsd = True
+        local_files, local_dirs = self._walk_local()
+        remote_files, remote_dirs = self._walk_remote(client)
+
+        if self.direction == UPLOAD:
+            sources, targets, target_dirs = local_files, remote_files, remote_dirs
+            self.directories = sorted(d for d in local_dirs if d not in remote_dirs)
+        else:
+            sources, targets, target_dirs = remote_files, local_files, local_dirs
+            self.directories = sorted(d for d in remote_dirs if d not in local_dirs)
+
+        self.actions = []
+        self.unchanged = 0
+
+        for relative_path in sorted(sources):
+            size, mtime = sources[relative_path]
+            target_path = self._target_name(relative_path)
+
+            if target_path in target_dirs:
+                self.log(f"Skipping {relative_path}: a directory of that name exists on the target")
+                continue
+
+            reason = self._compare(client, target_path, size, mtime, targets)
+            if reason is None:
+                self.unchanged += 1
+                continue
+
+            target_size, target_mtime = targets.get(target_path, (None, None))
+            self.actions.append(SyncAction(relative_path, reason, size, mtime, target_size, target_mtime))
+
+        return self.actions
+
+    def _target_name(self, relative_path):
+        return relative_path + ENCRYPTED_EXTENSION if self.key else relative_path
+
+    def _expected_size(self, size):
+        if not self.key:
+            return size
+        return HEADER_SIZE + ciphertext_length(size, self.mode)
+
+    def _compare(self, client, target_path, size, mtime, targets):
+        # Returns why the file has to be transferred, or None when the target is up to date
+        if target_path not in targets:
+            return "missing"
+
+        target_size, target_mtime = targets[target_path]
+        expected_size = self._expected_size(size)
+
+        if (target_mtime is None and self.direction == UPLOAD) or (mtime is None and self.direction == DOWNLOAD):
+            # LIST gave no dates; only needed when the sizes leave the question open
+            if target_size == expected_size or (not self.key and target_size < size):
+                remote_mtime = modification_time(client, posixpath.join(self.remote_root, target_path))
+                if self.direction == UPLOAD:
+                    target_mtime = remote_mtime
+                else:
+                    mtime = remote_mtime
+
+        newer = mtime is not None and target_mtime is not None and mtime > target_mtime + MTIME_TOLERANCE
+
+        if target_size != expected_size:
+            # A shorter plain copy written after the source last changed is an interrupted
+            # transfer and can be resumed; anything else is sent again in full
+            if not self.key and target_size < size and target_mtime is not None and not newer:
+                return PARTIAL
+            return "size"
+
+        return "newer" if newer else None
+
+    def _walk_local(self):
+        # {relative path: (size, mtime)} and the set of relative directories
+        files = {}
+        directories = set()
+
+        for dirpath, dirnames, filenames in os.walk(self.local_root):
+            dirnames.sort()
+            relative_dir = os.path.relpath(dirpath, self.local_root).replace(os.sep, "/")
+            prefix = "" if relative_dir == "." else relative_dir + "/"
+
+            if prefix:
+                directories.add(relative_dir)
+
+            for name in filenames:
+                if name.endswith(".part"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(dirpath, name))
+                except OSError:
+                    continue
+                files[prefix + name] = (stat.st_size, stat.st_mtime)
+
+        return files, directories
+
+    def _walk_remote(self, client):
+        files = {}
+        directories = set()
+        pending = [""]
+
+        while pending:
+            relative_dir = pending.pop()
+            path = posixpath.join(self.remote_root, relative_dir) if relative_dir else self.remote_root
+
+            entries, self.used_mlsd = list_directory(client, path, self.used_mlsd)
+
+            for name, is_dir, size, mtime, _ in entries:
+                relative_path = f"{relative_dir}/{name}" if relative_dir else name
+                if is_dir:
+                    directories.add(relative_path)
+                    pending.append(relative_path)
+                else:
+                    files[relative_path] = (size, mtime)
+
+        return files, directories
+
+    def _create_directories(self, client):
+        for relative_dir in self.directories:
+            if self.direction == UPLOAD:
+                try:
+                    client.mkd(posixpath.join(self.remote_root, relative_dir))
+                except ftplib.error_perm as e:
+                    if not str(e).startswith('550'):
+                        raise
+            else:
+                os.makedirs(os.path.join(self.local_root, *relative_dir.split("/")), exist_ok=True)
+
+    def _transfer(self):
+        if self.transfers.is_running():
+            raise RuntimeError("Other transfers were started during the comparison; sync again once they finish")
+
+        for action in self.actions:
+            local_path = os.path.join(self.local_root, *action.relative_path.split("/"))
+            remote_path = posixpath.join(self.remote_root, self._target_name(action.relative_path))
+
+            resume = action.reason == PARTIAL
+            if self.direction == UPLOAD:
+                action.transfer = self.transfers.add_upload(local_path, remote_path, self.key, self.mode, resume)
+            else:
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                action.transfer = self.transfers.add_download(remote_path, local_path, resume=resume)
+
+        self.transfers.configure(self.host, self.port, self.username, self.password)
+        self.update_status(f"Syncing {len(self.actions)} file(s)...")
+        if not self.transfers.start():
+            raise RuntimeError("Sync transfers could not be started")
+        self.transfers.thread.join()
+
+    def _copy_mtimes(self, client):
+        # Give each copy its source's mtime so the next comparison sees it as unchanged
+        for action in self.actions:
+            if not action.transfer or action.transfer.status != DONE or action.source_mtime is None:
+                continue
+
+            if self.direction == UPLOAD:
+                if not set_modification_time(client, action.transfer.remote_path, action.source_mtime):
+                    return # the server has no MFMT; its upload time is newer than the source anyway
+            else:
+                os.utime(action.transfer.local_path, (action.source_mtime, action.source_mtime))
+
+    def _plan_summary(self):
+        total = sum(action.source_size for action in self.actions)
+        prefix = "Dry run: " if self.dry_run else ""
+        listing = "MLSD" if self.used_mlsd else "LIST"
+        return (f"{prefix}{len(self.actions)} file(s) to {self.direction} ({total / 1e6:.2f} MB), "
+                f"{len(self.directories)} new folder(s), {self.unchanged} unchanged [{listing}]")
+
+    def summary(self):
+        statuses = {}
+        for action in self.actions:
+            if action.transfer:
+                statuses[action.transfer.status] = statuses.get(action.transfer.status, 0) + 1
+
+        end = self.end_time or time.perf_counter()
+        return {
+            'direction': self.direction,
+            'local_root': self.local_root,
+            'remote_root': self.remote_root,
+            'encrypted': bool(self.key),
+            'dry_run': self.dry_run,
+            'listing': "MLSD" if self.used_mlsd else "LIST",
+            'to_transfer': len(self.actions),
+            'bytes': sum(action.source_size for action in self.actions),
+            'new_directories': len(self.directories),
+            'unchanged': self.unchanged,
+            'statuses': statuses,
+            'elapsed': end - self.start_time if self.start_time else 0,
+        }
+
+    def write_report(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({
+                'summary': self.summary(),
+                'directories': self.directories,
+                'actions': [action.to_dict() for action in self.actions],
+            }, file, indent=2)
@@ -0,0 +1,444 @@
+import os
+import ftplib
+import posixpath
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from crypto.container import HEADER_SIZE
+from crypto.mapped import ciphertext_length
+from crypto.modes import MODE_ECB
+from crypto.progress import ProgressTracker, OperationCancelled
+from crypto.stream import DEFAULT_CHUNK_SIZE
+from models.ftp_crypto import store_encrypted, retrieve_decrypted
+from models.ftp_resume import remote_size, download_offset, upload_offset, retrieve, store
+from models.status import QUEUED, RUNNING, RETRYING, DONE, FAILED, CANCELLED
+
+DOWNLOAD = "download"
+UPLOAD = "upload"
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0 # seconds before the first retry, doubled for each further attempt
+
+# Errors a retry cannot fix: a wrong key or damaged container (ValueError) and local files
+# that are missing or not accessible. 5xx replies are handled separately.
+PERMANENT_ERRORS = (ValueError, FileNotFoundError, PermissionError, IsADirectoryError, NotADirectoryError)
+
+class FTPConnectionPool:
+    # Keeps up to size authenticated control connections. Connections are opened on demand and
+    # reused, so many small transfers pay for the login handshake only once per connection.
+    def __init__(self, host, port, username, password, size=DEFAULT_CONNECTIONS, timeout=10):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.opened = 0
+
+    def _open(self):
+        client = ftplib.FTP()
+        client.connect(self.host, self.port, timeout=self.timeout)
+        client.login(self.username, self.password)
+        return client
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            create = self.opened < self.size
+            if create:
+                self.opened += 1
+
+        if not create:
+            return self.idle.get()
+
+        try:
+            return self._open()
+        except BaseException:
+            with self.lock:
+                self.opened -= 1
+            raise
+
+    def release(self, client, broken=False):
+        # A connection that failed mid-transfer may have unread replies; drop it
+        if not broken:
+            self.idle.put(client)
+            return
+
+        with self.lock:
+            self.opened -= 1
+        try:
+            client.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        while True:
+            try:
+                client = self.idle.get_nowait()
+            except queue.Empty:
+                break
+
+            with self.lock:
+                self.opened -= 1
+            try:
+                client.quit()
+            except Exception:
+                client.close()
+
+class FTPTransfer:
+    def __init__(self, direction, remote_path, local_path, key=None, mode=MODE_ECB, resume=None):
+        self.direction = direction
+        self.remote_path = remote_path
+        self.local_path = local_path
+        self.key = key # when set, uploads are encrypted and downloads decrypted on the fly
+        self.mode = mode
+        self.resume = resume # overrides the manager's resume setting when not None
+        self.status = QUEUED
+        self.size = 0
+        self.transferred = 0
+        self.offset = 0 # bytes already in place when the current attempt resumed
+        self.attempts = 0
+        self.start_time = None
+        self.elapsed = 0
+        self.error = None
+
+    def name(self):
+        return posixpath.basename(self.remote_path)
+
+    def speed(self):
+        elapsed = time.perf_counter() - self.start_time if self.status == RUNNING else self.elapsed
+        return (self.transferred - self.offset) / elapsed if elapsed and elapsed > 0 else 0
+
+    def to_dict(self):
+        return {
+            'direction': self.direction,
+            'remote_path': self.remote_path,
+            'local_path': self.local_path,
+            'status': self.status,
+            'size': self.size,
+            'transferred': self.transferred,
+            'resumed_from': self.offset,
+            'attempts': self.attempts,
+            'elapsed': self.elapsed,
+            'throughput': self.speed(),
+            'error': self.error,
+        }
+
+class FTPTransferManager:
+    # Runs queued downloads and uploads concurrently, one pooled connection per worker.
+    # Transient failures are retried with exponential backoff; permanent (5xx) replies are not.
+    # Retries of plain transfers continue where the failed attempt stopped; with resume set,
+    # partial files left over from earlier runs are continued as well (after checking the
+    # last verify bytes) and kept when a transfer fails.
+    def __init__(self, connections=DEFAULT_CONNECTIONS, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 resume=False, verify=0):
+        self.connections = connections
+        self.retries = retries
+        self.backoff = backoff
+        self.resume = resume
+        self.verify = verify
+        self.transfers = []
+        self.lock = threading.Lock()
+        self.cancel_event = threading.Event()
+        self.thread = None
+        self.pool = None
+
+        self.host = ""
+        self.port = 21
+        self.username = ""
+        self.password = ""
+
+        self.start_time = None
+        self.end_time = None
+
+        self.status_callback = None
+        self.log_callback = None
+        self.transfer_callback = None
+
+    def set_status_callback(self, callback):
+        self.status_callback = callback
+
+    def set_log_callback(self, callback):
+        self.log_callback = callback
+
+    def set_transfer_callback(self, callback):
+        # Called from worker threads with the transfer whose status or progress changed
+        self.transfer_callback = callback
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def update_status(self, message):
+        if self.status_callback:
+            self.status_callback(message)
+
+    def _transfer_changed(self, transfer):
+        if self.transfer_callback:
+            self.transfer_callback(transfer)
+
+    def configure(self, host, port, username, password, connections=None, resume=None, verify=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        if connections:
+            self.connections = connections
+        if resume is not None:
+            self.resume = resume
+        if verify is not None:
+            self.verify = verify
+
+    def add_download(self, remote_path, local_path, key=None, resume=None):
+        return self._add(FTPTransfer(DOWNLOAD, remote_path, local_path, key, resume=resume))
+
+    def add_upload(self, local_path, remote_path, key=None, mode=MODE_ECB, resume=None):
+        return self._add(FTPTransfer(UPLOAD, remote_path, local_path, key, mode, resume))
+
+    def _add(self, transfer):
+        with self.lock:
+            self.transfers.append(transfer)
+        return transfer
+
+    def clear_finished(self):
+        with self.lock:
+            self.transfers = [transfer for transfer in self.transfers if transfer.status in (QUEUED, RUNNING, RETRYING)]
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            self.log("Transfers are already running")
+            return False
+
+        with self.lock:
+            pending = [transfer for transfer in self.transfers if transfer.status == QUEUED]
+
+        if not pending:
+            self.log("No transfers queued")
+            return False
+
+        self.cancel_event.clear()
+        self.pool = FTPConnectionPool(self.host, self.port, self.username, self.password, self.connections)
+
+        self.thread = threading.Thread(target=self._run, args=(pending,), daemon=True)
+        self.thread.start()
+        return True
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _run(self, pending):
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        self.update_status(f"Transferring {len(pending)} file(s) over {self.connections} connection(s)")
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.connections, thread_name_prefix="ftp-transfer") as executor:
+                list(executor.map(self._run_transfer, pending))
+        finally:
+            self.pool.close_all()
+
+        self.end_time = time.perf_counter()
+
+        summary = self.summary()
+        self.log(f"Transfers finished: {summary['done']} done, {summary['failed']} failed, "
+                 f"{summary['cancelled']} cancelled, {summary['throughput'] / 1e6:.2f} MB/s")
+        self.update_status("Transfers finished")
+
+    def _run_transfer(self, transfer):
+        transfer.start_time = time.perf_counter()
+
+        while True:
+            if self.cancel_event.is_set():
+                self._finish(transfer, CANCELLED)
+                return
+
+            transfer.attempts += 1
+            transfer.status = RUNNING
+            transfer.transferred = 0
+            transfer.offset = 0
+            self._transfer_changed(transfer)
+
+            client = None
+            try:
+                client = self.pool.acquire()
+                if transfer.direction == DOWNLOAD:
+                    self._download(client, transfer)
+                else:
+                    self._upload(client, transfer)
+                self.pool.release(client)
+                self._finish(transfer, DONE)
+                return
+            except OperationCancelled:
+                self._release_broken(client)
+                self._remove_partial(transfer)
+                self._finish(transfer, CANCELLED)
+                return
+            except ftplib.error_perm as e:
+                # 5xx replies (missing file, permissions) will not succeed on a retry
+                if client is not None:
+                    self.pool.release(client)
+                self._fail(transfer, e)
+                return
+            except PERMANENT_ERRORS as e:
+                # The connection may be left mid-transfer, so it is not reused
+                self._release_broken(client)
+                self._fail(transfer, e)
+                return
+            except Exception as e:
+                self._release_broken(client)
+
+                if transfer.attempts > self.retries:
+                    self._fail(transfer, e)
+                    return
+
+                delay = self.backoff * 2 ** (transfer.attempts - 1)
+                transfer.status = RETRYING
+                transfer.error = str(e)
+                self.log(f"Retrying {transfer.name()} in {delay:.1f}s: {str(e)}")
+                self._transfer_changed(transfer)
+                self.cancel_event.wait(delay)
+
+    def _release_broken(self, client):
+        if client is not None:
+            self.pool.release(client, broken=True)
+
+    def _tracker(self, transfer):
+        def report(done, total, speed):
+            transfer.transferred = done
+            self._transfer_changed(transfer)
+
+        return ProgressTracker(transfer.size, report, self.cancel_event)
+
+    def _resumable(self, transfer):
+        # Encrypted transfers always start over: the cipher stream cannot be picked up midway
+        resume = self.resume if transfer.resume is None else transfer.resume
+        return not transfer.key and (resume or transfer.attempts > 1)
+
+    def _verify_size(self, transfer):
+        # A partial file from an earlier attempt of this run needs no verification
+        return self.verify if transfer.attempts == 1 else 0
+
+    def _download(self, client, transfer):
+        if self._resumable(transfer):
+            offset, size = download_offset(client, transfer.remote_path, transfer.local_path,
+                                           self._verify_size(transfer))
+        else:
+            offset, size = 0, remote_size(client, transfer.remote_path)
+
+        transfer.size = size or 0
+        if self._resume_at(transfer, offset):
+            return
+
+        tracker = self._tracker(transfer)
+        received = offset
+
+        def count(data):
+            nonlocal received
+            received += len(data)
+            tracker.update(received)
+
+        if transfer.key:
+            retrieve_decrypted(client, transfer.remote_path, transfer.local_path, transfer.key, count,
+                               DEFAULT_CHUNK_SIZE)
+        else:
+            retrieve(client, transfer.remote_path, transfer.local_path, offset, count, DEFAULT_CHUNK_SIZE)
+
+            if transfer.size and received < transfer.size:
+                # The data connection closed early; a retry resumes from here
+                raise EOFError(f"Transfer ended at {received} of {transfer.size} bytes")
+
+        tracker.update(received, final=True)
+
+    def _upload(self, client, transfer):
+        if self._resumable(transfer):
+            offset, size = upload_offset(client, transfer.local_path, transfer.remote_path,
+                                         self._verify_size(transfer))
+        else:
+            offset, size = 0, os.path.getsize(transfer.local_path)
+
+        if transfer.key:
+            # storbinary reports container bytes: header plus padded ciphertext
+            size = HEADER_SIZE + ciphertext_length(size, transfer.mode)
+
+        transfer.size = size
+        if self._resume_at(transfer, offset):
+            return
+
+        tracker = self._tracker(transfer)
+        sent = offset
+
+        def count(data):
+            nonlocal sent
+            sent += len(data)
+            tracker.update(sent)
+
+        if transfer.key:
+            store_encrypted(client, transfer.local_path, transfer.remote_path, transfer.key, transfer.mode,
+                            count, DEFAULT_CHUNK_SIZE)
+        else:
+            store(client, transfer.local_path, transfer.remote_path, offset, count, DEFAULT_CHUNK_SIZE)
+
+        tracker.update(sent, final=True)
+
+    def _resume_at(self, transfer, offset):
+        transfer.offset = offset
+        transfer.transferred = offset
+
+        if offset:
+            self.log(f"Resuming {transfer.name()} at {offset} bytes")
+        return bool(offset) and offset == transfer.size
+
+    def _remove_partial(self, transfer):
+        # Plain partial downloads stay on disk for a later resume
+        if transfer.direction == DOWNLOAD and (transfer.key or not self.resume) and os.path.exists(transfer.local_path):
+            try:
+                os.remove(transfer.local_path)
+            except OSError:
+                pass
+
+    def _fail(self, transfer, error):
+        self._remove_partial(transfer)
+        transfer.error = str(error)
+        self.log(f"Error transferring {transfer.name()}: {str(error)}")
+        self._finish(transfer, FAILED)
+
+    def _finish(self, transfer, status):
+        transfer.status = status
+        if transfer.start_time:
+            transfer.elapsed = time.perf_counter() - transfer.start_time
+        if status == DONE:
+            transfer.error = None
+        self._transfer_changed(transfer)
+
+    def summary(self):
+        with self.lock:
+            transfers = list(self.transfers)
+
+        counts = {status: 0 for status in (QUEUED, RUNNING, RETRYING, DONE, FAILED, CANCELLED)}
+        for transfer in transfers:
+            counts[transfer.status] += 1
+
+        transferred = sum(transfer.transferred - transfer.offset for transfer in transfers)
+        end = self.end_time or time.perf_counter()
+        elapsed = end - self.start_time if self.start_time else 0
+
+        counts.update({
+            'total': len(transfers),
+            'bytes': transferred,
+            'elapsed': elapsed,
+            'throughput': transferred / elapsed if elapsed > 0 else 0,
+            'failures': [{'remote_path': transfer.remote_path, 'error': transfer.error}
+                         for transfer in transfers if transfer.status == FAILED],
+        })
+        return counts
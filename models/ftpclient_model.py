@@ -1,10 +1,19 @@
 import os
 import ftplib
+import posixpath
+from crypto.modes import MODE_ECB, MODE_NAMES
+from crypto.stream import DEFAULT_CHUNK_SIZE
+from models.ftp_crypto import store_encrypted, retrieve_decrypted
+from models.ftp_listing import ListingCache, list_directory
+from models.ftp_resume import download_offset, upload_offset, retrieve, store
+
+ENCRYPTED_EXTENSION = ".encrypted"
 
 class FTPClientManager:
     def __init__(self):
         self.client = None
         self.connected = False
+        self.connection_lost = False # set when a command fails because the control connection died
         self.status_callback = None
         self.log_callback = None
         
@@ -13,7 +22,10 @@ class FTPClientManager:
         self.username = ""
         self.password = ""
         self.local_directory = ""
-        self.remote_directory = "/"
+        self.remote_directory = "/" # tracked locally so navigation needs no PWD round trip
+        
+        self.listing_cache = ListingCache()
+        self.use_mlsd = True # cleared once the server rejects MLSD
         
     def set_status_callback(self, callback):
         self.status_callback = callback
@@ -52,6 +64,9 @@ class FTPClientManager:
             self.client.login(self.username, self.password)
             
             self.connected = True
+            self.connection_lost = False
+            self.use_mlsd = True
+            self.listing_cache.invalidate()
             self.log(f"Connected to FTP server at {self.host}:{self.port}")
             self.update_status(f"Connected to {self.host}:{self.port}")
             
@@ -72,6 +87,7 @@ class FTPClientManager:
         try:
             self.client.quit()
             self.connected = False
+            self.listing_cache.invalidate()
             self.log("Disconnected from FTP server")
             self.update_status("Disconnected from server")
         except Exception as e:
@@ -83,12 +99,24 @@ class FTPClientManager:
     def get_remote_directory(self):
         if not self.connected:
             return "/"
-        try:
-            self.remote_directory = self.client.pwd()
-            return self.remote_directory
-        except Exception as e:
-            self.log(f"Error getting remote directory: {str(e)}")
-            return "/"
+        return self.remote_directory
+    
+    def remote_path(self, name):
+        # Absolute, normalized remote path of name relative to the current directory
+        path = posixpath.normpath(posixpath.join(self.remote_directory, name))
+        return "/" + path.lstrip("/")
+    
+    def invalidate_listing(self, path=None):
+        # Forgets the cached listing of path (absolute), or every listing when path is None
+        self.listing_cache.invalidate(path)
+    
+    def _invalidate_parent(self, name):
+        self.listing_cache.invalidate(posixpath.dirname(self.remote_path(name)))
+    
+    def _check_connection_error(self, error):
+        # Socket errors and 421 replies mean the server is gone; other errors are per command
+        if isinstance(error, (OSError, EOFError)) or str(error).startswith('421'):
+            self.connection_lost = True
     
     def change_remote_directory(self, path):
         if not self.connected:
@@ -97,49 +125,43 @@ class FTPClientManager:
         
         try:
             self.client.cwd(path)
-            self.remote_directory = self.client.pwd()
+            self.remote_directory = self.remote_path(path)
             self.log(f"Changed to directory: {self.remote_directory}")
             return True
         except Exception as e:
+            self._check_connection_error(e)
             self.log(f"Error changing directory: {str(e)}")
             return False
     
-    def list_remote_files(self):
+    def list_remote_files(self, refresh=False):
+        # (name, is_dir, size, modified) for the current directory. Listings are served from
+        # the cache until they expire or a change made through this client invalidates them;
+        # refresh always asks the server.
         if not self.connected:
             self.log("Not connected to server")
             return []
         
+        path = self.remote_directory
+        if not refresh:
+            cached = self.listing_cache.get(path)
+            if cached is not None:
+                return cached
+        
         try:
-            # Get file listing with details
-            file_data = []
-            
-            def process_line(line):
-                parts = line.split()
-                if len(parts) < 9:
-                    return
-                
-                # Parse a typical FTP LIST output
-                permissions = parts[0]
-                is_dir = permissions.startswith('d')
-                size = int(parts[4])
-                
-                # Month, day and either year or time
-                date_parts = parts[5:8]
-                modified = " ".join(date_parts)
-                
-                # Get filename (could contain spaces)
-                filename = " ".join(parts[8:])
-                
-                file_data.append((filename, is_dir, size, modified))
-            
-            self.client.retrlines('LIST', process_line)
+            entries, self.use_mlsd = list_directory(self.client, "", self.use_mlsd)
+            file_data = [(name, is_dir, size, modified) for name, is_dir, size, mtime, modified in entries]
+            
+            self.listing_cache.put(path, file_data)
             return file_data
             
         except Exception as e:
+            self._check_connection_error(e)
             self.log(f"Error listing remote files: {str(e)}")
             return []
     
-    def download_file(self, remote_filename, local_filename=None):
+    def download_file(self, remote_filename, local_filename=None, resume=False, verify=0):
+        # With resume, an existing local file is taken as a partial download and continued
+        # with REST; verify re-checks that many bytes before the resume point first
         if not self.connected:
             self.log("Not connected to server")
             return False
@@ -148,13 +170,55 @@ class FTPClientManager:
             local_filename = os.path.join(self.local_directory, remote_filename)
         
         try:
-            with open(local_filename, 'wb') as local_file:
+            offset = 0
+            if resume:
+                offset, size = download_offset(self.client, remote_filename, local_filename, verify)
+                if offset and offset == size:
+                    self.log(f"{remote_filename} is already complete")
+                    return True
+            
+            if offset:
+                self.log(f"Resuming download of {remote_filename} at {offset} bytes...")
+            else:
                 self.log(f"Downloading {remote_filename}...")
-                self.client.retrbinary(f'RETR {remote_filename}', local_file.write)
+            retrieve(self.client, remote_filename, local_filename, offset, blocksize=DEFAULT_CHUNK_SIZE)
             
             self.log(f"Downloaded {remote_filename} to {local_filename}")
             return True
         except Exception as e:
+            self._check_connection_error(e)
+            self.log(f"Error downloading file: {str(e)}")
+            if resume:
+                self.log(f"Partial file kept for resume: {local_filename}")
+            elif os.path.exists(local_filename):
+                # Remove partial file if download failed
+                try:
+                    os.remove(local_filename)
+                except:
+                    pass
+            return False
+    
+    def download_decrypted(self, remote_filename, local_filename=None, key=None):
+        # Decrypts while downloading: retrbinary chunks go straight through the decryptor
+        if not self.connected:
+            self.log("Not connected to server")
+            return False
+        
+        if local_filename is None:
+            if remote_filename.endswith(ENCRYPTED_EXTENSION):
+                local_name = remote_filename[:-len(ENCRYPTED_EXTENSION)]
+            else:
+                local_name = remote_filename + ".decrypted"
+            local_filename = os.path.join(self.local_directory, local_name)
+        
+        try:
+            self.log(f"Downloading and decrypting {remote_filename}...")
+            decrypted = retrieve_decrypted(self.client, remote_filename, local_filename, key)
+            
+            self.log(f"Downloaded {remote_filename} to {local_filename} ({decrypted} bytes decrypted)")
+            return True
+        except Exception as e:
+            self._check_connection_error(e)
             self.log(f"Error downloading file: {str(e)}")
             # Remove partial file if download failed
             if os.path.exists(local_filename):
@@ -164,7 +228,8 @@ class FTPClientManager:
                     pass
             return False
     
-    def upload_file(self, local_filename, remote_filename=None):
+    def upload_file(self, local_filename, remote_filename=None, resume=False, verify=0):
+        # With resume, a shorter remote file is taken as a partial upload and the rest appended
         if not self.connected:
             self.log("Not connected to server")
             return False
@@ -177,13 +242,49 @@ class FTPClientManager:
             remote_filename = os.path.basename(local_filename)
         
         try:
-            with open(local_filename, 'rb') as local_file:
+            offset = 0
+            if resume:
+                offset, size = upload_offset(self.client, local_filename, remote_filename, verify)
+                if offset and offset == size:
+                    self.log(f"{remote_filename} is already complete on the server")
+                    return True
+            
+            if offset:
+                self.log(f"Resuming upload of {local_filename} at {offset} bytes...")
+            else:
                 self.log(f"Uploading {local_filename}...")
-                self.client.storbinary(f'STOR {remote_filename}', local_file)
+            self._invalidate_parent(remote_filename)
+            store(self.client, local_filename, remote_filename, offset, blocksize=DEFAULT_CHUNK_SIZE)
             
             self.log(f"Uploaded {local_filename} to {remote_filename}")
             return True
         except Exception as e:
+            self._check_connection_error(e)
+            self.log(f"Error uploading file: {str(e)}")
+            return False
+    
+    def upload_encrypted(self, local_filename, remote_filename=None, key=None, mode=MODE_ECB):
+        # Encrypts while uploading: chunks are read, encrypted and sent without a temp file
+        if not self.connected:
+            self.log("Not connected to server")
+            return False
+        
+        if not os.path.exists(local_filename):
+            self.log(f"Local file not found: {local_filename}")
+            return False
+        
+        if remote_filename is None:
+            remote_filename = os.path.basename(local_filename) + ENCRYPTED_EXTENSION
+        
+        try:
+            self.log(f"Uploading {local_filename} encrypted ({MODE_NAMES[mode]})...")
+            self._invalidate_parent(remote_filename)
+            encrypted = store_encrypted(self.client, local_filename, remote_filename, key, mode)
+            
+            self.log(f"Uploaded {local_filename} to {remote_filename} ({encrypted} bytes encrypted)")
+            return True
+        except Exception as e:
+            self._check_connection_error(e)
             self.log(f"Error uploading file: {str(e)}")
             return False
     
@@ -194,9 +295,11 @@ class FTPClientManager:
         
         try:
             self.client.mkd(dirname)
+            self._invalidate_parent(dirname)
             self.log(f"Created remote directory: {dirname}")
             return True
         except Exception as e:
+            self._check_connection_error(e)
             self.log(f"Error creating remote directory: {str(e)}")
             return False
     
@@ -207,9 +310,11 @@ class FTPClientManager:
         
         try:
             self.client.delete(filename)
+            self._invalidate_parent(filename)
             self.log(f"Deleted remote file: {filename}")
             return True
         except Exception as e:
+            self._check_connection_error(e)
             self.log(f"Error deleting remote file: {str(e)}")
             return False
     
@@ -220,9 +325,12 @@ class FTPClientManager:
         
         try:
             self.client.rmd(dirname)
+            # Cached listings below the removed directory are gone as well
+            self.listing_cache.invalidate()
             self.log(f"Deleted remote directory: {dirname}")
             return True
         except Exception as e:
+            self._check_connection_error(e)
             self.log(f"Error deleting remote directory: {str(e)}")
             return False
     
@@ -233,9 +341,12 @@ class FTPClientManager:
         
         try:
             self.client.rename(old_name, new_name)
+            # A renamed directory moves every cached listing below it
+            self.listing_cache.invalidate()
             self.log(f"Renamed remote file: {old_name} to {new_name}")
             return True
         except Exception as e:
+            self._check_connection_error(e)
             self.log(f"Error renaming remote file: {str(e)}")
             return False
             
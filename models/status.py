@@ -0,0 +1,9 @@
+# Job and transfer states shared by the encryption queue, the FTP transfer manager and sync
+
+QUEUED = "queued"
+RUNNING = "running"
+RETRYING = "retrying" # FTP transfers waiting out the backoff before another attempt
+DONE = "done"
+SKIPPED = "skipped"
+FAILED = "failed"
+CANCELLED = "cancelled"
@@ -10,6 +10,13 @@ class EncryptionView:
         self.key_var = tk.StringVar()
         self.file_display_var = tk.StringVar(value="No file selected")
         self.show_key_var = tk.BooleanVar()
+        self.armor_var = tk.BooleanVar(value=False)
+        self.mode_var = tk.StringVar(value="ECB")
+        self.progress_var = tk.DoubleVar(value=0)
+        self.progress_status_var = tk.StringVar(value="Idle")
+        self.queue_output_var = tk.StringVar(value="Next to source files")
+        self.queue_workers_var = tk.IntVar(value=os.cpu_count() or 1)
+        self.queue_status_var = tk.StringVar(value="Queue empty")
 
         self.setup_ui()
     
@@ -30,6 +37,7 @@ class EncryptionView:
         ttk.Label(self.left_panel, text="AES Cipher", font=("Arial", 14, "bold")).pack(pady=10)
         self.create_input_settings_frame(self.left_panel)
         self.create_operation_buttons(self.left_panel)
+        self.create_progress_frame(self.left_panel)
         self.create_benchmark_frame(self.left_panel)
     
     def create_input_settings_frame(self, parent):
@@ -51,6 +59,13 @@ class EncryptionView:
         self.file_display = ttk.Label(file_frame, textvariable=self.file_display_var, width=30, anchor='w')
         self.file_display.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
+        mode_frame = ttk.Frame(input_frame)
+        mode_frame.pack(pady=5, fill=tk.X)
+        ttk.Label(mode_frame, text="Mode:", width=15, anchor='w').pack(side=tk.LEFT)
+        ttk.Combobox(mode_frame, textvariable=self.mode_var, values=("ECB", "CTR", "CBC"), state="readonly", width=10).pack(side=tk.LEFT)
+
+        ttk.Checkbutton(input_frame, text="Base64 armor (text output)", variable=self.armor_var).pack(pady=5, anchor='w')
+
         self.browse_button = ttk.Button(input_frame, text="Browse File", width=20)
         self.browse_button.pack(pady=5)
     
@@ -64,6 +79,18 @@ class EncryptionView:
         self.decrypt_button = ttk.Button(button_frame, text="Decrypt File", width=15, style='Accent.TButton')
         self.decrypt_button.pack(side=tk.LEFT, padx=5)
     
+    def create_progress_frame(self, parent):
+        progress_frame = ttk.Frame(parent)
+        progress_frame.pack(pady=(0, 5), fill=tk.X)
+
+        self.progress_bar = ttk.Progressbar(progress_frame, variable=self.progress_var, maximum=100, mode="determinate")
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        self.cancel_button = ttk.Button(progress_frame, text="Cancel", width=10, state="disabled")
+        self.cancel_button.pack(side=tk.RIGHT, padx=(5, 0))
+
+        ttk.Label(parent, textvariable=self.progress_status_var, anchor='w').pack(fill=tk.X)
+
     def create_benchmark_frame(self, parent):
         benchmark_frame = ttk.LabelFrame(parent, text="Benchmarking Results", padding=(10,10))
         benchmark_frame.pack(pady=5, fill=tk.BOTH, expand=True)
@@ -87,6 +114,9 @@ class EncryptionView:
         self.stats_text = scrolledtext.ScrolledText(benchmark_frame, wrap=tk.WORD, height=6)
         self.stats_text.pack(fill=tk.BOTH, expand=True)
         self.stats_text.configure(state="disabled")
+
+        self.export_trace_button = ttk.Button(benchmark_frame, text="Export Trace", width=15)
+        self.export_trace_button.pack(pady=(5, 0), anchor='e')
     
     def setup_right_panel(self):
         container = ttk.Frame(self.right_panel)
@@ -95,6 +125,7 @@ class EncryptionView:
         container.grid_columnconfigure(0, weight=1)
         container.grid_rowconfigure(0, weight=1)
         container.grid_rowconfigure(1, weight=1)
+        container.grid_rowconfigure(2, weight=1)
 
         input_frame = ttk.LabelFrame(container, text="Input File Content", padding=(5,5))
         input_frame.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
@@ -108,6 +139,56 @@ class EncryptionView:
         self.output_text.pack(fill=tk.BOTH, expand=True)
         self.output_text.configure(state="disabled")
 
+        self.create_queue_frame(container)
+
+    def create_queue_frame(self, parent):
+        queue_frame = ttk.LabelFrame(parent, text="Batch Queue", padding=(5,5))
+        queue_frame.grid(row=2, column=0, sticky="nsew", padx=5, pady=5)
+
+        source_frame = ttk.Frame(queue_frame)
+        source_frame.pack(fill=tk.X, pady=(0, 5))
+        self.queue_add_folder_button = ttk.Button(source_frame, text="Add Folder")
+        self.queue_add_folder_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.queue_add_pattern_button = ttk.Button(source_frame, text="Add Pattern")
+        self.queue_add_pattern_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.queue_output_button = ttk.Button(source_frame, text="Output Folder")
+        self.queue_output_button.pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Label(source_frame, textvariable=self.queue_output_var, anchor='w').pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Label(source_frame, text="Workers:").pack(side=tk.LEFT)
+        ttk.Spinbox(source_frame, from_=1, to=64, textvariable=self.queue_workers_var, width=4).pack(side=tk.LEFT)
+
+        control_frame = ttk.Frame(queue_frame)
+        control_frame.pack(fill=tk.X, pady=(0, 5))
+        self.queue_encrypt_button = ttk.Button(control_frame, text="Encrypt All")
+        self.queue_encrypt_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.queue_decrypt_button = ttk.Button(control_frame, text="Decrypt All")
+        self.queue_decrypt_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.queue_pause_button = ttk.Button(control_frame, text="Pause")
+        self.queue_pause_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.queue_cancel_button = ttk.Button(control_frame, text="Cancel")
+        self.queue_cancel_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.queue_clear_button = ttk.Button(control_frame, text="Clear Finished")
+        self.queue_clear_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.queue_report_button = ttk.Button(control_frame, text="Save Report")
+        self.queue_report_button.pack(side=tk.LEFT, padx=(0, 5))
+
+        ttk.Label(queue_frame, textvariable=self.queue_status_var, anchor='w').pack(fill=tk.X)
+
+        tree_frame = ttk.Frame(queue_frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        self.queue_tree = ttk.Treeview(tree_frame, columns=("file", "status", "speed"), show="headings", height=5)
+        self.queue_tree.heading("file", text="File")
+        self.queue_tree.heading("status", text="Status")
+        self.queue_tree.heading("speed", text="MB/s")
+        self.queue_tree.column("file", width=300)
+        self.queue_tree.column("status", width=80)
+        self.queue_tree.column("speed", width=80)
+        self.queue_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        queue_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.queue_tree.yview)
+        queue_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.queue_tree.configure(yscrollcommand=queue_scrollbar.set)
+
     def toggle_key_visibility(self):
         self.key_entry.config(show='' if self.show_key_var.get() else '*')
     
@@ -119,6 +200,71 @@ class EncryptionView:
     
     def set_decrypt_command(self, command):
         self.decrypt_button.config(command=command)
+
+    def set_export_trace_command(self, command):
+        self.export_trace_button.config(command=command)
+
+    def set_cancel_command(self, command):
+        self.cancel_button.config(command=command)
+
+    def set_queue_commands(self, add_folder, add_pattern, choose_output, encrypt_all, decrypt_all,
+                           toggle_pause, cancel, clear_finished, save_report):
+        self.queue_add_folder_button.config(command=add_folder)
+        self.queue_add_pattern_button.config(command=add_pattern)
+        self.queue_output_button.config(command=choose_output)
+        self.queue_encrypt_button.config(command=encrypt_all)
+        self.queue_decrypt_button.config(command=decrypt_all)
+        self.queue_pause_button.config(command=toggle_pause)
+        self.queue_cancel_button.config(command=cancel)
+        self.queue_clear_button.config(command=clear_finished)
+        self.queue_report_button.config(command=save_report)
+
+    def get_queue_workers(self):
+        try:
+            return max(1, int(self.queue_workers_var.get()))
+        except (tk.TclError, ValueError):
+            return 1
+
+    def set_queue_output(self, directory):
+        self.queue_output_var.set(directory or "Next to source files")
+
+    def set_queue_paused(self, paused):
+        self.queue_pause_button.config(text="Resume" if paused else "Pause")
+
+    def set_queue_status(self, status):
+        self.queue_status_var.set(status)
+
+    def update_queue_jobs(self, jobs):
+        # jobs: (job_id, file, status, speed) tuples; rows are updated in place
+        for job_id, name, status, speed in jobs:
+            values = (name, status, f"{speed / 1e6:.2f}" if speed else "")
+            if self.queue_tree.exists(job_id):
+                self.queue_tree.item(job_id, values=values)
+            else:
+                self.queue_tree.insert("", tk.END, iid=job_id, values=values)
+
+    def remove_queue_jobs(self, job_ids):
+        for job_id in job_ids:
+            if self.queue_tree.exists(job_id):
+                self.queue_tree.delete(job_id)
+
+    def set_busy(self, busy):
+        state = "disabled" if busy else "normal"
+        self.encrypt_button.config(state=state)
+        self.decrypt_button.config(state=state)
+        self.browse_button.config(state=state)
+        self.cancel_button.config(state="normal" if busy else "disabled")
+
+    def reset_progress(self):
+        self.progress_var.set(0)
+        self.progress_status_var.set("Starting...")
+
+    def update_progress(self, done, total, speed):
+        self.progress_var.set(done / total * 100 if total else 100)
+        self.progress_status_var.set(f"{done / 1e6:.1f} / {total / 1e6:.1f} MB  ({speed / 1e6:.2f} MB/s)")
+
+    def set_progress_status(self, status):
+        self.progress_status_var.set(status)
     
     def update_file_display(self, filename):
         self.file_display_var.set(os.path.basename(filename) if filename else "No file selected")
@@ -137,6 +283,12 @@ class EncryptionView:
     
     def get_encryption_key(self):
         return self.key_var.get()
+
+    def get_armor(self):
+        return self.armor_var.get()
+
+    def get_mode(self):
+        return self.mode_var.get()
     
     def update_round_timings(self, round_timings):
         for item in self.rounds_tree.get_children():
@@ -158,4 +310,11 @@ class EncryptionView:
         self.stats_text.insert(tk.END, f"Processing speed: {stats['speed']:.2f} KB/s\n")
         self.stats_text.insert(tk.END, f"Number of blocks: {stats['num_blocks']}\n")
         self.stats_text.insert(tk.END, f"Key length: {stats['key_length']} bytes (AES-{stats['key_length']*8})\n")
+        if stats.get('stages'):
+            self.stats_text.insert(tk.END, "Stage breakdown:\n")
+            for stage in stats['stages']:
+                counters = f"{stage['bytes']} bytes"
+                if stage['blocks']:
+                    counters += f", {stage['blocks']} blocks"
+                self.stats_text.insert(tk.END, f"  {stage['name']}: {stage['time_ms']:.4f} ms ({stage['percent']:.1f}%), {counters}\n")
         self.stats_text.configure(state="disabled")
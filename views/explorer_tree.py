@@ -0,0 +1,95 @@
+import tkinter as tk
+
+# Keeps a file explorer Treeview in step with a listing of (name, is_dir, size, modified)
+# entries. Refreshing the same folder only touches rows that were added, removed or changed,
+# and long listings are inserted a page at a time as the view is scrolled to the bottom.
+
+PAGE_SIZE = 500
+
+def sort_key(entry):
+    # Folders first, then by name ignoring case
+    return (not entry[1], entry[0].lower(), entry[0])
+
+def format_size(size):
+    if size < 1024:
+        return f"{size} B"
+    elif size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    else:
+        return f"{size / (1024 * 1024):.1f} MB"
+
+class ExplorerTree:
+    def __init__(self, tree, scrollbar, build_row, page_size=PAGE_SIZE):
+        # build_row(entry) returns the Treeview insert options (text, values, tags, image)
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.build_row = build_row
+        self.page_size = page_size
+
+        self.key = None # folder currently shown
+        self.entries = [] # the whole sorted listing
+        self.shown = 0 # entries[:shown] have rows
+        self.rows = {} # name -> (item id, entry)
+        self.fixed_rows = 0 # rows above the listing, such as ".."
+        self.loading = False
+
+        self.tree.configure(yscrollcommand=self.on_scroll)
+
+    def clear(self):
+        self.tree.delete(*self.tree.get_children())
+        self.key = None
+        self.entries = []
+        self.shown = 0
+        self.rows = {}
+        self.fixed_rows = 0
+
+    def show(self, key, entries, header=None):
+        # header is the insert options of a row kept above the listing when the folder changes
+        entries = sorted(entries, key=sort_key)
+
+        if key != self.key:
+            self.clear()
+            self.key = key
+            if header:
+                self.tree.insert("", tk.END, **header)
+                self.fixed_rows = 1
+            self.tree.yview_moveto(0)
+
+        self.entries = entries
+        self._update(min(len(entries), max(self.shown, self.page_size)))
+
+    def _update(self, count):
+        wanted = {entry[0]: entry for entry in self.entries[:count]}
+
+        stale = []
+        for name, (item_id, entry) in self.rows.items():
+            current = wanted.get(name)
+            if current is None or current[1] != entry[1]:
+                stale.append(name)
+            elif current != entry:
+                row = self.build_row(current)
+                self.tree.item(item_id, values=row["values"], tags=row["tags"])
+                self.rows[name] = (item_id, current)
+
+        if stale:
+            self.tree.delete(*(self.rows.pop(name)[0] for name in stale))
+
+        # Existing rows keep their relative order, so walking the sorted listing and
+        # inserting each missing entry at its index restores the full order
+        for index, entry in enumerate(self.entries[:count]):
+            if entry[0] not in self.rows:
+                item_id = self.tree.insert("", index + self.fixed_rows, **self.build_row(entry))
+                self.rows[entry[0]] = (item_id, entry)
+
+        self.shown = count
+
+    def load_more(self):
+        self.loading = False
+        if self.shown < len(self.entries):
+            self._update(min(len(self.entries), self.shown + self.page_size))
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= 1.0 and self.shown < len(self.entries) and not self.loading:
+            self.loading = True
+            self.tree.after_idle(self.load_more)
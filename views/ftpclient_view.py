@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext
 from PIL import Image, ImageTk
+from views.explorer_tree import ExplorerTree, format_size
 import os
 import __main__
 import time
@@ -22,6 +23,12 @@ class FTPClientView:
         self.default_directory = ftp_directory
         self.ftp_directory_var = tk.StringVar(value=ftp_directory)
         self.show_pwd_var = tk.BooleanVar()
+        self.transfer_connections_var = tk.IntVar(value=4)
+        self.transfer_status_var = tk.StringVar(value="No transfers")
+        self.transfer_resume_var = tk.BooleanVar(value=True)
+        self.transfer_verify_var = tk.BooleanVar(value=True)
+        self.sync_direction_var = tk.StringVar(value="Local → Remote")
+        self.sync_encrypt_var = tk.BooleanVar(value=False)
         
         self.setup_ui()
         
@@ -113,6 +120,8 @@ class FTPClientView:
     def setup_right_panel(self):
         self.create_file_explorer(self.right_panel)
         self.create_transfer_controls(self.right_panel)
+        self.create_transfer_queue(self.right_panel)
+        self.create_sync_controls(self.right_panel)
 
     def create_transfer_controls(self, parent):
         transfer_frame = ttk.Frame(parent)
@@ -124,9 +133,65 @@ class FTPClientView:
         self.upload_button = ttk.Button(transfer_frame, text="Upload", width=12)
         self.upload_button.pack(side=tk.LEFT, padx=5)
 
+        self.upload_encrypted_button = ttk.Button(transfer_frame, text="Upload Encrypted", width=16)
+        self.upload_encrypted_button.pack(side=tk.LEFT, padx=5)
+
+        self.download_decrypted_button = ttk.Button(transfer_frame, text="Download Decrypted", width=18)
+        self.download_decrypted_button.pack(side=tk.LEFT, padx=5)
+
         self.choose_file_button = ttk.Button(transfer_frame, text="Choose File", width=10)
         self.choose_file_button.pack(side=tk.LEFT, padx=5)
 
+    def create_transfer_queue(self, parent):
+        queue_frame = ttk.LabelFrame(parent, text="Transfers", padding=(5, 5))
+        queue_frame.pack(fill=tk.BOTH, pady=5)
+
+        control_frame = ttk.Frame(queue_frame)
+        control_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(control_frame, text="Connections:").pack(side=tk.LEFT)
+        ttk.Spinbox(control_frame, from_=1, to=16, textvariable=self.transfer_connections_var, width=4).pack(side=tk.LEFT, padx=(0, 5))
+        self.transfer_cancel_button = ttk.Button(control_frame, text="Cancel")
+        self.transfer_cancel_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.transfer_clear_button = ttk.Button(control_frame, text="Clear Finished")
+        self.transfer_clear_button.pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Checkbutton(control_frame, text="Resume partial files", variable=self.transfer_resume_var).pack(side=tk.LEFT)
+        ttk.Checkbutton(control_frame, text="Verify overlap", variable=self.transfer_verify_var).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Label(control_frame, textvariable=self.transfer_status_var, anchor='w').pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        tree_frame = ttk.Frame(queue_frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        self.transfer_tree = ttk.Treeview(tree_frame, columns=("file", "direction", "status", "progress", "speed"),
+                                          show="headings", height=5)
+        self.transfer_tree.heading("file", text="File")
+        self.transfer_tree.heading("direction", text="Direction")
+        self.transfer_tree.heading("status", text="Status")
+        self.transfer_tree.heading("progress", text="Progress")
+        self.transfer_tree.heading("speed", text="MB/s")
+        self.transfer_tree.column("file", width=250)
+        self.transfer_tree.column("direction", width=80)
+        self.transfer_tree.column("status", width=80)
+        self.transfer_tree.column("progress", width=80, anchor="e")
+        self.transfer_tree.column("speed", width=80, anchor="e")
+        self.transfer_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        transfer_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.transfer_tree.yview)
+        transfer_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.transfer_tree.configure(yscrollcommand=transfer_scrollbar.set)
+
+    def create_sync_controls(self, parent):
+        sync_frame = ttk.LabelFrame(parent, text="Folder Sync (local directory ↔ current remote path)", padding=(5, 5))
+        sync_frame.pack(fill=tk.X, pady=5)
+
+        ttk.Combobox(sync_frame, textvariable=self.sync_direction_var, state="readonly", width=16,
+                     values=("Local → Remote", "Remote → Local")).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Checkbutton(sync_frame, text="Encrypt uploads", variable=self.sync_encrypt_var).pack(side=tk.LEFT, padx=(0, 5))
+        self.sync_dry_run_button = ttk.Button(sync_frame, text="Dry Run")
+        self.sync_dry_run_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.sync_button = ttk.Button(sync_frame, text="Sync")
+        self.sync_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.sync_report_button = ttk.Button(sync_frame, text="Save Report")
+        self.sync_report_button.pack(side=tk.LEFT, padx=(0, 5))
+
     def create_file_explorer(self, parent):
         explorer_frame = ttk.LabelFrame(parent, text="Remote File Explorer", padding=(10, 10))
         explorer_frame.pack(fill=tk.BOTH, expand=True, pady=5)
@@ -160,7 +225,7 @@ class FTPClientView:
         
         explorer_scrollbar = ttk.Scrollbar(explorer_container, orient=tk.VERTICAL, command=self.file_explorer.yview)
         explorer_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.file_explorer.configure(yscrollcommand=explorer_scrollbar.set)
+        self.explorer_tree = ExplorerTree(self.file_explorer, explorer_scrollbar, self.build_explorer_row)
         
         # Create context menu
         self.context_menu = tk.Menu(self.file_explorer, tearoff=0)
@@ -184,24 +249,18 @@ class FTPClientView:
         self.open_local_folder_button = ttk.Button(explorer_controls, text="Open Local Folder", width=15)
         self.open_local_folder_button.pack(side=tk.RIGHT, padx=5)    
 
-    def update_file_explorer(self, file_data):
-        for item in self.file_explorer.get_children():
-            self.file_explorer.delete(item)
+    def update_file_explorer(self, file_data, directory=None):
+        self.explorer_tree.show(directory, file_data)
+
+    def clear_file_explorer(self):
+        self.explorer_tree.clear()
+
+    def build_explorer_row(self, entry):
+        name, is_dir, size, modified = entry
+        icon_type = "folder" if is_dir else "file"
         
-        # Add files and directories
-        for name, is_dir, size, modified in file_data:
-            if size < 1024:
-                size_str = f"{size} B"
-            elif size < 1024 * 1024:
-                size_str = f"{size / 1024:.1f} KB"
-            else:
-                size_str = f"{size / (1024 * 1024):.1f} MB"
-            
-            icon_type = "folder" if is_dir else "file"
-            
-            self.file_explorer.insert("", tk.END, text='  ' + name, values=(size_str, modified), 
-                                    tags=(name, icon_type),
-                                    image=self.get_folder_icon() if is_dir else self.get_file_icon())
+        return dict(text='  ' + name, values=(format_size(size), modified), tags=(name, icon_type),
+                    image=self.get_folder_icon() if is_dir else self.get_file_icon())
 
     def update_remote_path(self, path):
         """Update the displayed remote path"""
@@ -228,6 +287,57 @@ class FTPClientView:
     def set_upload_command(self, command):
         self.upload_button.config(command=command)
 
+    def set_upload_encrypted_command(self, command):
+        self.upload_encrypted_button.config(command=command)
+
+    def set_download_decrypted_command(self, command):
+        self.download_decrypted_button.config(command=command)
+
+    def set_transfer_commands(self, cancel, clear_finished):
+        self.transfer_cancel_button.config(command=cancel)
+        self.transfer_clear_button.config(command=clear_finished)
+
+    def get_transfer_connections(self):
+        try:
+            return max(1, int(self.transfer_connections_var.get()))
+        except (tk.TclError, ValueError):
+            return 1
+
+    def set_sync_commands(self, dry_run, sync, save_report):
+        self.sync_dry_run_button.config(command=dry_run)
+        self.sync_button.config(command=sync)
+        self.sync_report_button.config(command=save_report)
+
+    def get_sync_upload(self):
+        return self.sync_direction_var.get() == "Local → Remote"
+
+    def get_sync_encrypt(self):
+        return self.sync_encrypt_var.get()
+
+    def get_transfer_resume(self):
+        return self.transfer_resume_var.get()
+
+    def get_transfer_verify(self):
+        return self.transfer_verify_var.get()
+
+    def set_transfer_status(self, status):
+        self.transfer_status_var.set(status)
+
+    def update_transfers(self, transfers):
+        # transfers: (transfer_id, file, direction, status, done, total, speed) tuples; rows are updated in place
+        for transfer_id, name, direction, status, done, total, speed in transfers:
+            progress = f"{done * 100 / total:.0f}%" if total else f"{done / 1e6:.1f} MB"
+            values = (name, direction, status, progress, f"{speed / 1e6:.2f}" if speed else "")
+            if self.transfer_tree.exists(transfer_id):
+                self.transfer_tree.item(transfer_id, values=values)
+            else:
+                self.transfer_tree.insert("", tk.END, iid=transfer_id, values=values)
+
+    def remove_transfers(self, transfer_ids):
+        for transfer_id in transfer_ids:
+            if self.transfer_tree.exists(transfer_id):
+                self.transfer_tree.delete(transfer_id)
+
     def set_open_local_folder_command(self, command):
         self.open_local_folder_button.config(command=command)
     
@@ -281,28 +391,11 @@ class FTPClientView:
         self.double_click_handler = handler
 
     def update_remote_explorer(self, directory, file_data):
-        for item in self.file_explorer.get_children():
-            self.file_explorer.delete(item)
-        
+        header = None
         if directory != "/":
-            self.file_explorer.insert("", tk.END, text="..", values=("", ""),
-                                    tags=("..", "parent-dir", "folder"),
-                                    image=self.get_folder_icon())
-        
-        # Add files and directories
-        for name, is_dir, size, modified in file_data:
-            if size < 1024:
-                size_str = f"{size} B"
-            elif size < 1024 * 1024:
-                size_str = f"{size / 1024:.1f} KB"
-            else:
-                size_str = f"{size / (1024 * 1024):.1f} MB"
-            
-            icon_type = "folder" if is_dir else "file"
-            
-            self.file_explorer.insert("", tk.END, text=' ' + name, values=(size_str, modified), 
-                                    tags=(name, icon_type),
-                                    image=self.get_folder_icon() if is_dir else self.get_file_icon())
+            header = dict(text="..", values=("", ""), tags=("..", "parent-dir", "folder"), image=self.get_folder_icon())
+        
+        self.explorer_tree.show(directory, file_data, header)
 
     def disable_connect_button(self):
         self.connect_button.config(state="disabled")
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext
 from PIL import Image, ImageTk
+from views.explorer_tree import ExplorerTree, format_size
 import os
 import __main__
 import time
@@ -21,6 +22,7 @@ class FTPServerView:
         self.default_direcory = ftp_directory
         self.ftp_directory_var = tk.StringVar(value=ftp_directory)
         self.show_pwd_var = tk.BooleanVar()
+        self.encrypt_storage_var = tk.BooleanVar(value=False)
         
         self.setup_ui()
         
@@ -92,6 +94,11 @@ class FTPServerView:
         ttk.Entry(directory_frame, textvariable=self.ftp_directory_var, width=30).pack(side=tk.LEFT, fill=tk.X, expand=True)
         self.browse_dir_button = ttk.Button(directory_frame, text="Browse")
         self.browse_dir_button.pack(side=tk.RIGHT)
+        
+        storage_frame = ttk.Frame(config_frame)
+        storage_frame.pack(pady=5, fill=tk.X)
+        ttk.Checkbutton(storage_frame, text="Encrypt stored files (CTR, key from Encryption tab)",
+                        variable=self.encrypt_storage_var).pack(side=tk.LEFT)
     
     def create_control_buttons(self, parent):
         ftp_button_frame = ttk.Frame(parent)
@@ -147,7 +154,7 @@ class FTPServerView:
         
         explorer_scrollbar = ttk.Scrollbar(explorer_container, orient=tk.VERTICAL, command=self.file_explorer.yview)
         explorer_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.file_explorer.configure(yscrollcommand=explorer_scrollbar.set)
+        self.explorer_tree = ExplorerTree(self.file_explorer, explorer_scrollbar, self.build_explorer_row)
         
         # Create context menu
         self.context_menu = tk.Menu(self.file_explorer, tearoff=0)
@@ -245,31 +252,22 @@ class FTPServerView:
         self.double_click_handler = handler
 
     def update_file_explorer(self, directory, file_data):
-        for item in self.file_explorer.get_children():
-            self.file_explorer.delete(item)
-        
+        header = None
         parent_dir = os.path.dirname(directory)
         if parent_dir != directory:
-            self.file_explorer.insert("", tk.END, text="  ..", values=("", ""),
-                                    tags=(parent_dir, "folder"),
-                                    image=self.get_folder_icon())
+            header = dict(text="  ..", values=("", ""), tags=(parent_dir, "folder"), image=self.get_folder_icon())
         
-        # Add files and directories
-        for name, is_dir, size, modified in file_data:
-            if size < 1024:
-                size_str = f"{size} B"
-            elif size < 1024 * 1024:
-                size_str = f"{size / 1024:.1f} KB"
-            else:
-                size_str = f"{size / (1024 * 1024):.1f} MB"
-            
-            # Store full file path and is_dir info as tags for later use
-            item_path = os.path.join(directory, name)
-            icon_type = "folder" if is_dir else "file"
-            
-            self.file_explorer.insert("", tk.END, text='  ' + name, values=(size_str, modified), 
-                                    tags=(item_path, icon_type),
-                                    image=self.get_folder_icon() if is_dir else self.get_file_icon())
+        self.explorer_directory = directory
+        self.explorer_tree.show(directory, file_data, header)
+
+    def build_explorer_row(self, entry):
+        name, is_dir, size, modified = entry
+        # Store full file path and is_dir info as tags for later use
+        item_path = os.path.join(self.explorer_directory, name)
+        icon_type = "folder" if is_dir else "file"
+        
+        return dict(text='  ' + name, values=(format_size(size), modified), tags=(item_path, icon_type),
+                    image=self.get_folder_icon() if is_dir else self.get_file_icon())
 
     def get_folder_icon(self):
         """Get folder icon for treeview. Creates icon if not already cached."""
@@ -300,4 +298,7 @@ class FTPServerView:
         return self.ftp_password_var.get()
     
     def get_directory(self):
-        return self.ftp_directory_var.get()
\ No newline at end of file
+        return self.ftp_directory_var.get()
+    
+    def get_encrypt_storage(self):
+        return self.encrypt_storage_var.get()
\ No newline at end of file